@@ -1,154 +1,716 @@
+import time
+_IMPORT_STARTED = time.perf_counter()  # 콜드 스타트 측정용 (가장 먼저 기록)
+
 import sqlite3
-from flask import Flask, render_template, request, redirect, url_for, g
-from datetime import datetime
+from flask import (Flask, render_template, stream_template, stream_with_context, request, redirect, url_for, g,
+                   jsonify, make_response, has_app_context, flash, get_flashed_messages)
+from datetime import datetime, date, timedelta
+import calendar
+import contextlib
 import os
-import psycopg
-import pandas as pd
-import warnings
+import re
+import threading
+
+import conflicts
+import export
+import live
+import metrics
+import replica
+import repository
+import schema
+import upload
+from digest import Digest
+from page_cache import PageCache
 
 # --- 앱 설정 ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
 app = Flask(__name__, template_folder=TEMPLATE_DIR)
+# 블록 태그({% if %} 등) 줄의 들여쓰기/줄바꿈을 출력하지 않음 (목록 카드마다 수백 바이트 절약)
+app.jinja_env.trim_blocks = True
+app.jinja_env.lstrip_blocks = True
+# 세션은 /add 등의 안내(flash) 메시지에만 씀. 워커마다 임의 키를 만들면 리다이렉트 뒤 요청을 다른 워커가 받을 때
+# 안내가 사라지므로 SECRET_KEY 로만 설정 (fly secrets set SECRET_KEY=...). 없으면 안내는 400 응답 본문으로 (reject_add)
+app.secret_key = os.environ.get('SECRET_KEY')
 
 DATABASE = 'events.db'
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
-# --- DB 연결 및 관리 함수 (이전과 동일) ---
+# --- 커넥션 풀 설정 (환경 변수로 조정) ---
+# gunicorn 워커 수 x DB_POOL_MAX_SIZE 가 Postgres 최대 접속 수를 넘지 않도록 맞춰야 함.
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '5'))
+DB_POOL_MAX_IDLE = float(os.environ.get('DB_POOL_MAX_IDLE', '300'))  # 초 단위, 유휴 연결 정리
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))     # 초 단위, 연결 대기 한도
+
+# --- 전체 목록/휴지통 페이지 크기 ---
+PAGE_SIZE = int(os.environ.get('PAGE_SIZE', '50'))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '200'))
+
+# --- 스트리밍 렌더링: 목록을 커서에서 읽는 대로 렌더링해서 조각(기본 16KB)마다 바로 전송 ---
+STREAM_RENDER = os.environ.get('STREAM_RENDER', '1') != '0'
+STREAM_CHUNK_BYTES = int(os.environ.get('STREAM_CHUNK_BYTES', str(16 * 1024)))
+
+# --- index() 렌더링 캐시 (256MB VM 기준 기본 16MB, TTL 은 migrate_to_db.py 등 외부 쓰기 대비) ---
+PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', '1') != '0'
+page_cache = PageCache(max_bytes=int(os.environ.get('PAGE_CACHE_MAX_BYTES', str(16 * 1024 * 1024))),
+                       ttl=float(os.environ.get('PAGE_CACHE_TTL', '300')))
+
+# --- 오늘/내일 공연 요약 (digest.py): 기본 화면과 /today.json 을 DB 없이 메모리에서 ---
+DIGEST_ENABLED = os.environ.get('DIGEST_ENABLED', '1') != '0'
+today_digest = Digest(max_age=float(os.environ.get('DIGEST_MAX_AGE', '300')))
+
+# --- 실시간 갱신(/events): 동기 워커(gunicorn 기본)는 열린 스트림 하나가 워커 하나를 붙잡으므로
+# 화면의 EventSource 는 비동기 모드(asgi.py 가 켬)나 LIVE_EVENTS=1 일 때만 넣음.
+# 동기 모드의 스트림은 LIVE_STREAM_MAX_SECONDS 뒤 닫히고 브라우저가 retry: 간격 뒤 다시 연결함.
+LIVE_EVENTS = os.environ.get('LIVE_EVENTS', '0') != '0'
+LIVE_STREAM_MAX_SECONDS = float(os.environ.get('LIVE_STREAM_MAX_SECONDS', '60'))
+
+# --- 로컬 SQLite 읽기 복제본 (replica.py, DATABASE_URL 과 READ_REPLICA=1 일 때) ---
+# GET 요청은 복제본이 준비되어 있고 지연이 READ_REPLICA_MAX_LAG 이내면 로컬에서 읽음 (/events 는 제외).
+read_replica = replica.Replica(DATABASE_URL) if DATABASE_URL and replica.READ_REPLICA else None
+PRIMARY_READ_PATHS = ('/events',)
+
+_pg_pool = None
+_pool_lock = threading.Lock()
+_sqlite_local = threading.local()
+_sqlite_conn_count = 0
+
+def get_pg_pool():
+    """워커 프로세스당 하나의 Postgres 커넥션 풀을 만들어 재사용합니다.
+
+    gunicorn이 fork 한 뒤 첫 요청에서 생성되므로 워커끼리 소켓을 공유하지 않습니다.
+    """
+    global _pg_pool
+    if _pg_pool is None:
+        with _pool_lock:
+            if _pg_pool is None:
+                # psycopg_pool 은 Postgres 모드에서만 필요하므로 첫 연결 시점에 불러옴
+                from psycopg_pool import ConnectionPool
+                _pg_pool = ConnectionPool(
+                    DATABASE_URL,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    max_idle=DB_POOL_MAX_IDLE,
+                    timeout=DB_POOL_TIMEOUT,
+                    check=ConnectionPool.check_connection,  # 빌려주기 전에 끊긴 연결인지 확인
+                    kwargs=repository.pg_connect_kwargs(),  # Row 행 + prepared statement
+                    name='performances',
+                )
+    return _pg_pool
+
+def get_sqlite_conn():
+    """스레드(워커)당 하나의 SQLite 연결을 WAL 모드로 열어두고 계속 사용합니다 (Postgres 모드면 읽기 복제본)."""
+    global _sqlite_conn_count
+    conn = getattr(_sqlite_local, 'conn', None)
+    if conn is None:
+        path = read_replica.path if read_replica else DATABASE
+        conn = repository.connect(None, path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=5000')
+        _sqlite_local.conn = conn
+        with _pool_lock:
+            _sqlite_conn_count += 1
+    return conn
+
+def get_pool_stats():
+    """gunicorn 워커 수를 정할 때 참고할 수 있는 연결 통계를 돌려줍니다."""
+    if DATABASE_URL:
+        stats = {'backend': 'postgresql', 'pid': os.getpid(), 'min_size': DB_POOL_MIN_SIZE,
+                 'max_size': DB_POOL_MAX_SIZE, 'max_idle': DB_POOL_MAX_IDLE, 'timeout': DB_POOL_TIMEOUT}
+        if _pg_pool is not None:
+            stats.update(_pg_pool.get_stats())
+        return stats
+    return {'backend': 'sqlite', 'pid': os.getpid(), 'journal_mode': 'wal',
+            'connections_opened': _sqlite_conn_count}
+
+def reads_replica():
+    """이 요청의 조회를 읽기 복제본(SQLite)에서 하는지 (choose_read_source 가 정함)."""
+    return read_replica is not None and has_app_context() and g.get('_on_replica', False)
+
+def get_repo():
+    """현재 요청이 읽는 백엔드의 SQL 문 모음 (repository.Repository)."""
+    return repository.for_backend(bool(DATABASE_URL) and not reads_replica())
+
+# --- DB 연결 및 관리 함수 ---
+# --- 요청/쿼리/렌더링 시간 지표 (/metrics) ---
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '0'))  # 0 이면 느린 쿼리 로그 끔
+
+REQUESTS_TOTAL = metrics.Counter('http_requests_total', 'HTTP requests', ('route', 'mode', 'method', 'status'))
+REQUEST_SECONDS = metrics.Histogram('http_request_duration_seconds', 'Request handling time', ('route', 'mode'))
+DB_CONNECT_SECONDS = metrics.Histogram('db_connect_seconds', 'Time to get a DB connection', ('backend',))
+DB_QUERY_SECONDS = metrics.Histogram('db_query_duration_seconds', 'cursor.execute time', ('route', 'statement'))
+RENDER_SECONDS = metrics.Histogram('template_render_seconds', 'Jinja render time', ('route', 'template'))
+
+def current_route():
+    return request.url_rule.rule if request and request.url_rule else 'none'
+
+def request_mode():
+    """index() 의 화면 종류. 라벨 값이 무한히 늘지 않도록 정해진 값만 씀."""
+    args = request.args
+    if args.get('q'):
+        return 'search'
+    if args.get('search_date'):
+        return 'date'
+    if args.get('start_date') or args.get('end_date'):
+        return 'range'
+    if args.get('mode') in ('all', 'trash'):
+        return args['mode']
+    return 'today' if request.path == '/' else '-'
+
+def record_query(query, params, elapsed):
+    route = current_route()
+    DB_QUERY_SECONDS.observe(elapsed, route, metrics.statement_label(query))
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        print(f"SLOW QUERY {elapsed * 1000:.1f}ms [{route}] {' '.join(query.split())[:500]} params={str(params)[:200]}")
+
+@app.context_processor
+def live_context():
+    return {'live_events': LIVE_EVENTS}
+
+def render_page(template_name, **context):
+    started = time.perf_counter()
+    try:
+        return render_template(template_name, **context)
+    finally:
+        RENDER_SECONDS.observe(time.perf_counter() - started, current_route(), template_name)
+
+def stream_page(template_name, on_complete=None, **context):
+    """템플릿을 STREAM_CHUNK_BYTES 단위로 나눠 렌더링하는 대로 보냅니다.
+
+    다 보낸 뒤 전체 본문(bytes)을 on_complete 에 넘깁니다 (페이지 캐시 저장용).
+    스트리밍 응답에는 ETag 가 없고, 캐시에 들어간 뒤의 요청부터 304 재검증이 됨.
+    """
+    route = current_route()
+    # stream_template 은 요청 컨텍스트를 붙잡아 두므로 LazyRows 를 다 읽을 때까지 DB 연결이 유지됨
+    pieces = stream_template(template_name, **context)
+
+    def generate():
+        started = time.perf_counter()
+        body, pending, pending_bytes = [], [], 0
+        for piece in pieces:
+            data = piece.encode('utf-8')
+            pending.append(data)
+            pending_bytes += len(data)
+            if pending_bytes >= STREAM_CHUNK_BYTES:
+                chunk = b''.join(pending)
+                body.append(chunk)
+                pending, pending_bytes = [], 0
+                yield chunk
+        chunk = b''.join(pending)
+        body.append(chunk)
+        yield chunk
+        RENDER_SECONDS.observe(time.perf_counter() - started, route, template_name)
+        if on_complete:
+            on_complete(b''.join(body))
+
+    return app.response_class(generate(), mimetype='text/html')
+
 def get_db_conn():
-    conn = getattr(g, '_database', None)
+    if reads_replica():
+        conn = g.get('_replica_timed')
+        if conn is None:
+            started = time.perf_counter()
+            raw = g._replica = get_sqlite_conn()
+            DB_CONNECT_SECONDS.observe(time.perf_counter() - started, 'sqlite-replica')
+            conn = g._replica_timed = metrics.TimedConnection(raw, record_query)
+        return conn
+    conn = getattr(g, '_database_timed', None)
     if conn is None:
+        started = time.perf_counter()
         if DATABASE_URL:
-            conn = g._database = psycopg.connect(DATABASE_URL)
-            conn.row_factory = psycopg.rows.dict_row
+            raw = g._database = get_pg_pool().getconn()
         else:
-            conn = g._database = sqlite3.connect(DATABASE)
-            conn.row_factory = sqlite3.Row
+            raw = g._database = get_sqlite_conn()
+        DB_CONNECT_SECONDS.observe(time.perf_counter() - started, 'postgresql' if DATABASE_URL else 'sqlite')
+        # 모든 cursor.execute 시간을 재는 래퍼 (원래 연결은 g._database 에 두고 반납/롤백에 사용)
+        conn = g._database_timed = metrics.TimedConnection(raw, record_query)
     return conn
 
 @app.teardown_appcontext
 def close_connection(exception):
-    conn = getattr(g, '_database', None)
-    if conn is not None:
-        conn.close()
+    g.pop('_database_timed', None)
+    g.pop('_replica_timed', None)
+    local = g.pop('_replica', None)
+    if local is not None and local.in_transaction:
+        local.rollback()
+    conn = g.pop('_database', None)
+    if conn is None:
+        return
+    if DATABASE_URL:
+        # 닫지 않고 풀에 반납 (진행 중인 트랜잭션은 풀이 롤백함)
+        get_pg_pool().putconn(conn)
+    elif conn.in_transaction:
+        conn.rollback()
+
+# --- 콜드 스타트 측정 (import 시작 → 첫 응답까지) ---
+STARTUP_STATS = {'pid': os.getpid(), 'import_seconds': None, 'first_response_seconds': None,
+                 'first_request_ttfb_seconds': None}
+
+@app.before_request
+def mark_request_start():
+    g._request_started = time.perf_counter()
+
+# --- DB 스키마 점검: import 시점이 아니라 워커의 첫 요청에서 1번만 ---
+# 배포 release 단계에서 `python schema.py` 를 돌린다면 SCHEMA_CHECK_ON_START=0 으로 꺼도 됨.
+SCHEMA_CHECK_ON_START = os.environ.get('SCHEMA_CHECK_ON_START', '1') != '0'
+_schema_checked = False
+_schema_lock = threading.Lock()
 
-# --- [수정됨] DB 스키마 자동 점검 및 업데이트 함수 ---
 def check_and_update_schema():
-    if not DATABASE_URL:
-        return "INFO: No DATABASE_URL found, skipping schema check (Local mode)."
+    """(성공 여부, 결과 메시지). 실패하면 다음 요청에서 다시 점검하도록 예외 대신 False."""
+    conn = get_db_conn()
+    try:
+        # schema_migrations 의 버전만 확인하고, 밀린 마이그레이션이 있을 때만 적용
+        return True, schema.upgrade_schema(conn, is_pg=bool(DATABASE_URL))
+    except Exception as e:
+        conn.rollback()
+        return False, f"❌ Schema check failed: {e}"
+
+@app.before_request
+def ensure_schema():
+    global _schema_checked
+    if _schema_checked or not SCHEMA_CHECK_ON_START:
+        return
+    with _schema_lock:
+        if not _schema_checked:
+            ok, result = check_and_update_schema()
+            print(f"INFO: Schema check result: {result}")
+            _schema_checked = ok
+
+READ_SOURCE_TOTAL = metrics.Counter('read_replica_requests_total', 'GET requests by the database they read from',
+                                    ('source',))
+
+@app.before_request
+def choose_read_source():
+    """읽기 복제본을 켠 경우: GET 은 복제본이 준비되어 있고 밀리지 않았으면 로컬에서 읽음."""
+    if read_replica is None:
+        return
+    read_replica.start()  # 워커의 첫 요청에서 (asgi.py 는 시작할 때) 전체 복사 시작
+    if request.method not in ('GET', 'HEAD') or request.path in PRIMARY_READ_PATHS:
+        return
+    g._on_replica = read_replica.readable()
+    READ_SOURCE_TOTAL.inc('replica' if g._on_replica else 'primary')
+
+_watching_pid = None
+_watch_lock = threading.Lock()
+
+def remote_changed(change):
+    """다른 워커의 쓰기 알림: 이 워커의 페이지 캐시와 요약에서 그 날짜만 지움 (구간 없는 알림이면 전부)."""
+    if change['ranges']:
+        invalidate_dates(*change['ranges'])
+    else:
+        page_cache.clear()
+        today_digest.invalidate([])
+
+def watch_remote_changes():
+    """Postgres 모드에서 워커마다 한 번 다른 워커의 쓰기 알림을 구독합니다 (SQLite 는 워커 하나).
+
+    읽기 복제본을 켰으면 알림을 복제본에 반영한 뒤에 비워서, 비운 직후 요청이 복제본의 옛 행을 다시 담지 않게 함.
+    """
+    global _watching_pid
+    if not DATABASE_URL or _watching_pid == os.getpid():
+        return
+    with _watch_lock:
+        if _watching_pid == os.getpid():
+            return
+        _watching_pid = os.getpid()
+    if read_replica is not None:
+        read_replica.add_listener(remote_changed)
+    else:
+        live.hub.subscribe(remote_changed, DATABASE_URL)
+
+@app.before_request
+def start_change_watch():
+    watch_remote_changes()
+
+def schema_check_pending():
+    """ensure_schema 가 아직 점검할 일이 남았는지 (asgi.py 의 비동기 라우트는 before_request 를 거치지 않음)."""
+    return SCHEMA_CHECK_ON_START and not _schema_checked
 
-    conn = None
+def mark_schema_checked():
+    """asgi.py 가 시작 시 스키마를 직접 점검했을 때 Flask 쪽 점검을 건너뛰게 합니다."""
+    global _schema_checked
+    _schema_checked = True
+
+@app.after_request
+def record_request_metrics(response):
+    route = current_route()
+    mode = request_mode()
+    REQUESTS_TOTAL.inc(route, mode, request.method, str(response.status_code))
+    started = g.get('_request_started')
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, route, mode)
+    return response
+
+@app.after_request
+def record_first_response(response):
+    if STARTUP_STATS['first_response_seconds'] is None:
+        now = time.perf_counter()
+        STARTUP_STATS['first_response_seconds'] = round(now - _IMPORT_STARTED, 4)
+        STARTUP_STATS['first_request_ttfb_seconds'] = round(now - g.get('_request_started', now), 4)
+        print(f"INFO: First response {STARTUP_STATS['first_response_seconds']}s after import "
+              f"(request itself {STARTUP_STATS['first_request_ttfb_seconds']}s)")
+    return response
+
+# --- 조회 로직을 동기(gunicorn)/비동기(asgi.py) 양쪽에서 쓰기 위한 쿼리 플랜 ---
+# 플랜은 (query, params) 를 yield 하고 그 결과 행 목록(fetchall)을 돌려받는 제너레이터이며,
+# 마지막에 return 한 값이 결과. 실행 중 오류는 플랜 안으로 throw 되어 try/except 로 처리 가능.
+# (query, params, True) 를 yield 하면 행 목록 대신 커서를 감싼 LazyRows 를 받음
+# (같은 커서를 계속 읽으므로 플랜의 마지막 쿼리여야 함).
+class LazyRows:
+    """템플릿이 반복하는 동안 커서에서 조금씩 읽는 행 목록. 첫 묶음만 미리 읽어 빈 목록인지 판단."""
+
+    def __init__(self, cursor, batch_size=100):
+        self._cursor = cursor
+        self._batch_size = batch_size
+        self._first = cursor.fetchmany(batch_size)
+
+    def __bool__(self):
+        return bool(self._first)
+
+    def __iter__(self):
+        rows = self._first
+        while rows:
+            yield from rows
+            rows = self._cursor.fetchmany(self._batch_size)
+
+def run_plan(cursor, plan, lazy=True):
+    rows = error = None
+    while True:
+        try:
+            step = plan.throw(error) if error else plan.send(rows)
+        except StopIteration as done:
+            return done.value
+        rows = error = None
+        try:
+            cursor.execute(step[0], step[1])
+            rows = LazyRows(cursor) if lazy and step[2:] == (True,) else cursor.fetchall()
+        except Exception as e:
+            error = e
+
+# --- 키셋(커서) 페이지네이션: ("EventDate", "ID") 기준 ---
+def encode_cursor(row):
+    return f"{row['EventDate'] or schema.UNDATED_SORT_DATE}|{row['ID']}"
+
+def decode_cursor(value):
+    if not value or '|' not in value:
+        return None
+    event_date, _, perf_id = value.partition('|')
+    return event_date, perf_id
+
+def get_page_size():
     try:
-        conn = psycopg.connect(DATABASE_URL)
-        cursor = conn.cursor()
-
-        # [수정됨] 1. 'approvalstatus' (소문자) 열이 DB에 존재하는지 확인
-        cursor.execute("""
-            SELECT 1 FROM information_schema.columns 
-            WHERE table_name='performances' AND column_name='approvalstatus'; 
-        """)
-
-        column_exists = cursor.fetchone()
-
-        if not column_exists:
-            # 2. 열이 없다면, 테이블 구조를 변경 (ApprovalStatus 열 추가)
-            print("WARNING: 'ApprovalStatus' column not found. Running migration...")
-            cursor.execute("""
-                ALTER TABLE "performances" 
-                ADD COLUMN "ApprovalStatus" TEXT DEFAULT '미승인',
-                ADD COLUMN "RejectionReason" TEXT;
-            """)
-            conn.commit()
-            return "✅ Schema updated successfully (ApprovalStatus added)."
-        else:
-            return "INFO: Database schema is up-to-date."
+        size = int(request.args.get('page_size', PAGE_SIZE))
+    except ValueError:
+        size = PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
 
-    except Exception as e:
-        if conn: conn.rollback()
-        # 테이블이 아예 없는 오류는 무시하고, migrate-db-now가 처리하게 둠.
-        if "relation \"performances\" does not exist" in str(e):
-            return "INFO: Table 'performances' not found. Will be created by migrate script."
-        return f"❌ Schema check failed: {e}"
-    finally:
-        if conn: conn.close()
-# --------------------------------------------------
+def keyset_page_plan(view, view_params, approval, descending, page_size):
+    """OFFSET 없이 (EventDate, ID) 인덱스를 따라 한 페이지만 읽습니다.
 
-# --- [수정됨] Vercel 앱 시작 시, DB 자동 점검 1회 실행 ---
-with app.app_context():
-    print("INFO: App startup detected. Checking schema...")
-    schema_result = check_and_update_schema()
-    print(f"INFO: Schema check result: {schema_result}")
-# --------------------------------------------------
+    after= 커서는 다음 페이지, before= 커서는 이전 페이지를 뜻합니다.
+    날짜를 못 읽은 행은 schema.UNDATED_SORT_DATE 로 보고 맨 뒤에 나오고,
+    ID가 비어 있는 행은 커서를 만들 수 없으므로 목록에서 제외됩니다.
+    (rows, prev_cursor, next_cursor) 를 돌려줍니다.
+    """
+    after = decode_cursor(request.args.get('after'))
+    before = decode_cursor(request.args.get('before'))
+
+    # 이전 페이지는 정렬 방향을 뒤집어 읽은 뒤 다시 뒤집음
+    backwards = before is not None and after is None
+    scan_desc = descending != backwards
+    key = after or before
+    rows = yield get_repo().keyset_page(view, view_params, approval, key, scan_desc, page_size + 1)
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return rows, None, None
+
+    if backwards:
+        prev_cursor = encode_cursor(rows[0]) if has_more else None
+        next_cursor = encode_cursor(rows[-1])
+    else:
+        prev_cursor = encode_cursor(rows[0]) if key else None
+        next_cursor = encode_cursor(rows[-1]) if has_more else None
+    return rows, prev_cursor, next_cursor
+
+# --- 신규 ID 할당 (schema.seed_id_allocator 로 만든 시퀀스/카운터 사용) ---
+def next_id_plan():
+    """다음에 나올 ID를 소모하지 않고 O(1)로 읽습니다 (화면 제안용 쿼리 플랜)."""
+    rows = yield get_repo().next_id()
+    return rows[0]['next_id']
+
+# --- 페이지 캐시 키/범위 및 조건부 응답(ETag / Last-Modified → 304) ---
+def get_cache_scope(today_str):
+    """현재 요청이 보여주는 날짜 구간. None 이면 어떤 쓰기에도 무효화되는 목록 화면."""
+    search_date = request.args.get('search_date')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    if request.args.get('q') and not (search_date or start_date or end_date):
+        return None  # 날짜 없는 검색 결과는 어느 날짜의 쓰기에도 바뀔 수 있음
+    if search_date:
+        day, _ = schema.parse_date_range(search_date)
+        return (day, day) if day else ('', '')
+    if start_date or end_date:
+        range_start, _ = schema.parse_date_range(start_date or end_date)
+        _, range_end = schema.parse_date_range(end_date or start_date)
+        return (range_start, range_end) if range_start else ('', '')
+    if request.args.get('mode') in ('all', 'trash'):
+        return None
+    return (today_str, today_str)
+
+def make_cached_response(entry):
+    response = make_response(entry['body'])
+    response.mimetype = 'text/html'
+    response.set_etag(entry['etag'])
+    response.last_modified = entry['last_modified']
+    response.cache_control.no_cache = True  # 브라우저는 매번 재검증 → 변경 없으면 304
+    return response.make_conditional(request)
+
+def refresh_counts(cursor, date_ranges):
+    """쓰기로 바뀐 날짜 구간의 달력 집계만 같은 트랜잭션 안에서 다시 계산합니다."""
+    for start, end in {(str(start), str(end or start)) for start, end in date_ranges if start}:
+        get_repo().refresh_daily_counts(cursor, start, end)
+
+def invalidate_dates(*date_ranges):
+    date_ranges = [(str(start) if start else None, str(end) if end else None) for start, end in date_ranges]
+    page_cache.invalidate(date_ranges)
+    today_digest.invalidate(date_ranges)
+
+def commit_changes(conn, cursor, ids, date_ranges):
+    """쓰기를 커밋하고, 페이지 캐시와 요약을 비우고, 열려 있는 실시간 화면(/events)에 바뀐 행을 알립니다.
+
+    Postgres 는 같은 트랜잭션 안의 NOTIFY 라 커밋될 때만 모든 워커에 전달되고,
+    SQLite 는 커밋 뒤 이 프로세스의 구독자에게만 전달됨.
+    """
+    payload = live.encode_change(ids, date_ranges)
+    if DATABASE_URL:
+        get_repo().notify(cursor, live.CHANNEL, payload)
+    conn.commit()
+    if read_replica is not None and read_replica.seeded:
+        # 리다이렉트된 다음 GET 이 복제본에서 방금 쓴 내용을 보도록 알림을 기다리지 않고 바로 반영
+        read_replica.apply_write(conn, get_sqlite_conn(), ids)
+    invalidate_dates(*date_ranges)
+    if not DATABASE_URL:
+        live.hub.dispatch(payload)
+
+def wants_json():
+    """화면의 fetch 요청(Accept: application/json)이나 JSON 본문이면 리다이렉트 대신 JSON 으로 응답."""
+    return request.is_json or request.accept_mimetypes.best == 'application/json'
+
+# --- 전문 검색 (제목/공연장/위치/비고, 접두어 일치, 관련도 순) ---
+APPROVAL_FILTERS = ('승인', '반려', '미승인')
+
+def search_page_plan(text, day_range, approval, page, page_size):
+    """검색어의 각 단어를 접두어로 모두 포함하는 행을 관련도 순으로 한 페이지 읽습니다.
+
+    (rows, has_next) 를 돌려줍니다. day_range 는 (시작일, 종료일) 또는 None.
+    """
+    terms = re.findall(r'\w+', text)[:8]
+    if not terms:
+        return [], False
+    rows = yield get_repo().search(terms, text, day_range, approval if approval in APPROVAL_FILTERS else None,
+                                   page_size + 1, (page - 1) * page_size)
+    return rows[:page_size], len(rows) > page_size
+
+def get_view_filter(today_str):
+    """index() 목록과 /export 가 공유하는 화면 조건. (view, 날짜 조건 값, 승인 상태 필터 또는 None)
+
+    view 는 'date' / 'range' / 'all' / 'trash' / 'today' (SQL 은 repository 가 view 별로 만듦).
+    performances 에는 진행 중인 일정만 있고, 휴지통(trash)은 보관 테이블만 읽음.
+    """
+    search_date = request.args.get('search_date')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    mode = request.args.get('mode')
+
+    # 날짜 조건은 구간 겹침 ("EventDate" <= 끝, "EventEndDate" >= 시작) 이라 (끝, 시작) 순서
+    # (기간 공연 '2025-01-09 ~ 2025-03-09' 도 그 사이 날짜에서 검색됨)
+    if search_date:
+        day, _ = schema.parse_date_range(search_date)
+        view, params = 'date', (day, day)
+    elif start_date or end_date:
+        range_start, _ = schema.parse_date_range(start_date or end_date)
+        _, range_end = schema.parse_date_range(end_date or start_date)
+        view, params = 'range', (range_end, range_start)
+    elif mode in ('all', 'trash'):
+        view, params = mode, ()
+    else:
+        view, params = 'today', (today_str, today_str)
+
+    approval = request.args.get('approval')
+    return view, params, approval if approval in APPROVAL_FILTERS else None
+
+def index_cache_key(today_str):
+    return (today_str,) + tuple(sorted(request.args.items(multi=True)))
 
-# (이하 app.py의 나머지 코드는 이전과 동일)
 @app.route('/')
 def index():
-    conn = get_db_conn()
-    cursor = conn.cursor()
     today_str = datetime.now().date().isoformat()
+    cache_key = index_cache_key(today_str)
+    # 안내 메시지가 있는 화면은 그 사람에게만 한 번 보이므로 캐시를 거치지 않음
+    uncached = bool(get_flashed_messages())
+    entry = page_cache.get(cache_key) if PAGE_CACHE_ENABLED and not uncached else None
+    if entry is None:
+        # 읽기 전에 받아 둠: 렌더링이 끝나기 전에 쓰기가 있었으면 put 이 저장하지 않음
+        generation = page_cache.generation()
+        context = digest_context(today_str)
+        if context is None:
+            context = run_plan(get_db_conn().cursor(), index_plan(today_str, lazy=STREAM_RENDER))
+        scope = get_cache_scope(today_str)
+        if STREAM_RENDER:
+            def store(body):
+                page_cache.put(cache_key, body, scope, generation)
+            return stream_page('index.html', on_complete=None if uncached else store, **context)
+        if uncached:
+            return render_page('index.html', **context)
+        entry = page_cache.put(cache_key, render_page('index.html', **context).encode('utf-8'), scope, generation)
+    return make_cached_response(entry)
+
+def uses_digest():
+    """주소 인자 없는 기본 화면(오늘의 공연)만 메모리 요약으로 그림."""
+    return DIGEST_ENABLED and not request.args
+
+def digest_index(today_str, entries, next_id):
+    """요약으로 만든 index.html 값 (index_plan 의 기본 화면과 같은 값)."""
+    return dict(performances=entries[today_str]['rows'],
+                today_str=today_str,
+                page_title=f"오늘의 공연 ({today_str})",
+                search_date_value=today_str,
+                next_id=next_id,
+                current_mode=None,
+                page_size=get_page_size(),
+                prev_cursor=None,
+                next_cursor=None,
+                text_query='',
+                approval=None,
+                search_page=1,
+                has_next_page=False,
+                live_scope=(today_str, today_str))
+
+def digest_context(today_str):
+    """요약이 준비되어 있으면 DB 연결 없이 만든 기본 화면 값, 아니면 None (index_plan 이 채움)."""
+    current = today_digest.current(today_str) if uses_digest() else None
+    return digest_index(today_str, *current) if current else None
+
+def index_plan(today_str, lazy=False):
+    """index.html 에 넘길 값을 만드는 쿼리 플랜 (run_plan / asgi.run_plan_async 로 실행).
+
+    lazy=True 면 날짜/기간 목록은 커서에서 읽는 대로 렌더링되도록 LazyRows 로 받습니다.
+    기본 화면은 요약(today_digest)에서 빠진 날/다음 ID 만 읽어 채운 뒤 요약으로 그립니다.
+    """
+    if uses_digest():
+        return digest_index(today_str, *(yield from today_digest.refresh_plan(get_repo(), today_str)))
     search_date = request.args.get('search_date')
     mode = request.args.get('mode')
     page_title = ""
-    query_params = ()
     display_date = None
-    placeholder = "%s" if DATABASE_URL else "?"
-
-    # (DB 열 이름은 PostgreSQL 대소문자 구분을 위해 큰따옴표 사용)
-    base_query = f"""
-        SELECT "ID", "Location", "Category", "Title", "Date", "Venue", "TeamSetup", "Notes", "Status", "ApprovalStatus", "RejectionReason"
-        FROM "performances"
-        WHERE ("Status" != 'Cancelled' OR "Status" IS NULL OR "Status" = '')
-    """
+    page_size = get_page_size()
+    prev_cursor = next_cursor = None
+    text_query = (request.args.get('q') or '').strip()
+    approval = request.args.get('approval')
+    try:
+        search_page = max(1, int(request.args.get('page', '1')))
+    except ValueError:
+        search_page = 1
+    has_next_page = False
 
-    if search_date:
-        page_title = f"'{search_date}' 검색 결과"
-        display_date = search_date
-        query = base_query + f' AND "Date" LIKE {placeholder} ORDER BY "ID"'
-        query_params = (f"%{search_date}%",)
-    elif mode == 'all':
-        page_title = "전체 공연 목록 (날짜순)"
-        display_date = ""
-        query = base_query + ' ORDER BY "Date" ASC'
-    elif mode == 'trash':
-        page_title = "🗑️ 휴지통 (삭제된 공연)"
-        query = base_query + " AND \"Status\" = 'Cancelled' ORDER BY \"Date\" DESC"
-    else:
-        page_title = f"오늘의 공연 ({today_str})"
-        display_date = today_str
-        query = base_query + f' AND "Date" LIKE {placeholder} ORDER BY "ID"'
-        query_params = (f"%{today_str}%",)
+    view, view_params, approval_filter = get_view_filter(today_str)
 
-    if query_params:
-        cursor.execute(query, query_params)
+    if text_query:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        day_range = None
+        if search_date:
+            day, _ = schema.parse_date_range(search_date)
+            day_range = (day, day)
+        elif start_date or end_date:
+            day_range = (schema.parse_date_range(start_date or end_date)[0],
+                         schema.parse_date_range(end_date or start_date)[1])
+        page_title = f"'{text_query}' 검색 결과"
+        display_date = search_date or ""
+        query = None
+        performances, has_next_page = yield from search_page_plan(text_query, day_range, approval,
+                                                                  search_page, page_size)
+    elif view in ('all', 'trash'):
+        if view == 'all':
+            page_title = "전체 공연 목록 (날짜순)"
+            display_date = ""
+        else:
+            page_title = "🗑️ 휴지통 (삭제된 공연)"
+        query = None
+        performances, prev_cursor, next_cursor = yield from keyset_page_plan(
+            view, view_params, approval_filter, view == 'trash', page_size)
     else:
-        cursor.execute(query)
-
-    performances = cursor.fetchall()
+        if view == 'date':
+            page_title = f"'{search_date}' 검색 결과"
+            display_date = search_date
+        elif view == 'range':
+            range_end, range_start = view_params[:2]
+            page_title = f"'{range_start} ~ {range_end}' 기간 검색 결과"
+            display_date = ""
+        else:
+            page_title = f"오늘의 공연 ({today_str})"
+            display_date = today_str
+        query, query_params = get_repo().list_view(view, view_params, approval_filter)
 
-    # --- 다음 ID 계산 (숫자만 필터링) ---
+    # --- 다음 ID 제안 (할당기에서 O(1)로 읽기, 실제 할당은 /add 에서) ---
+    # 목록을 LazyRows 로 받으면 커서를 계속 쓰므로 그보다 먼저 읽음
     try:
-        if DATABASE_URL: # PostgreSQL
-            cursor.execute('SELECT MAX(CAST("ID" AS INTEGER)) AS max_id FROM "performances" WHERE "ID" ~ \'^[0-9]+$\'')
-        else: # SQLite
-            cursor.execute('SELECT MAX(CAST(ID AS INTEGER)) AS max_id FROM performances WHERE ID GLOB \'[0-9]*\'')
-
-        max_id_result = cursor.fetchone()
-        next_id = (max_id_result['max_id'] or 0) + 1
+        next_id = yield from next_id_plan()
     except Exception as e:
         print(f"다음 ID 계산 중 오류: {e}")
         next_id = 1
 
-    return render_template('index.html',
-                           performances=performances,
-                           today_str=today_str,
-                           page_title=page_title,
-                           search_date_value=display_date,
-                           next_id=next_id,
-                           current_mode=mode)
+    if query is not None:
+        performances = yield query, query_params, lazy
+
+    return dict(performances=performances,
+                today_str=today_str,
+                page_title=page_title,
+                search_date_value=display_date,
+                next_id=next_id,
+                current_mode=mode,
+                page_size=page_size,
+                prev_cursor=prev_cursor,
+                next_cursor=next_cursor,
+                text_query=text_query,
+                approval=approval,
+                search_page=search_page,
+                has_next_page=has_next_page,
+                live_scope=get_cache_scope(today_str))
+
+# --- 모바일 위젯용 오늘/내일 요약 (today_digest 에서, ETag → 304) ---
+def widget_item(row):
+    return {'id': normalize_id(row['ID']), 'title': row['Title'], 'date': row['Date'], 'venue': row['Venue'],
+            'approval': row['ApprovalStatus'] or '미승인'}
+
+@app.route('/today.json')
+def today_widget():
+    today_str = datetime.now().date().isoformat()
+    current = today_digest.current(today_str)
+    if current is None:
+        current = run_plan(get_db_conn().cursor(), today_digest.refresh_plan(get_repo(), today_str))
+    entries, _ = current
+    days = []
+    for day, entry in entries.items():
+        performances = [widget_item(row) for row in entry['rows']]
+        days.append({'date': day, 'count': len(performances), 'pending': entry['pending'],
+                     'performances': performances})
+    response = jsonify({'today': days[0], 'tomorrow': days[1]})
+    response.add_etag()
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/add', methods=['POST'])
 def add_event():
-    new_id = request.form['id']
+    new_id = request.form.get('id', '').strip()
+    suggested_id = request.form.get('suggested_id', '').strip()
     location = request.form['location']
     category = request.form['category']
     title = request.form['title']
@@ -157,56 +719,542 @@ def add_event():
     team_setup = request.form['team_setup']
     notes = request.form['notes']
     event_type = request.form.get('event_type', 'Scheduled')
-    placeholder = "%s" if DATABASE_URL else "?"
+    event_date, event_end_date = schema.parse_date_range(date_str)
+    if not event_date:
+        # 날짜를 못 읽은 행은 어떤 날짜 화면에도 나오지 않으므로 넣지 않음 (upload.check_rows 와 같은 규칙)
+        return reject_add(f"날짜(Date)를 알 수 없습니다: {date_str or '(빈 값)'}")
 
-    query = f"""
-        INSERT INTO "performances" ("ID", "Location", "Category", "Title", "Date", "Venue", "TeamSetup", "Notes", "Status")
-        VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})
-    """
+    repo = get_repo()
     conn = get_db_conn()
     cursor = conn.cursor()
     try:
-        cursor.execute(query, (new_id, location, category, title, date_str, venue, team_setup, notes, event_type))
-        conn.commit()
+        # 제안된 ID를 그대로 쓰거나 비워두면 할당기에서 새로 받음 (동시 추가 시 충돌 방지)
+        if not new_id or new_id == suggested_id:
+            new_id = str(repo.allocate_id(cursor))
+        else:
+            # 직접 입력한 ID 는 /upload 처럼 이미 쓰이는 ID(보관된 취소 공연 포함)인지 먼저 확인
+            if new_id in {normalize_id(perf_id) for perf_id in repo.existing_ids(cursor, [new_id])}:
+                conn.rollback()
+                return reject_add(f"ID {new_id} 는 이미 있는 공연입니다.")
+            if new_id.isdigit():
+                # 직접 입력한 숫자 ID가 나중에 다시 할당되지 않도록 할당기를 그 값 이상으로 올림
+                repo.reserve_id(cursor, int(new_id))
+        repo.insert_performance(cursor, (new_id, location, category, title, date_str, venue, team_setup, notes,
+                                         event_type, event_date, event_end_date))
+        refresh_counts(cursor, [(event_date, event_end_date)])
+        found_conflicts = saved_conflicts(cursor, [new_id])
+        commit_changes(conn, cursor, [new_id], [(event_date, event_end_date)])
     except Exception as e:
+        conn.rollback()
         print(f"오류 발생: {e}")
-        pass
+        # 같은 ID 를 동시에 추가하면 existing_ids 확인은 둘 다 통과하고 유일 인덱스에서 걸림
+        if isinstance(e, sqlite3.IntegrityError) or getattr(e, 'sqlstate', None) == '23505':
+            return reject_add(f"ID {new_id} 는 이미 있는 공연입니다.")
+        if wants_json():
+            return jsonify({'ok': False, 'error': str(e)}), 500
+        return reject_add(f"공연을 추가하지 못했습니다: {e}")
+    if wants_json():
+        # 화면은 이 날짜가 지금 보고 있는 구간이면 그대로 두고(카드는 /events 로 도착) 아니면 url 로 이동
+        return jsonify({'ok': True, 'id': new_id, 'event_date': event_date, 'event_end_date': event_end_date,
+                        'url': url_for('index', search_date=date_str), 'conflicts': found_conflicts})
     return redirect(url_for('index', search_date=date_str))
 
+def reject_add(message):
+    """/add 입력 오류: 화면 폼(JSON)은 400 으로, 일반 폼 전송은 안내 메시지와 함께 원래 화면으로.
+
+    SECRET_KEY 가 없으면 flash 를 쓸 세션이 없으므로 안내 문구를 400 응답 본문으로 돌려줍니다.
+    """
+    if wants_json():
+        return jsonify({'ok': False, 'error': message}), 400
+    if not app.secret_key:
+        return message, 400, {'Content-Type': 'text/plain; charset=utf-8'}
+    flash(message)
+    return redirect(request.referrer or url_for('index'))
+
+# --- 상태 변경 액션 (단건 /update 와 일괄 /bulk-update 공용, SET 절은 repository.ACTION_SET) ---
+BULK_ACTIONS = ('approve', 'reject', 'reset_approval', 'cancel_performance', 'restore', 'change')
+# 취소/복구는 UPDATE 가 아니라 performances ↔ 보관 테이블 사이 이동
+MOVE_ACTIONS = {'cancel_performance': repository.Repository.archive, 'restore': repository.Repository.restore}
+
+def action_params(action, reason=None, new_date_str=None):
+    """액션의 SET 절 값을 (파라미터, 새 날짜 구간) 으로 바꿉니다. 적용할 수 없으면 None (MOVE_ACTIONS 포함)."""
+    if action in ('approve', 'reset_approval'):
+        return (), None
+    elif action == 'change':
+        event_date, event_end_date = schema.parse_date_range(new_date_str)
+        if not event_date:
+            return None
+        return (new_date_str, event_date, event_end_date), (event_date, event_end_date)
+    elif action == 'reject':
+        return (reason or '',), None
+    return None
+
+def normalize_id(value):
+    """예전 SQLite DB 의 REAL ID(4.0, 화면에 찍힌 '4.0')도 요청 값('4')과 비교할 수 있게 문자열로 맞춥니다."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value)
+    return value[:-2] if value.endswith('.0') and value[:-2].isdigit() else value
+
+app.jinja_env.filters['id_key'] = normalize_id  # 카드의 data-card (실시간 갱신 때 ID 로 찾음)
+
+# --- 오래된 보관 행 정리: 배포 때(python schema.py)만 돌면 배포가 뜸할 때 휴지통이 계속 쌓이므로
+# 공연을 취소(보관)할 때 워커마다 ARCHIVE_PURGE_INTERVAL 초에 한 번, 같은 트랜잭션에서 함께 지움
+ARCHIVE_PURGE_INTERVAL = float(os.environ.get('ARCHIVE_PURGE_INTERVAL', str(24 * 3600)))
+_last_archive_purge = None
+
+def purge_archive_if_due(cursor):
+    global _last_archive_purge
+    now = time.monotonic()
+    if _last_archive_purge is not None and now - _last_archive_purge < ARCHIVE_PURGE_INTERVAL:
+        return 0
+    _last_archive_purge = now
+    purged = get_repo().purge_archive(cursor)
+    if purged:
+        print(f"INFO: Purged {purged} archived rows older than {schema.ARCHIVE_RETENTION_DAYS} days.")
+    return purged
+
 @app.route('/update', methods=['POST'])
 def update_event():
-    id_to_update = request.form['id_to_update']
+    id_to_update = normalize_id(request.form['id_to_update'].strip())
     action = request.form['action']
+    repo = get_repo()
     conn = get_db_conn()
     cursor = conn.cursor()
-    placeholder = "%s" if DATABASE_URL else "?"
-
-    if action == 'cancel_performance':
-        query = f'UPDATE "performances" SET "Status" = \'Cancelled\' WHERE "ID" = {placeholder}'
-        cursor.execute(query, (id_to_update,))
-    elif action == 'reset_approval':
-        query = f'UPDATE "performances" SET "ApprovalStatus" = \'미승인\', "RejectionReason" = NULL WHERE "ID" = {placeholder}'
-        cursor.execute(query, (id_to_update,))
-    elif action == 'restore':
-        query = f'UPDATE "performances" SET "Status" = \'Scheduled\' WHERE "ID" = {placeholder}'
-        cursor.execute(query, (id_to_update,))
-    elif action == 'change':
-        new_date_str = request.form['new_date']
-        if new_date_str:
-            query = f'UPDATE "performances" SET "Date" = {placeholder} WHERE "ID" = {placeholder}'
-            cursor.execute(query, (new_date_str, id_to_update))
-    elif action == 'approve':
-        query = f'UPDATE "performances" SET "ApprovalStatus" = \'승인\', "RejectionReason" = NULL WHERE "ID" = {placeholder}'
-        cursor.execute(query, (id_to_update,))
-    elif action == 'reject':
-        reason = request.form.get('rejection_reason', '')
-        query = f'UPDATE "performances" SET "ApprovalStatus" = \'반려\', "RejectionReason" = {placeholder} WHERE "ID" = {placeholder}'
-        cursor.execute(query, (reason, id_to_update))
 
-    conn.commit()
+    affected = []
+    found_conflicts = []
+    if action in MOVE_ACTIONS:
+        moved = MOVE_ACTIONS[action](repo, cursor, [id_to_update])
+        affected = [(start, end) for _, start, end in moved]
+        refresh_counts(cursor, affected)
+        if action == 'cancel_performance':
+            purge_archive_if_due(cursor)
+    else:
+        # 캐시 무효화를 위해 바뀌기 전 날짜를 먼저 읽어둠
+        affected = [(start, end) for _, start, end in repo.row_dates(cursor, [id_to_update])]
+
+        update = action_params(action,
+                               reason=request.form.get('rejection_reason', ''),
+                               new_date_str=request.form.get('new_date'))
+        if update:
+            params, new_dates = update
+            repo.update_action(cursor, action, params, [id_to_update])
+            if new_dates:
+                affected.append(new_dates)
+                found_conflicts = saved_conflicts(cursor, [id_to_update])
+            refresh_counts(cursor, affected)
+
+    commit_changes(conn, cursor, [id_to_update], affected)
+    if wants_json():
+        return jsonify({'ok': True, 'action': action, 'conflicts': found_conflicts})
+    if action == 'restore':
+        return redirect(url_for('index', mode='trash'))
+    return redirect(request.referrer or url_for('index'))
+
+@app.route('/bulk-update', methods=['POST'])
+def bulk_update_events():
+    """여러 ID에 같은 액션을 한 번의 UPDATE / 한 트랜잭션으로 적용합니다.
+
+    JSON: {"ids": [...], "action": "approve", "rejection_reason": "...", "new_date": "YYYY-MM-DD"}
+    폼: ids (여러 개), action, rejection_reason, new_date
+    """
+    if request.is_json:
+        payload = request.get_json(silent=True) or {}
+        ids = payload.get('ids') or []
+        action = payload.get('action')
+        reason = payload.get('rejection_reason') or payload.get('reason')
+        new_date_str = payload.get('new_date')
+    else:
+        ids = request.form.getlist('ids')
+        action = request.form.get('action')
+        reason = request.form.get('rejection_reason')
+        new_date_str = request.form.get('new_date')
+
+    ids = list(dict.fromkeys(normalize_id(i).strip() for i in ids if str(i).strip()))
+    error = None
+    if not ids:
+        error = 'ids 가 비어 있습니다.'
+    elif action not in BULK_ACTIONS:
+        error = f'지원하지 않는 action 입니다: {action}'
+    elif action == 'reject' and not reason:
+        error = '반려 사유(rejection_reason)가 필요합니다.'
+    update = None if error else action_params(action, reason=reason, new_date_str=new_date_str)
+    if not error and update is None and action not in MOVE_ACTIONS:
+        error = f'날짜 형식을 알 수 없습니다: {new_date_str}'
+    if error:
+        if wants_json():
+            return jsonify({'ok': False, 'error': error}), 400
+        print(f"일괄 처리 오류: {error}")
+        return redirect(request.referrer or url_for('index'))
+
+    repo = get_repo()
+    conn = get_db_conn()
+    cursor = conn.cursor()
+    found_conflicts = []
+    try:
+        if action in MOVE_ACTIONS:
+            found = MOVE_ACTIONS[action](repo, cursor, ids)
+            affected = [(start, end) for _, start, end in found]
+            if action == 'cancel_performance':
+                purge_archive_if_due(cursor)
+        else:
+            params, new_dates = update
+            # 존재하는 행 확인 + 캐시 무효화용 기존 날짜 (Postgres 는 잠금까지)
+            found = repo.row_dates(cursor, ids, lock=True)
+            repo.update_action(cursor, action, params, ids)
+            affected = [(start, end) for _, start, end in found]
+            if new_dates:
+                affected.append(new_dates)
+                found_conflicts = saved_conflicts(cursor, ids)
+        refresh_counts(cursor, affected)
+        commit_changes(conn, cursor, ids, affected)
+    except Exception as e:
+        conn.rollback()
+        print(f"일괄 처리 중 오류: {e}")
+        if wants_json():
+            return jsonify({'ok': False, 'error': str(e)}), 500
+        return redirect(request.referrer or url_for('index'))
+
+    found_ids = {normalize_id(perf_id) for perf_id, _, _ in found}
+    results = [{'id': i, 'status': 'updated' if i in found_ids else 'not_found'} for i in ids]
+    if wants_json():
+        return jsonify({'ok': True, 'action': action,
+                        'updated': sum(1 for r in results if r['status'] == 'updated'),
+                        'results': results, 'conflicts': found_conflicts})
     if action == 'restore':
         return redirect(url_for('index', mode='trash'))
     return redirect(request.referrer or url_for('index'))
 
+# --- 새 공연 일괄 업로드 (CSV / XLSX, upload.py) ---
+@app.route('/upload', methods=['POST'])
+def upload_performances():
+    """multipart 의 file 을 검사해 한 트랜잭션으로 추가하고 행별 오류 보고서를 JSON 으로 돌려줍니다.
+
+    기본은 전부 아니면 전무(오류가 한 행이라도 있으면 아무것도 넣지 않음), skip_invalid=1 이면 통과한 행만.
+    ID 가 빈 행은 할당기에서 한 번에 받고, 파일에 적힌 숫자 ID 는 할당기를 그 이상으로 올림.
+    """
+    started = time.perf_counter()
+    file = request.files.get('file')
+    if file is None or not file.filename:
+        return jsonify({'ok': False, 'error': 'file 이 없습니다.'}), 400
+    try:
+        rows = upload.read_rows(file.stream, request.values.get('format') or upload.guess_format(file.filename))
+    except Exception as e:
+        return jsonify({'ok': False, 'error': f'파일을 읽지 못했습니다: {e}'}), 400
+    skip_invalid = request.values.get('skip_invalid') in ('1', 'true', 'on')
+
+    repo = get_repo()
+    conn = get_db_conn()
+    cursor = conn.cursor()
+    try:
+        given_ids = [values[0] for _, values in rows if values[0] is not None]
+        used_ids = {normalize_id(perf_id) for perf_id in repo.existing_ids(cursor, given_ids)}
+        errors = upload.check_rows(rows, used_ids)
+        report = [{'row': line, 'id': values[0], 'title': values[3], 'errors': errors[line]}
+                  for line, values in rows if line in errors]
+        valid = [values for line, values in rows if line not in errors]
+        if (errors and not skip_invalid) or not valid:
+            conn.rollback()
+            return jsonify({'ok': not errors, 'inserted': 0, 'rows': len(rows), 'errors': report}), \
+                400 if errors else 200
+
+        numeric_ids = [int(values[0]) for values in valid if values[0] is not None and values[0].isdigit()]
+        if numeric_ids:
+            repo.reserve_id(cursor, max(numeric_ids))  # 새로 받는 ID 가 파일의 ID 와 겹치지 않게 먼저
+        new_ids = iter(repo.allocate_ids(cursor, sum(1 for values in valid if values[0] is None)))
+        insert_rows = [upload.to_insert_row(values, values[0] if values[0] is not None else str(next(new_ids)))
+                       for values in valid]
+        repo.load_rows(cursor, insert_rows, repository.INSERT_COLUMNS)
+
+        ids = [row[0] for row in insert_rows]
+        date_index = repository.INSERT_COLUMNS.index("EventDate")
+        span = (min(row[date_index] for row in insert_rows), max(row[date_index + 1] for row in insert_rows))
+        refresh_counts(cursor, [span])  # 달력 집계는 전체 구간을 한 번에
+        found_conflicts = saved_conflicts(cursor, ids)
+        commit_changes(conn, cursor, ids, [span])
+    except Exception as e:
+        conn.rollback()
+        print(f"업로드 중 오류: {e}")
+        return jsonify({'ok': False, 'error': str(e)}), 500
+
+    elapsed = time.perf_counter() - started
+    print(f"업로드 완료: {len(ids)}행 추가, 오류 {len(report)}행 ({elapsed:.2f}초)")
+    return jsonify({'ok': True, 'inserted': len(ids), 'rows': len(rows), 'ids': ids, 'errors': report,
+                    'conflicts': found_conflicts, 'seconds': round(elapsed, 3)})
+
+# --- 현재 목록을 CSV / XLSX 로 내보내기 (index() 와 같은 날짜/mode/approval 조건) ---
+EXPORT_COLUMNS = schema.SHEET_COLUMNS + ("ApprovalStatus", "RejectionReason")
+EXPORT_FETCH_SIZE = int(os.environ.get('EXPORT_FETCH_SIZE', '2000'))
+
+@app.route('/export')
+def export_view():
+    """/export?format=csv|xlsx&mode=all 처럼 index() 의 주소에 format 만 붙여 씁니다.
+
+    Postgres 는 이름 있는(서버 측) 커서로 EXPORT_FETCH_SIZE 행씩 받아 전체 표도 일정한 메모리로 보냄.
+    """
+    file_format = request.args.get('format', 'csv')
+    if file_format not in export.FORMATS:
+        return jsonify({'ok': False, 'error': f'지원하지 않는 format 입니다: {file_format}'}), 400
+    today_str = datetime.now().date().isoformat()
+    view, view_params, approval = get_view_filter(today_str)
+
+    conn = get_db_conn()
+    cursor = conn.cursor(name='performances_export') if DATABASE_URL and not reads_replica() else conn.cursor()
+    cursor.execute(*get_repo().list_view(view, view_params, approval, columns=EXPORT_COLUMNS))
+    rows = export.iter_cursor(cursor, EXPORT_COLUMNS, EXPORT_FETCH_SIZE)
+    writer = export.stream_csv if file_format == 'csv' else export.stream_xlsx
+
+    response = app.response_class(stream_with_context(writer(rows, EXPORT_COLUMNS)),
+                                  content_type=export.FORMATS[file_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="performances-{view}-{today_str}.{file_format}"'
+    return response
+
+# --- 공연장/인원편성 중복 배정 경고 (막지는 않고 알려만 줌) ---
+CONFLICT_LOG_LIMIT = 10  # 일괄 변경/업로드에서 로그에 한 줄씩 남길 최대 건수
+
+def conflict_items(rows):
+    items = []
+    for row in rows:
+        item = {key: row[key] for key in row.keys()}
+        for key in ('id', 'other_id'):
+            if item.get(key) is not None:
+                item[key] = normalize_id(item[key])
+        item['message'] = conflicts.describe(item)
+        items.append(item)
+    return items
+
+def saved_conflicts(cursor, ids):
+    """방금 추가/날짜변경한 ids 가 다른 일정과 겹치는 공연장/인원편성 (커밋 전, 같은 트랜잭션에서)."""
+    cursor.execute(*get_repo().conflicts_for_ids(ids))
+    items = conflict_items(cursor.fetchall())
+    for item in items[:CONFLICT_LOG_LIMIT]:
+        print(f"중복 배정 경고 [{item['id']}]: {item['message']}")
+    if len(items) > CONFLICT_LOG_LIMIT:
+        print(f"중복 배정 경고 외 {len(items) - CONFLICT_LOG_LIMIT}건 (응답의 conflicts 참고)")
+    return items
+
+@app.route('/conflicts/check')
+def check_conflicts():
+    """추가 폼/날짜 변경 창이 저장 전에 부르는 확인.
+
+    /conflicts/check?date=2024-05-01&venue=...&team_setup=...
+    /conflicts/check?date=2024-05-01&id=977  (그 행의 공연장/인원편성으로, 자기 자신은 제외)
+    """
+    start, end = schema.parse_date_range(request.args.get('date', ''))
+    if not start:
+        return jsonify({'ok': False, 'error': '날짜 형식을 알 수 없습니다.'}), 400
+    perf_id = normalize_id(request.args.get('id', '').strip())
+    venue = conflicts.resource_value(request.args.get('venue'))
+    team_setup = conflicts.resource_value(request.args.get('team_setup'))
+
+    repo = get_repo()
+    cursor = get_db_conn().cursor()
+    if perf_id and not (venue or team_setup):
+        cursor.execute(*repo.resources([perf_id]))
+        row = cursor.fetchone()
+        if row:
+            venue, team_setup = conflicts.resource_value(row['Venue']), conflicts.resource_value(row['TeamSetup'])
+    cursor.execute(*repo.conflicts(venue, team_setup, start, end, [perf_id] if perf_id else []))
+    return jsonify({'ok': True, 'conflicts': conflict_items(cursor.fetchall())})
+
+@app.route('/conflicts')
+def conflicts_report():
+    """전체 일정의 중복 배정 보고서. ?from=YYYY-MM-DD 면 그날 이후 일정만, ?format=csv 면 파일로."""
+    from_day = schema.parse_date_range(request.args.get('from', ''))[0]
+    cursor = get_db_conn().cursor()
+    started = time.perf_counter()
+    cursor.execute(*get_repo().conflict_scan(from_day))
+    scanned = cursor.fetchall()
+    report = [dict(zip(conflicts.REPORT_COLUMNS, row)) for row in conflicts.report_rows(scanned)]
+    for item in report:
+        item['id'], item['other_id'] = normalize_id(item['id']), normalize_id(item['other_id'])
+
+    if request.args.get('format') == 'csv':
+        rows = (tuple(item.values()) for item in report)
+        response = app.response_class(export.stream_csv(rows, conflicts.REPORT_COLUMNS),
+                                      content_type=export.FORMATS['csv'])
+        response.headers['Content-Disposition'] = 'attachment; filename="conflicts.csv"'
+        return response
+    return jsonify({'ok': True, 'scanned': len(scanned), 'count': len(report),
+                    'seconds': round(time.perf_counter() - started, 4), 'conflicts': report})
+
+# --- 실시간 갱신: 열어 둔 화면에 바뀐 카드만 보내기 (Server-Sent Events) ---
+# 화면은 index() 와 같은 주소 인자로 /events 를 열어 두고, 받은 카드 HTML 로 제자리에서 바꿈.
+# 날짜 화면(오늘/날짜/기간)은 새로 들어온 행도 추가하고, 목록 화면(전체/휴지통/검색)은
+# 이미 보이는 카드만 바꾸거나 지움 (페이지/관련도 순서는 새로고침해야 맞춰짐).
+class LiveView:
+    """/events 구독 한 건이 보고 있는 화면. 요청 컨텍스트 안에서 만듭니다."""
+
+    def __init__(self, today_str):
+        self.view, _, self.approval = get_view_filter(today_str)
+        self.search = bool((request.args.get('q') or '').strip())
+        self.scope = get_cache_scope(today_str)
+        self.inserts = self.view in repository.DATE_VIEWS and not self.search
+
+    def wants(self, change):
+        return live.overlaps(self.scope, change['ranges'])
+
+    def rows_plan(self, change):
+        rows = yield get_repo().rows_by_ids(self.view, change['ids'])
+        return rows
+
+    def _shows(self, row):
+        if self.approval and (row['ApprovalStatus'] or '미승인') != self.approval:
+            return False
+        return live.overlaps(self.scope, [(str(row['EventDate']), str(row['EventEndDate'] or row['EventDate']))]
+                             if row['EventDate'] else [])
+
+    def messages(self, change, rows):
+        """바뀐 ID 마다 ('upsert', 카드 HTML) 또는 ('remove', ID). ids 가 없으면 새로고침 안내."""
+        if change['ids'] is None:
+            return [live.format_event('reload', {})]
+        found = {normalize_id(row['ID']): row for row in rows}
+        messages = []
+        for perf_id in change['ids']:
+            key = normalize_id(perf_id)
+            row = found.get(key)
+            if row is None or not self._shows(row):
+                messages.append(live.format_event('remove', {'id': key}))
+            else:
+                html = render_template('_card.html', p=row, in_trash=self.view == 'trash')
+                messages.append(live.format_event('upsert', {'id': key, 'insert': self.inserts, 'html': html}))
+        return messages
+
+@contextlib.contextmanager
+def short_connection():
+    """g 에 묶지 않고 잠깐 빌려 쓰는 연결 (몇 시간씩 열려 있는 /events 스트림이 풀을 붙잡지 않도록)."""
+    if DATABASE_URL:
+        with get_pg_pool().connection() as conn:
+            yield metrics.TimedConnection(conn, record_query)
+        return
+    conn = get_sqlite_conn()
+    try:
+        yield metrics.TimedConnection(conn, record_query)
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+
+@app.route('/events')
+def live_events():
+    """/events?search_date=2025-03-01 처럼 index() 의 주소 인자로 엽니다 (text/event-stream).
+
+    비동기 모드(asgi.py)에서는 이 경로를 이벤트 루프에서 직접 처리함.
+    여기(동기 워커)서는 LIVE_STREAM_MAX_SECONDS 뒤 스트림을 닫아 워커를 돌려주고 브라우저가 다시 연결함.
+    """
+    view = LiveView(datetime.now().date().isoformat())
+    subscription = live.Subscription()
+    unsubscribe = live.hub.subscribe(subscription.put, DATABASE_URL)
+    deadline = time.monotonic() + LIVE_STREAM_MAX_SECONDS
+
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            while (remaining := deadline - time.monotonic()) > 0:
+                change = subscription.get(timeout=min(remaining, live.KEEPALIVE_SECONDS))
+                if change is None:
+                    yield ': keepalive\n\n'
+                    continue
+                if not view.wants(change):
+                    continue
+                rows = []
+                if change['ids']:
+                    with short_connection() as conn:
+                        rows = run_plan(conn.cursor(), view.rows_plan(change), lazy=False)
+                yield ''.join(view.messages(change, rows))
+        finally:
+            unsubscribe()
+
+    return app.response_class(stream_with_context(generate()), mimetype='text/event-stream',
+                              headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# --- 월/주 달력 (일별 집계 테이블에서 최대 42행만 읽음) ---
+@app.route('/calendar')
+def calendar_view():
+    return render_page('calendar.html', **run_plan(get_db_conn().cursor(), calendar_plan()))
+
+def calendar_plan():
+    today = datetime.now().date()
+    week = request.args.get('week')
+    if week:
+        anchor = date.fromisoformat(schema.parse_date_range(week)[0] or today.isoformat())
+        first_day = anchor - timedelta(days=(anchor.weekday() + 1) % 7)  # 일요일 시작
+        days = [first_day + timedelta(days=i) for i in range(7)]
+        title = f"{days[0].isoformat()} ~ {days[-1].isoformat()} 주간"
+        prev_args = {'week': (first_day - timedelta(days=7)).isoformat()}
+        next_args = {'week': (first_day + timedelta(days=7)).isoformat()}
+    else:
+        try:
+            year, month = map(int, request.args.get('month', today.strftime('%Y-%m')).split('-')[:2])
+            date(year, month, 1)
+        except ValueError:
+            year, month = today.year, today.month
+        days = list(calendar.Calendar(firstweekday=6).itermonthdates(year, month))
+        title = f"{year}년 {month}월"
+        prev_month = date(year, month, 1) - timedelta(days=1)
+        next_month = date(year, month, 28) + timedelta(days=4)
+        prev_args = {'month': prev_month.strftime('%Y-%m')}
+        next_args = {'month': next_month.strftime('%Y-%m')}
+
+    rows = yield get_repo().daily_counts(days[0].isoformat(), days[-1].isoformat())
+    counts = {str(row['day']): row for row in rows}
+
+    weeks = [days[i:i + 7] for i in range(0, len(days), 7)]
+    return dict(title=title,
+                weeks=weeks,
+                counts=counts,
+                current_month=None if week else month,
+                today=today,
+                prev_args=prev_args,
+                next_args=next_args)
+
+@app.route('/stats/pool')
+def pool_stats():
+    return jsonify(get_pool_stats())
+
+@app.route('/healthz')
+def healthz():
+    """풀에서 빌린 연결로 SELECT 1 을 해 보고 풀 통계와 함께 돌려줍니다 (실패하면 503)."""
+    try:
+        get_db_conn().cursor().execute('SELECT 1')
+    except Exception as e:
+        return jsonify({'ok': False, 'error': str(e), 'pool': get_pool_stats()}), 503
+    return jsonify({'ok': True, 'pool': get_pool_stats()})
+
+metrics.Gauge('db_pool', 'Connection pool statistics (psycopg_pool get_stats)', ('stat',),
+              callback=lambda: {(k,): v for k, v in get_pool_stats().items() if isinstance(v, (int, float))})
+metrics.Gauge('page_cache', 'Rendered page cache statistics', ('stat',),
+              callback=lambda: {(k,): v for k, v in page_cache.stats().items()})
+metrics.Gauge('today_digest', 'Today/tomorrow digest (digest.py) statistics', ('stat',),
+              callback=lambda: {(k,): v for k, v in today_digest.stats().items()})
+metrics.Gauge('live_events', 'Live update (SSE) subscribers in this worker', ('stat',),
+              callback=lambda: {(k,): int(v) for k, v in live.hub.stats().items()})
+metrics.Gauge('read_replica', 'Local SQLite read replica (replica.py) state and lag', ('stat',),
+              callback=lambda: {(k,): float(v) for k, v in read_replica.stats().items()
+                                if isinstance(v, (int, float))} if read_replica else {})
+metrics.Gauge('startup_seconds', 'Cold start timings', ('stage',),
+              callback=lambda: {(k,): v for k, v in STARTUP_STATS.items() if k != 'pid'})
+
+@app.route('/metrics')
+def metrics_endpoint():
+    response = make_response(metrics.render_all())
+    response.mimetype = 'text/plain'
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
+
+@app.route('/stats/replica')
+def replica_stats():
+    return jsonify(read_replica.stats() if read_replica else {'enabled': False})
+
+@app.route('/stats/startup')
+def startup_stats():
+    return jsonify(STARTUP_STATS)
+
+@app.route('/stats/cache')
+def cache_stats():
+    return jsonify({**page_cache.stats(), 'digest': today_digest.stats()})
+
+STARTUP_STATS['import_seconds'] = round(time.perf_counter() - _IMPORT_STARTED, 4)
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,234 @@
+import asyncio
+import io
+import os
+import time
+from datetime import datetime
+
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from flask import get_flashed_messages, session
+
+import app as flask_app
+import live
+import metrics
+import repository
+from app import app
+
+# --- 비동기 서버 모드 (uvicorn asgi:application) ---
+# 조회가 대부분인 GET / 와 GET /calendar 는 psycopg 비동기 커넥션 풀로 처리해서
+# 원격 Postgres 왕복을 기다리는 동안 한 프로세스가 다른 요청을 계속 받음.
+# 나머지 경로(쓰기, /metrics, /stats/*)는 기존 Flask 앱을 그대로 WsgiToAsgi 로 감싸서 실행.
+# 쿼리와 화면 값은 app.py 의 쿼리 플랜(index_plan, calendar_plan)을 그대로 공유하므로
+# 동기 모드(gunicorn app:app)와 결과가 같음.
+#
+#   동기:   gunicorn app:app --bind 0.0.0.0:8000
+#   비동기: uvicorn asgi:application --host 0.0.0.0 --port 8000
+#
+# SQLite 에는 비동기 드라이버가 없으므로 같은 플랜을 스레드에서 실행함 (로컬 개발용).
+#
+# 실시간 갱신(/events)도 여기서 직접 처리함: WsgiToAsgi 는 WSGI 앱을 스레드 하나에서 돌리므로
+# 몇 시간씩 열려 있는 스트림을 거기에 맡기면 나머지 동기 경로가 모두 막힘.
+flask_app.LIVE_EVENTS = os.environ.get('LIVE_EVENTS', '1') != '0'  # 화면에 EventSource 를 넣음
+ASYNC_DB_POOL_MAX_SIZE = int(os.environ.get('ASYNC_DB_POOL_MAX_SIZE', str(flask_app.DB_POOL_MAX_SIZE)))
+
+ASYNC_ROUTES = {
+    '/': ('index.html', flask_app.index_plan),
+    '/calendar': ('calendar.html', flask_app.calendar_plan),
+}
+
+_async_pool = None
+wsgi_application = WsgiToAsgi(app)
+
+
+async def open_async_pool():
+    global _async_pool
+    if flask_app.DATABASE_URL and _async_pool is None:
+        from psycopg_pool import AsyncConnectionPool
+        _async_pool = AsyncConnectionPool(
+            flask_app.DATABASE_URL,
+            min_size=flask_app.DB_POOL_MIN_SIZE,
+            max_size=ASYNC_DB_POOL_MAX_SIZE,
+            max_idle=flask_app.DB_POOL_MAX_IDLE,
+            timeout=flask_app.DB_POOL_TIMEOUT,
+            check=AsyncConnectionPool.check_connection,
+            kwargs=repository.pg_connect_kwargs(),
+            name='performances-async',
+            open=False,
+        )
+        await _async_pool.open()
+
+
+async def close_async_pool():
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
+
+
+def check_schema_on_start():
+    if not flask_app.SCHEMA_CHECK_ON_START:
+        return
+    with app.app_context():
+        ok, result = flask_app.check_and_update_schema()
+        print(f"INFO: Schema check result: {result}")
+    if ok:  # 실패했으면 Flask 쪽 ensure_schema 가 첫 요청에서 다시 점검
+        flask_app.mark_schema_checked()
+
+
+def ensure_schema_in_thread():
+    with app.app_context():
+        flask_app.ensure_schema()
+
+
+async def run_plan_async(plan):
+    """app.run_plan 의 비동기판: 플랜이 내는 쿼리를 비동기 커서로 실행합니다."""
+    if _async_pool is None or flask_app.reads_replica():
+        # SQLite (또는 읽기 복제본): 같은 플랜을 워커 스레드에서 동기 커서로 실행 (스레드마다 WAL 연결 하나)
+        def run_in_thread():
+            conn = metrics.TimedConnection(flask_app.get_sqlite_conn(), flask_app.record_query)
+            try:
+                return flask_app.run_plan(conn.cursor(), plan, lazy=False)
+            finally:
+                conn.rollback()
+        return await asyncio.to_thread(run_in_thread)
+
+    started = time.perf_counter()
+    async with _async_pool.connection() as conn:
+        flask_app.DB_CONNECT_SECONDS.observe(time.perf_counter() - started, 'postgresql-async')
+        async with conn.cursor() as cursor:
+            rows = error = None
+            while True:
+                try:
+                    step = plan.throw(error) if error else plan.send(rows)
+                except StopIteration as done:
+                    return done.value
+                rows = error = None
+                started = time.perf_counter()
+                try:
+                    await cursor.execute(step[0], step[1])
+                    rows = await cursor.fetchall()
+                except Exception as e:
+                    error = e
+                finally:
+                    flask_app.record_query(step[0], step[1], time.perf_counter() - started)
+
+
+def build_environ(scope):
+    """asgiref 의 변환 규칙 그대로 ASGI scope → WSGI environ (본문 없는 GET 용)."""
+    instance = WsgiToAsgiInstance(app)
+    instance.scope = scope
+    return instance.build_environ(scope, io.BytesIO())
+
+
+async def handle_async_route(scope, receive, send, template_name, plan_factory):
+    if flask_app.schema_check_pending():
+        # Flask 의 before_request(ensure_schema)를 거치지 않으므로 시작 시 점검이 실패했으면 여기서 다시
+        await asyncio.to_thread(ensure_schema_in_thread)
+    environ = build_environ(scope)
+    # Flask 의 request/g 는 contextvars 기반이라 요청(태스크)마다 따로 유지됨
+    with app.request_context(environ):
+        started = time.perf_counter()
+        flask_app.choose_read_source()
+        if template_name == 'index.html':
+            today_str = datetime.now().date().isoformat()
+            cache_key = flask_app.index_cache_key(today_str)
+            uncached = bool(get_flashed_messages())  # app.index 와 같음: 안내 메시지가 있으면 캐시 안 씀
+            entry = flask_app.page_cache.get(cache_key) if flask_app.PAGE_CACHE_ENABLED and not uncached else None
+            if entry is None:
+                generation = flask_app.page_cache.generation()  # app.index 와 같음: 읽는 도중 쓰기가 있으면 저장 안 함
+                context = flask_app.digest_context(today_str) or await run_plan_async(plan_factory(today_str))
+                html = flask_app.render_page(template_name, **context)
+                if uncached:
+                    response = app.response_class(html, mimetype='text/html')
+                    # 꺼낸 메시지가 다시 보이지 않도록 세션 쿠키를 갱신 (Flask 의 process_response 대신)
+                    app.session_interface.save_session(app, session, response)
+                else:
+                    entry = flask_app.page_cache.put(cache_key, html.encode('utf-8'),
+                                                     flask_app.get_cache_scope(today_str), generation)
+            if entry is not None:
+                response = flask_app.make_cached_response(entry)
+        else:
+            html = flask_app.render_page(template_name, **await run_plan_async(plan_factory()))
+            response = app.response_class(html, mimetype='text/html')
+
+        route, mode = flask_app.current_route(), flask_app.request_mode()
+        flask_app.REQUESTS_TOTAL.inc(route, mode, scope['method'], str(response.status_code))
+        flask_app.REQUEST_SECONDS.observe(time.perf_counter() - started, route, mode)
+
+        body = b'' if scope['method'] == 'HEAD' else response.get_data()
+        headers = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response.headers.items()]
+    await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def handle_live_events(scope, receive, send):
+    """app.live_events 의 비동기판. 연결이 끊길 때까지 바뀐 카드를 SSE 로 보냅니다."""
+    environ = build_environ(scope)
+    with app.request_context(environ):
+        view = flask_app.LiveView(datetime.now().date().isoformat())
+    subscription = live.AsyncSubscription(asyncio.get_running_loop())
+    unsubscribe = live.hub.subscribe(subscription.put, flask_app.DATABASE_URL)
+
+    async def wait_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    disconnected = asyncio.ensure_future(wait_disconnect())
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream; charset=utf-8'),
+                                (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]})
+        await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n', 'more_body': True})
+        while not disconnected.done():
+            next_change = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait({next_change, disconnected}, timeout=live.KEEPALIVE_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if next_change not in done:
+                next_change.cancel()
+                if not disconnected.done():
+                    await send({'type': 'http.response.body', 'body': b': keepalive\n\n', 'more_body': True})
+                continue
+            change = next_change.result()
+            if not view.wants(change):
+                continue
+            rows = await run_plan_async(view.rows_plan(change)) if change['ids'] else []
+            with app.request_context(environ):
+                body = ''.join(view.messages(change, rows)).encode('utf-8')
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    finally:
+        unsubscribe()
+        disconnected.cancel()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                await open_async_pool()
+                await asyncio.to_thread(check_schema_on_start)
+                if flask_app.read_replica:
+                    flask_app.read_replica.start()  # 첫 요청 전에 전체 복사 시작 (끝날 때까지는 Postgres 에서 읽음)
+                flask_app.watch_remote_changes()
+            except Exception as e:
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_async_pool()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] == 'http' and scope.get('path') == '/events':
+        return await handle_live_events(scope, receive, send)
+    route = ASYNC_ROUTES.get(scope.get('path')) if scope['type'] == 'http' else None
+    if route and scope['method'] in ('GET', 'HEAD'):
+        return await handle_async_route(scope, receive, send, *route)
+    return await wsgi_application(scope, receive, send)
+
+
+metrics.Gauge('db_async_pool', 'Async connection pool statistics (psycopg_pool get_stats)', ('stat',),
+              callback=lambda: {(k,): v for k, v in _async_pool.get_stats().items()} if _async_pool else {})
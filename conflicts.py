@@ -0,0 +1,49 @@
+# --- 공연장 / 인원편성 중복 배정 (같은 날 같은 Venue 또는 TeamSetup) ---
+# 한 건 확인(추가/날짜변경)은 repository 의 인덱스 조회로 하고,
+# 전체 일정 보고서는 표를 한 번 읽어 여기서 (값, 시작일) 순으로 훑어 겹치는 쌍을 찾음.
+CONFLICT_KEYS = ('Venue', 'TeamSetup')
+KIND_LABELS = {'Venue': '공연장', 'TeamSetup': '인원편성'}
+REPORT_COLUMNS = ('kind', 'value', 'overlap_start', 'overlap_end',
+                  'id', 'title', 'date', 'other_id', 'other_title', 'other_date')
+
+
+def resource_value(value):
+    """비교할 공연장/인원편성 값. 빈 값은 어떤 일정과도 겹치지 않는 것으로 봄.
+
+    쿼리 쪽 schema.RESOURCE_SQL(TRIM) 과 같게 앞뒤 공백(' ')만 뺌."""
+    if value is None:
+        return None
+    return str(value).strip(' ') or None
+
+
+def find_overlaps(rows, key):
+    """key 열 값이 같고 날짜 구간이 겹치는 행 쌍을 (앞 행, 뒤 행, 겹침 시작일, 겹침 종료일) 로 냅니다.
+
+    (값, 시작일) 순으로 정렬한 뒤 한 번 훑으면서 아직 끝나지 않은 행만 들고 다니므로
+    같은 값의 일정이 서로 겹치지 않으면 행 수에 비례하는 시간으로 끝남.
+    """
+    ordered = sorted(((resource_value(row[key]), str(row['EventDate']), str(row['EventEndDate'] or row['EventDate']),
+                       row) for row in rows if row['EventDate'] and resource_value(row[key])),
+                     key=lambda item: item[:2])
+    current, active = None, []
+    for value, start, end, row in ordered:
+        if value != current:
+            current, active = value, []
+        active = [(other_end, other) for other_end, other in active if other_end >= start]
+        for other_end, other in active:
+            yield other, row, start, min(end, other_end)
+        active.append((end, row))
+
+
+def report_rows(rows):
+    """전체 일정 보고서의 행 (REPORT_COLUMNS 순서). rows 는 두 번 훑으므로 목록이어야 함."""
+    for key in CONFLICT_KEYS:
+        for first, second, start, end in find_overlaps(rows, key):
+            yield (key, resource_value(first[key]), start, end,
+                   first['ID'], first['Title'], first['Date'], second['ID'], second['Title'], second['Date'])
+
+
+def describe(conflict):
+    """화면 경고 문구 한 줄."""
+    return (f"같은 날 {KIND_LABELS[conflict['kind']]} '{conflict['value']}' 사용: "
+            f"[{conflict['other_id']}] {conflict['other_title']} ({conflict['other_date']})")
@@ -0,0 +1,101 @@
+import threading
+import time
+from datetime import date, timedelta
+
+# --- 오늘/내일 공연 요약 (기본 화면 "오늘의 공연" 과 /today.json 위젯) ---
+# 두 날의 목록과 다음 ID 제안을 워커 메모리에 들고 있다가 화면은 DB 없이 바로 그림.
+#   날짜가 바뀌면 어제의 "내일" 을 오늘로 그대로 쓰고 새 내일만 읽음
+#   쓰기(이 워커는 커밋 직후, 다른 워커는 live.hub 알림)는 바뀐 날짜 구간과 겹치는 날만 지워서
+#   다음 요청이 그날 목록만 다시 읽음 (다음 ID 는 어떤 쓰기에든 다시 읽음)
+#   알림이 닿지 않는 외부 쓰기(SQLite 에서 다른 프로세스의 migrate_to_db.py 등)는 max_age 로 한정
+DAYS = 2  # 오늘, 내일
+
+
+def is_pending(row):
+    """'미승인' 필터(?approval=미승인)에 걸리는 행 (승인 상태가 비어 있는 행 포함)."""
+    return (row['ApprovalStatus'] or '미승인') == '미승인'
+
+
+class Digest:
+    """워커 프로세스 하나의 요약. 채우기는 refresh_plan 을 run_plan / asgi.run_plan_async 로 실행."""
+
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self._days = {}         # 'YYYY-MM-DD' → {'rows': [...], 'pending': n, 'loaded': monotonic}
+        self._next_id = None    # (값, monotonic)
+        self._lock = threading.Lock()
+        self._invalidations = 0  # 읽는 도중 무효화되면 읽은 값을 저장하지 않도록 (쓰기 전 스냅샷일 수 있음)
+        self.hits = 0
+        self.loads = 0           # 날 하나 / 다음 ID 하나를 DB 에서 읽은 횟수
+
+    @staticmethod
+    def days(today_str):
+        today = date.fromisoformat(today_str)
+        return [(today + timedelta(days=offset)).isoformat() for offset in range(DAYS)]
+
+    def _fresh(self, entry):
+        return entry is not None and time.monotonic() - entry['loaded'] <= self.max_age
+
+    def current(self, today_str):
+        """다 준비되어 있으면 ({날: 항목}, 다음 ID), 아니면 None (DB 를 건드리지 않음). 지난 날은 여기서 버림."""
+        days = self.days(today_str)
+        with self._lock:
+            for day in [d for d in self._days if d < days[0]]:
+                del self._days[day]
+            entries = {day: self._days.get(day) for day in days}
+            if not self._fresh(self._next_id) or not all(map(self._fresh, entries.values())):
+                return None
+            self.hits += 1
+            return entries, self._next_id['value']
+
+    def refresh_plan(self, repo, today_str):
+        """빠졌거나 오래된 날의 목록과 (필요하면) 다음 ID 만 읽는 쿼리 플랜. ({날: 항목}, 다음 ID) 를 돌려줌."""
+        entries = {}
+        for day in self.days(today_str):
+            with self._lock:
+                entry, started = self._days.get(day), self._invalidations
+            if not self._fresh(entry):
+                # 'today' 화면과 같은 조건/정렬 (그날에 걸친 공연)
+                rows = list((yield repo.list_view('today', (day, day))))
+                entry = {'rows': rows, 'pending': sum(1 for row in rows if is_pending(row)),
+                         'loaded': time.monotonic()}
+                with self._lock:
+                    self.loads += 1
+                    if self._invalidations == started:
+                        self._days[day] = entry
+            entries[day] = entry
+        with self._lock:
+            next_id, started = self._next_id, self._invalidations
+        if not self._fresh(next_id):
+            try:
+                rows = yield repo.next_id()
+            except Exception as e:
+                print(f"다음 ID 계산 중 오류: {e}")
+                return entries, 1  # index_plan 과 같은 대체값 (저장하지 않음)
+            next_id = {'value': rows[0]['next_id'], 'loaded': time.monotonic()}
+            with self._lock:
+                self.loads += 1
+                if self._invalidations == started:
+                    self._next_id = next_id
+        return entries, next_id['value']
+
+    def invalidate(self, date_ranges):
+        """쓰기로 바뀐 (시작일, 종료일) 구간과 겹치는 날을 지웁니다. 구간이 없으면(알 수 없으면) 전부.
+
+        다음 ID 는 어느 날짜의 쓰기든 바뀔 수 있으므로 항상 지움."""
+        date_ranges = [(str(start), str(end or start)) for start, end in date_ranges if start]
+        with self._lock:
+            for day in list(self._days):
+                if not date_ranges or any(start <= day <= end for start, end in date_ranges):
+                    del self._days[day]
+            self._next_id = None
+            self._invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            stats = {'hits': self.hits, 'loads': self.loads, 'invalidations': self._invalidations,
+                     'days': len(self._days), 'max_age': self.max_age}
+            for offset, day in enumerate(sorted(self._days)[:DAYS]):
+                stats[f'day{offset}_rows'] = len(self._days[day]['rows'])
+                stats[f'day{offset}_pending'] = self._days[day]['pending']
+            return stats
@@ -0,0 +1,71 @@
+import csv
+import io
+import os
+import tempfile
+
+# --- 목록 내보내기 (CSV / XLSX) ---
+# 행은 DB 커서에서 조금씩 받아 바로 쓰므로 전체 표를 내보내도 메모리 사용량이 일정함.
+# 시트 이름과 머리글은 migrate_to_db.py 가 읽는 형식과 같아서 내보낸 파일을 다시 가져올 수 있음.
+SHEET_NAME = '전체일정'
+CHUNK_BYTES = 64 * 1024
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def iter_cursor(cursor, columns, fetch_size):
+    """커서에서 fetch_size 행씩 받아 columns 순서의 튜플로 내보냅니다."""
+    for rows in iter(lambda: cursor.fetchmany(fetch_size), []):
+        for row in rows:
+            yield tuple(_cell(row[c]) for c in columns)
+
+
+def _cell(value):
+    # 예전 SQLite DB 의 REAL ID(4.0) 등은 시트에 있던 모양(4)으로
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def stream_csv(rows, columns):
+    """CSV 를 CHUNK_BYTES 단위로 만들어 내보냅니다. 엑셀에서 한글이 깨지지 않도록 BOM 을 붙임."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    yield buffer.getvalue().encode('utf-8')  # 머리글부터 바로 보내서 다운로드가 곧장 시작되게
+    buffer.seek(0)
+    buffer.truncate()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def stream_xlsx(rows, columns):
+    """openpyxl 쓰기 전용 모드로 임시 파일에 쓴 뒤 CHUNK_BYTES 씩 내보냅니다.
+
+    XLSX 는 zip 이라 마지막에 한 번에 완성되므로 CSV 처럼 첫 행부터 보낼 수는 없음.
+    쓰기 전용 모드는 행을 디스크에 바로 써서 메모리는 행 수와 무관함.
+    """
+    from openpyxl import Workbook  # 내보내기를 쓸 때만 불러옴
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(SHEET_NAME)
+    sheet.append(columns)
+    for row in rows:
+        sheet.append(row)
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    try:
+        os.close(fd)
+        workbook.save(path)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_BYTES), b''):
+                yield chunk
+    finally:
+        os.remove(path)
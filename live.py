@@ -0,0 +1,181 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+
+# --- 실시간 변경 알림 (/events, Server-Sent Events) ---
+# 쓰기(/add, /update, /bulk-update, 시트 동기화)가 바뀐 ID 와 날짜 구간을 알리면
+# 열려 있는 화면마다 자기 화면에 해당하는 행만 카드 HTML 로 받아 제자리에서 바꿈.
+#   Postgres: 쓰기 트랜잭션 안에서 pg_notify → 커밋될 때만 모든 워커/프로세스의 LISTEN 으로 전달
+#   SQLite:   커밋 뒤 같은 프로세스의 구독자에게 바로 전달 (다른 워커/프로세스에는 가지 않음)
+# 스트림은 연결마다 오래 열려 있으므로 비동기 모드(uvicorn asgi:application)에서 쓰는 것을 전제로 함
+# (동기 gunicorn 에서는 열린 화면 하나가 워커/스레드 하나를 계속 차지함).
+CHANNEL = 'performances_changes'
+MAX_PAYLOAD_IDS = 200        # 이보다 많이 바뀌면 행 대신 '새로고침' 알림 하나로
+MAX_PAYLOAD_BYTES = 7900     # NOTIFY 페이로드 한도(8000바이트) 아래로
+KEEPALIVE_SECONDS = 20       # 프록시가 유휴 연결을 끊지 않도록 주석 줄을 보내는 간격
+QUEUE_SIZE = 100             # 연결 하나가 밀려서 쌓아 둘 수 있는 알림 수
+RECONNECT_SECONDS = 3
+
+RELOAD = {'ids': None, 'ranges': []}
+RELOAD_PAYLOAD = json.dumps(RELOAD)  # 전체 다시 읽기 (통째로 다시 적재했을 때)
+
+
+def encode_change(ids, date_ranges):
+    """바뀐 ID 목록과 (시작일, 종료일) 목록을 알림 페이로드(JSON 문자열)로 만듭니다.
+
+    너무 크면 ID 대신 전체 구간 하나만 보내고, 받는 화면은 새로고침 안내를 띄움.
+    """
+    ranges = sorted({(str(start), str(end or start)) for start, end in date_ranges if start})
+    payload = json.dumps({'ids': list(dict.fromkeys(str(i) for i in ids)), 'ranges': ranges},
+                         ensure_ascii=False)
+    if len(ids) > MAX_PAYLOAD_IDS or len(payload.encode('utf-8')) > MAX_PAYLOAD_BYTES:
+        span = [[min(s for s, _ in ranges), max(e for _, e in ranges)]] if ranges else []
+        payload = json.dumps({'ids': None, 'ranges': span})
+    return payload
+
+
+def decode_change(payload):
+    try:
+        change = json.loads(payload)
+    except ValueError:
+        return RELOAD
+    return {'ids': change.get('ids'), 'ranges': [tuple(r) for r in change.get('ranges') or ()]}
+
+
+def overlaps(scope, ranges):
+    """scope 는 화면의 (시작일, 종료일) 또는 None(어떤 변경이든 해당되는 목록 화면).
+
+    ranges 가 비어 있으면(날짜 없는 행 / 새로고침 알림) 모든 화면에 해당."""
+    if scope is None or not ranges:
+        return True
+    start, end = scope
+    if not start:
+        return False  # 날짜를 알 수 없는 검색 화면
+    return any(s <= end and e >= start for s, e in ranges)
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+class Subscription:
+    """SSE 연결 하나의 대기열 (스레드용). 밀리면 쌓아 두지 않고 새로고침 알림 하나로 바꿈."""
+
+    def __init__(self):
+        self._queue = queue.Queue(QUEUE_SIZE)
+
+    def put(self, change):
+        try:
+            self._queue.put_nowait(change)
+        except queue.Full:
+            self._drain()
+            self._queue.put_nowait(RELOAD)
+
+    def _drain(self):
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def get(self, timeout=KEEPALIVE_SECONDS):
+        """다음 알림. timeout 동안 없으면 None."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription:
+    """Subscription 의 asyncio 판 (asgi.py). 알림은 허브 스레드에서 이벤트 루프로 넘김."""
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._queue = asyncio.Queue(QUEUE_SIZE)
+
+    def put(self, change):
+        self._loop.call_soon_threadsafe(self._put, change)
+
+    def _put(self, change):
+        if self._queue.full():
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            change = RELOAD
+        self._queue.put_nowait(change)
+
+    async def get(self):
+        return await self._queue.get()
+
+
+class Hub:
+    """워커 프로세스 하나의 구독자 목록. Postgres 면 LISTEN 스레드가 알림을 받아 나눠 줌."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._listener = None
+        self.delivered = 0
+        # LISTEN 연결 상태 (끊긴 동안의 알림은 놓치므로 읽기 복제본이 지연으로 계산함)
+        self.connected = threading.Event()
+        self.disconnected_at = time.monotonic()
+
+    def subscribe(self, callback, database_url=None):
+        """callback(change) 를 등록하고 해제 함수를 돌려줍니다."""
+        if database_url:
+            self._start_listener(database_url)
+        with self._lock:
+            self._subscribers.add(callback)
+        return lambda: self._unsubscribe(callback)
+
+    def _unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers.discard(callback)
+
+    def dispatch(self, payload):
+        change = decode_change(payload)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(change)
+            except Exception as e:
+                print(f"실시간 알림 전달 중 오류: {e}")
+        self.delivered += len(subscribers)
+
+    def _start_listener(self, database_url):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, args=(database_url,),
+                                                  name='live-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self, database_url):
+        import psycopg  # Postgres 모드에서만 필요
+
+        while True:
+            try:
+                # 풀과 별개의 전용 연결 (autocommit 이어야 알림을 바로 받음)
+                with psycopg.connect(database_url, autocommit=True) as conn:
+                    conn.execute(f'LISTEN {CHANNEL}')
+                    self.connected.set()
+                    self.disconnected_at = None
+                    # 다시 연결하는 사이에 놓친 알림이 있을 수 있으므로 열린 화면에 새로고침 안내
+                    if self.delivered:
+                        self.dispatch('{}')
+                    for notify in conn.notifies():
+                        self.dispatch(notify.payload)
+            except Exception as e:
+                self.connected.clear()
+                self.disconnected_at = self.disconnected_at or time.monotonic()
+                print(f"LISTEN {CHANNEL} 연결 오류, {RECONNECT_SECONDS}초 뒤 다시 연결: {e}")
+                time.sleep(RECONNECT_SECONDS)
+
+    def stats(self):
+        with self._lock:
+            return {'subscribers': len(self._subscribers), 'delivered': self.delivered,
+                    'listening': self._listener is not None, 'connected': self.connected.is_set()}
+
+
+hub = Hub()
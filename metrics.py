@@ -0,0 +1,162 @@
+import re
+import threading
+import time
+
+# --- Prometheus 텍스트 형식 지표 (외부 라이브러리 없이 워커 프로세스 단위로 집계) ---
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+_lock = threading.Lock()
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        with _lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with _lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [버킷별 개수..., 합계, 총 개수]
+        _registry.append(self)
+
+    def observe(self, value, *labels):
+        with _lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with _lock:
+            for labels, state in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, state):
+                    lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, ("le", bound))} {count}')
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, ("le", "+Inf"))} {state[-1]}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {state[-2]}')
+                lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {state[-1]}')
+        return lines
+
+
+class Gauge:
+    """값을 미리 저장하지 않고 /metrics 요청 시 callback() 으로 {labels 튜플: 값} 을 읽습니다."""
+
+    def __init__(self, name, help_text, labelnames=(), callback=None):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.callback = callback
+        _registry.append(self)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge']
+        try:
+            values = self.callback() if self.callback else {}
+        except Exception:
+            values = {}
+        for labels, value in sorted(values.items()):
+            if value is not None:
+                lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+def render_all():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# --- SQL 문 라벨: 'SELECT performances', 'UPDATE daily_counts' 처럼 동사 + 첫 테이블 ---
+_VERB_RE = re.compile(r'^\s*(\w+)')
+_TABLE_RE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE|INDEX|TRIGGER)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(?!OF\b)"?(\w+)',
+                       re.IGNORECASE)
+_statement_labels = {}
+
+
+def statement_label(query):
+    label = _statement_labels.get(query)
+    if label is None:
+        verb = _VERB_RE.match(query)
+        table = _TABLE_RE.search(query)
+        label = ' '.join(part for part in ((verb.group(1).upper() if verb else 'OTHER'),
+                                           (table.group(1) if table else '')) if part)
+        if len(_statement_labels) < 1000:
+            _statement_labels[query] = label
+    return label
+
+
+class TimedCursor:
+    """execute/executemany 시간을 재고 느린 쿼리를 기록하는 커서 래퍼. 나머지는 원래 커서로 위임."""
+
+    def __init__(self, cursor, on_query):
+        self._cursor = cursor
+        self._on_query = on_query
+
+    def execute(self, query, params=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            if params is None:
+                return self._cursor.execute(query, **kwargs)
+            return self._cursor.execute(query, params, **kwargs)
+        finally:
+            self._on_query(query, params, time.perf_counter() - started)
+
+    def executemany(self, query, params_seq, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, params_seq, **kwargs)
+        finally:
+            self._on_query(query, None, time.perf_counter() - started)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class TimedConnection:
+    """cursor() 만 TimedCursor 로 감싸고 commit/rollback 등은 원래 연결로 위임."""
+
+    def __init__(self, conn, on_query):
+        self._conn = conn
+        self._on_query = on_query
+
+    @property
+    def raw(self):
+        """감싼 원래 연결. isolation_level 처럼 값을 바꾸는 속성은 래퍼가 아니라 여기에 설정해야 함."""
+        return self._conn
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._conn.cursor(*args, **kwargs), self._on_query)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
@@ -1,77 +1,348 @@
-import pandas as pd
-import sqlite3
-import psycopg # 새 라이브러리
+import contextlib
+import importlib.util
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import urlparse
 
+import live
+import repository
+import schema
+import upload
+
 # --- 설정 ---
 EXCEL_FILE = 'performances.xlsx'
 TABLE_NAME = 'performances'
 SHEET_NAME = '전체일정'
+# 일정 시트의 머리글에 꼭 있어야 하는 열 (이름이 틀린 다른 시트를 읽어 테이블을 비우지 않도록)
+SHEET_REQUIRED_COLUMNS = ("ID", "Title", "Date")
 
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
-def migrate_data():
+# 스트리밍 적재 시 한 번에 DB로 보내는 행 수
+BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '1000'))
+
+# --- 스트리밍 적재 (메모리 사용량이 시트 크기와 무관) ---
+def iter_sheet_rows(excel_file=EXCEL_FILE, sheet_name=SHEET_NAME):
+    """읽기 전용 모드로 시트를 한 행씩 읽어 SHEET_COLUMNS 순서의 튜플로 내보냅니다.
+
+    시트가 없거나 머리글에 SHEET_REQUIRED_COLUMNS 가 없으면 ValueError."""
+    for _, values in upload.iter_xlsx_rows(excel_file, sheet_name, SHEET_REQUIRED_COLUMNS):
+        yield values
+
+STATUS_INDEX = schema.SHEET_COLUMNS.index("Status")
+STATUS_ALIASES = {'취소': 'Cancelled', 'cancelled': 'Cancelled', 'canceled': 'Cancelled',
+                  '예정': 'Scheduled', 'scheduled': 'Scheduled'}
+DEDUP_LOG_LIMIT = 10
+
+def normalize_status(value):
+    return STATUS_ALIASES.get(value.lower(), value) if value else value
+
+def to_sheet_load_row(values):
+    """시트 값(SHEET_COLUMNS 순서)을 상태 표기를 맞춘 적재 행으로 (전체 적재/동기화/병합 공용)."""
+    values = values[:STATUS_INDEX] + (normalize_status(values[STATUS_INDEX]),) + values[STATUS_INDEX + 1:]
+    return schema.to_load_row(values)
+
+def new_dedup_report():
+    return {'no_id': 0, 'duplicates': 0, 'conflicting': []}
+
+def unique_rows(rows, report):
+    """ID 마다 처음 나온 적재 행(LOAD_COLUMNS 순서)만 내보냅니다. ID 없는 행은 뺌.
+
+    전체 적재/동기화(/병합)가 같은 규칙을 써야 적재 직후 동기화가 아무것도 바꾸지 않음.
+    report 에는 뺀 행 수와 내용(지문)이 다른 중복 ID 를 기록."""
+    first_hash = {}
+    for row in rows:
+        perf_id, source_hash = row[0], row[-1]
+        if perf_id is None:
+            report['no_id'] += 1
+        elif perf_id in first_hash:
+            report['duplicates'] += 1
+            if first_hash[perf_id] != source_hash:
+                report['conflicting'].append(perf_id)
+        else:
+            first_hash[perf_id] = source_hash
+            yield row
+
+def print_dedup_report(report):
+    if report['duplicates'] or report['no_id']:
+        print(f"중복 ID {report['duplicates']}행, ID 없는 행 {report['no_id']}행은 건너뛰었습니다 (ID 마다 첫 행 사용).")
+    conflicting = report['conflicting']
+    if conflicting:
+        shown = ', '.join(conflicting[:DEDUP_LOG_LIMIT]) + (' ...' if len(conflicting) > DEDUP_LOG_LIMIT else '')
+        print(f"WARNING: 내용이 다른 중복 ID {len(conflicting)}개는 먼저 나온 행을 사용했습니다: {shown}")
+
+def iter_batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def load_batches(conn, is_pg, batches, load_columns=schema.LOAD_COLUMNS):
+    """배치를 받아 Postgres 는 COPY, SQLite 는 executemany 로 적재합니다. 커밋은 호출하는 쪽에서."""
+    repo = repository.for_backend(is_pg)
+    cursor = conn.cursor()
+    total = 0
+    started = time.perf_counter()
+    for batch in batches:
+        repo.load_rows(cursor, batch, load_columns)
+        total += len(batch)
+        elapsed = time.perf_counter() - started
+        print(f"  ... {total}행 적재 ({total / elapsed if elapsed else 0:.0f} rows/sec)")
+    return total
+
+def replace_table(conn, is_pg, rows):
+    """테이블을 새로 만들어 rows(LOAD_COLUMNS 순서)를 배치로 적재합니다. 커밋 뒤 (행 수, 최대 ID).
+
+    DROP 부터 커밋까지 한 트랜잭션이라 중간에 실패하거나 읽은 행이 없으면 기존 테이블이 그대로 남음.
+    """
+    with repository.transaction(conn):
+        cursor = conn.cursor()
+        cursor.execute(f'DROP TABLE IF EXISTS "{TABLE_NAME}"')
+        cursor.execute(f'DROP TABLE IF EXISTS {schema.ARCHIVE_TABLE}')  # 시트 기준으로 새로 시작
+        schema.create_table(cursor, is_pg)
+
+        total = load_batches(conn, is_pg, iter_batches(rows, BATCH_SIZE))
+        if not total:
+            raise ValueError("적재할 행이 없어 기존 테이블을 그대로 둡니다.")
+
+        # 인덱스는 적재가 끝난 뒤 한 번에 생성하는 편이 빠름
+        schema.create_indexes(cursor)
+        schema.create_id_index(cursor)
+        max_id = schema.seed_id_allocator(cursor, is_pg)
+        if is_pg:
+            # 앱의 읽기 복제본/열린 화면에 전체를 다시 읽으라고 알림
+            repository.for_backend(True).notify(cursor, live.CHANNEL, live.RELOAD_PAYLOAD)
+    # 새 테이블에 딸린 나머지 스키마 객체도 마이그레이션으로 다시 만듦
+    print(schema.upgrade_schema(conn, is_pg, reapply_all=True))
+    return total, max_id
+
+def migrate_data_streaming(excel_file=EXCEL_FILE, sheet_name=SHEET_NAME):
+    """엑셀을 행 단위로 읽어 배치로 밀어 넣습니다. 테이블 재생성부터 커밋까지 한 트랜잭션 (replace_table)."""
+    is_pg = bool(DATABASE_URL)
+    print(f"'{excel_file}' 파일의 '{sheet_name}' 시트를 스트리밍으로 적재합니다 (배치 {BATCH_SIZE}행)...")
+
+    conn = None
+    started = time.perf_counter()
+    try:
+        conn = repository.connect(DATABASE_URL)
+        report = new_dedup_report()
+        rows = unique_rows((to_sheet_load_row(values) for values in iter_sheet_rows(excel_file, sheet_name)), report)
+        total, max_id = replace_table(conn, is_pg, rows)
+        print_dedup_report(report)
+
+        elapsed = time.perf_counter() - started
+        print("-------------------------------------------")
+        print(f"✅ 데이터 이동 성공! {total}행, {elapsed:.2f}초 ({total / elapsed if elapsed else 0:.0f} rows/sec)")
+        print(f"ID 할당기를 {max_id} 이후로 맞췄습니다.")
+
+    except Exception as e:
+        print(f"데이터베이스 작업 중 오류 발생: {e}")
+        if conn:
+            conn.rollback()
+
+    finally:
+        if conn:
+            conn.close()
+            print("데이터베이스 연결을 닫았습니다.")
+
+# --- 여러 시트/통합 문서 병합 적재 (시트마다 워커 프로세스에서 병렬로 읽기) ---
+# 손으로 합치던 통합 문서들(.xlsx, .numbers)의 일정 시트를 한 번에 읽어 ID 로 중복을 없앤 뒤 한 번에 적재.
+#   일정 시트: 머리글에 SHEET_REQUIRED_COLUMNS 가 모두 있는 시트/표 (인원표 같은 다른 시트는 건너뜀)
+#   정규화:    셀 값(날짜 → ISO, 4.0 → 4), 상태 표기(STATUS_ALIASES), 정규화 날짜/지문까지 워커에서
+#   중복 ID:   인자 순서(파일 → 시트 순) 로 먼저 나온 행을 사용 (unique_rows, 전체 적재/동기화와 같은 규칙)
+#   실패:      읽지 못한 파일/시트가 하나라도 있으면 아무것도 적재하지 않음 (기존 테이블 유지)
+# 인자 없이 실행하면 MERGE_SOURCES 중 있는 파일만 (Numbers 는 numbers-parser 가 설치되어 있을 때만).
+MERGE_SOURCES = (EXCEL_FILE, 'event_app/performances.xlsx', 'performances.numbers',
+                 'event_app/performances.numbers')
+IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', '0')) or os.cpu_count() or 1
+
+def default_merge_sources():
+    has_numbers_parser = importlib.util.find_spec('numbers_parser') is not None
+    return [path for path in MERGE_SOURCES
+            if os.path.exists(path) and (has_numbers_parser or not path.endswith('.numbers'))]
+
+def list_merge_tasks(paths):
+    """워커에 나눌 작업 (파일, 시트). XLSX 는 시트마다, Numbers 는 문서 하나가 작업 하나 (표 목록도 파싱해야 나옴)."""
+    from openpyxl import load_workbook
+
+    tasks = []
+    for path in paths:
+        if path.endswith('.numbers'):
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            tasks.append((path, None))
+        else:
+            wb = load_workbook(path, read_only=True)
+            tasks += [(path, name) for name in wb.sheetnames]
+            wb.close()
+    return tasks
+
+def read_merge_task(task):
+    """(워커 프로세스) 시트 하나 또는 Numbers 문서 하나를 읽어 (파일, [(시트, 적재 행 목록)]).
 
-    print(f"'{EXCEL_FILE}' 파일의 '{SHEET_NAME}' 시트 읽기를 시작합니다...")
+    일정 머리글이 없는 시트는 빈 목록, 그 밖의 오류는 그대로 올라가서 병합 전체를 멈춤."""
+    path, sheet_name = task
+    if path.endswith('.numbers'):
+        tables = upload.iter_numbers_tables(path, SHEET_REQUIRED_COLUMNS)
+    else:
+        tables = [(sheet_name, upload.iter_xlsx_rows(path, sheet_name, SHEET_REQUIRED_COLUMNS))]
+    sheets = []
+    for name, rows in tables:
+        try:
+            sheets.append((name, [to_sheet_load_row(values) for _, values in rows]))
+        except upload.MissingColumnsError:
+            continue  # 일정 시트가 아님
+    return path, sheets
+
+def merge_sources(paths, workers=IMPORT_WORKERS):
+    """여러 통합 문서의 일정 시트를 병렬로 읽어 ID 로 합친 적재 행 목록 (작업이 하나면 이 프로세스에서)."""
+    tasks = list_merge_tasks(paths)
+    workers = max(1, min(workers, len(tasks)))
+    print(f"{len(tasks)}개 시트/문서를 워커 {workers}개로 읽습니다...")
+    report = new_dedup_report()
+    with contextlib.ExitStack() as stack:
+        if workers > 1:
+            results = stack.enter_context(ProcessPoolExecutor(max_workers=workers)).map(read_merge_task, tasks)
+        else:
+            results = map(read_merge_task, tasks)
+
+        # map 은 작업 순서대로 돌려주므로 "먼저 나온 행" 기준이 워커 수와 무관
+        def sheet_rows():
+            for path, sheets in results:
+                for name, rows in sheets:
+                    print(f"  {path} [{name}]: {len(rows)}행")
+                    yield from rows
+
+        merged = list(unique_rows(sheet_rows(), report))
+    print(f"합친 결과 {len(merged)}행")
+    print_dedup_report(report)
+    return merged
+
+def migrate_data_merged(paths=None, workers=IMPORT_WORKERS):
+    """여러 통합 문서를 합쳐 전체 적재합니다 (읽기는 병렬, 적재는 migrate_data_streaming 과 같은 한 트랜잭션)."""
+    is_pg = bool(DATABASE_URL)
+    conn = None
+    started = time.perf_counter()
     try:
-        df = pd.read_excel(EXCEL_FILE, sheet_name=SHEET_NAME, engine='openpyxl')
-        df = df.where(pd.notnull(df), None)
-        df = df.dropna(how='all')
+        rows = merge_sources(paths or default_merge_sources(), workers)
+        read_seconds = time.perf_counter() - started
+        if not rows:
+            print("적재할 행이 없어 기존 테이블을 그대로 둡니다.")
+            return
+        conn = repository.connect(DATABASE_URL)
+        total, max_id = replace_table(conn, is_pg, rows)
+
+        elapsed = time.perf_counter() - started
+        print("-------------------------------------------")
+        print(f"✅ 병합 적재 성공! {total}행, {elapsed:.2f}초 (읽기 {read_seconds:.2f}초)")
+        print(f"ID 할당기를 {max_id} 이후로 맞췄습니다.")
+
     except Exception as e:
-        print(f"엑셀 파일을 읽는 중 오류 발생: {e}")
-        print(f"'{EXCEL_FILE}' 파일 안에 '{SHEET_NAME}' 시트(탭)가 있는지 확인하세요.")
-        return
+        print(f"병합 적재 중 오류 발생 (기존 테이블은 그대로): {type(e).__name__}: {e}")
+        if conn:
+            conn.rollback()
+
+    finally:
+        if conn:
+            conn.close()
+            print("데이터베이스 연결을 닫았습니다.")
 
-    print(f"'{SHEET_NAME}' 시트에서 (빈 행 제외) 총 {len(df)}개의 데이터를 읽었습니다.")
+# --- 증분 동기화 (DROP 없이 바뀐 행만 반영) ---
+# 시트가 소유한 열만 갱신하고, 앱에서 바꾸는 "ApprovalStatus"/"RejectionReason" 은 그대로 둠.
+SYNC_UPDATE_COLUMNS = tuple(c for c in schema.LOAD_COLUMNS if c != "ID")
+SYNC_ID_CHUNK = 500  # 보관 테이블로 옮길 ID 를 한 번에 묶는 개수
+
+def sync_data(excel_file=EXCEL_FILE, sheet_name=SHEET_NAME):
+    """시트 행 지문을 ID별로 비교해 추가/수정/취소(보관 테이블로 이동)만 한 트랜잭션으로 반영합니다."""
+    is_pg = bool(DATABASE_URL)
+    repo = repository.for_backend(is_pg)
+    print(f"'{excel_file}' 파일의 '{sheet_name}' 시트와 증분 동기화를 시작합니다...")
 
     conn = None
+    started = time.perf_counter()
     try:
-        if DATABASE_URL:
-            print(f"클라우드 PostgreSQL DB에 연결합니다...")
-            conn = psycopg.connect(DATABASE_URL)
-            print("연결 성공. 기존 테이블을 삭제하고 새로 생성합니다.")
-
-            cursor = conn.cursor()
-            cursor.execute(f"DROP TABLE IF EXISTS {TABLE_NAME};")
-
-            # 1. 생성 (대문자)
-            create_table_query = """
-            CREATE TABLE performances (
-                "ID" TEXT, 
-                "Location" TEXT, 
-                "Category" TEXT, 
-                "Title" TEXT, 
-                "Date" TEXT, 
-                "Venue" TEXT, 
-                "TeamSetup" TEXT, 
-                "Notes" TEXT, 
-                "Status" TEXT
-            );
-            """
-            cursor.execute(create_table_query)
-
-            data_tuples = [tuple(x) for x in df.to_numpy()]
-
-            # 2. [수정됨] 삽입 (대문자)
-            # INSERT 쿼리의 모든 열 이름에 큰따옴표(")를 추가합니다.
-            insert_query = f"""
-                INSERT INTO {TABLE_NAME} ("ID", "Location", "Category", "Title", "Date", "Venue", "TeamSetup", "Notes", "Status") 
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            cursor.executemany(insert_query, data_tuples)
-
-            conn.commit()
-            cursor.close()
+        conn = repository.connect(DATABASE_URL)
+        cursor = conn.cursor()
+        if not schema.get_columns(cursor, is_pg):
+            conn.close()
+            conn = None
+            print("테이블이 없어 전체 적재로 진행합니다.")
+            return migrate_data_streaming(excel_file, sheet_name)
+        schema.upgrade_schema(conn, is_pg)
 
-        else:
-            # 2. 로컬(SQLite)로 데이터 마이그레이션
-            print(f"'events.db' (로컬 SQLite)에 연결합니다...")
-            conn = sqlite3.connect('events.db')
-            df.to_sql(TABLE_NAME, conn, if_exists='replace', index=False)
+        # 예전 to_sql 로 만든 DB는 ID가 REAL(1.0)이라 시트와 같은 방식으로 정규화해서 비교
+        existing = {upload.clean_cell(r[0]): tuple(r[1:]) for r in repo.source_rows(cursor)}
+        # 취소되어 보관 테이블에 있는 행은 시트가 바뀌어도 취소 상태를 유지한 채 내용만 갱신
+        archived = {upload.clean_cell(r[0]): r[1] for r in repo.source_rows(cursor, schema.ARCHIVE_TABLE)}
+
+        inserts, updates, archived_updates, seen = [], [], [], set()
+        report = new_dedup_report()
+        sheet_rows = (to_sheet_load_row(values) for values in iter_sheet_rows(excel_file, sheet_name))
+        for load_row in unique_rows(sheet_rows, report):  # 전체 적재와 같은 규칙 (ID 마다 첫 행)
+            perf_id = load_row[0]
+            seen.add(perf_id)
+            current = existing.get(perf_id)
+            if current is not None:
+                if current[0] != load_row[-1]:
+                    updates.append(load_row)
+            elif perf_id in archived:
+                if archived[perf_id] != load_row[-1]:
+                    archived_updates.append(load_row)
+            else:
+                inserts.append(load_row)
+        if not seen:
+            # 빈 시트와 비교하면 시트 소유 행이 전부 보관 테이블로 옮겨지므로 아무것도 바꾸지 않음
+            print("시트에서 ID 가 있는 행을 하나도 읽지 못해 동기화를 중단합니다.")
+            return None
 
+        # 시트에서 사라진 (시트 소유) 행은 지우지 않고 보관 테이블로 옮김
+        removed = [perf_id for perf_id, (source_hash, _, _) in existing.items()
+                   if source_hash is not None and perf_id not in seen]
+
+        if inserts:
+            load_batches(conn, is_pg, iter_batches(inserts, BATCH_SIZE))
+        row = dict(zip(schema.LOAD_COLUMNS, range(len(schema.LOAD_COLUMNS))))
+        for table, changed in ((TABLE_NAME, updates), (schema.ARCHIVE_TABLE, archived_updates)):
+            if changed:
+                repo.update_columns(cursor, table, SYNC_UPDATE_COLUMNS,
+                                    [tuple(r[row[c]] for c in SYNC_UPDATE_COLUMNS) + (r[row["ID"]],) for r in changed])
+        moved = []
+        for start in range(0, len(removed), SYNC_ID_CHUNK):
+            moved += repo.archive(cursor, removed[start:start + SYNC_ID_CHUNK])
+        # 시트에서 'Cancelled' 로 들어오거나 바뀐 행도 보관 테이블로
+        moved += repo.archive_cancelled(cursor)
+        purged = repo.purge_archive(cursor)  # 보관 기간 지난 행 정리 (idx_archive_archived_at)
+        if inserts:
+            schema.seed_id_allocator(cursor, is_pg)
+        # 달력 집계는 바뀐 행의 이전/새 날짜 구간만 다시 계산
+        date_index = schema.LOAD_COLUMNS.index("EventDate")
+        changed_ranges = {(r[date_index], r[date_index + 1]) for r in inserts + updates}
+        changed_ranges |= {existing[r[0]][1:3] for r in updates}
+        changed_ranges |= {(start, end) for _, start, end in moved}
+        for start, end in changed_ranges:
+            if start:
+                repo.refresh_daily_counts(cursor, start, end)
+        if is_pg:
+            # 앱 화면(/events)에도 바뀐 행을 알림 (SQLite 는 다른 프로세스라 전달되지 않음 → 새로고침)
+            changed_ids = [r[row["ID"]] for r in inserts + updates + archived_updates] + [m[0] for m in moved]
+            repo.notify(cursor, live.CHANNEL, live.encode_change(changed_ids, changed_ranges))
+        conn.commit()
+
+        elapsed = time.perf_counter() - started
         print("-------------------------------------------")
-        print(f"✅ 데이터 이동 성공!")
+        unchanged = len(seen) - len(inserts) - len(updates) - len(archived_updates)
+        print(f"✅ 동기화 완료 ({elapsed:.2f}초): 추가 {len(inserts)}, 수정 {len(updates) + len(archived_updates)}, "
+              f"취소 {len(moved)}, 변경 없음 {unchanged}")
+        if purged:
+            print(f"INFO: 보관한 지 {schema.ARCHIVE_RETENTION_DAYS}일이 지난 행 {purged}개를 지웠습니다.")
+        print_dedup_report(report)
+        return {'inserted': len(inserts), 'updated': len(updates) + len(archived_updates), 'removed': len(moved)}
 
     except Exception as e:
         print(f"데이터베이스 작업 중 오류 발생: {e}")
@@ -81,7 +352,14 @@ def migrate_data():
     finally:
         if conn:
             conn.close()
-            print("데이터베이스 연결을 닫았습니다.")
 
 if __name__ == '__main__':
-    migrate_data()
\ No newline at end of file
+    # 사용법: python migrate_to_db.py [--sync | --merge [파일 ...]]
+    # 인자가 없으면 (예전 --stream 과 같은) 전체 적재: 동기화와 같은 unique_rows/SourceHash 로 적재하므로
+    # 바로 뒤의 --sync 가 아무것도 다시 쓰지 않음
+    if '--merge' in sys.argv[1:]:
+        migrate_data_merged([arg for arg in sys.argv[1:] if not arg.startswith('--')])
+    elif '--sync' in sys.argv[1:]:
+        sync_data()
+    else:
+        migrate_data_streaming()
\ No newline at end of file
@@ -0,0 +1,94 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+# --- index() 렌더링 결과 캐시 (워커 프로세스 단위, LRU + 바이트 한도) ---
+# 각 항목은 자신이 보여주는 날짜 구간(scope)을 기억하고, 쓰기가 일어나면
+# 그 날짜와 겹치는 항목만 지움. scope 가 None 이면(전체 목록/휴지통) 모든 쓰기에 지움.
+# 렌더링 도중 무효화되면 그 본문은 쓰기 전 스냅샷일 수 있으므로, 읽기 전에 받은 generation() 과
+# 저장할 때의 값이 다르면 저장하지 않음 (digest.Digest 의 _invalidations 와 같은 방식).
+class PageCache:
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._invalidations = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_puts = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry['created'] > self.ttl:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def generation(self):
+        """DB 를 읽기 전에 받아 두었다가 put 에 넘기는 무효화 횟수."""
+        with self._lock:
+            return self._invalidations
+
+    def put(self, key, body, scope, generation=None):
+        """body(bytes)를 저장하고 항목을 돌려줍니다. 한도의 1/4 보다 큰 페이지는 저장하지 않습니다.
+
+        generation 이 있고 그 뒤에 무효화가 있었으면 저장하지 않음 (항목은 그대로 응답에 씀).
+        """
+        now = time.time()
+        entry = {
+            'body': body,
+            'etag': hashlib.sha1(body).hexdigest(),
+            'created': now,
+            'last_modified': int(now),
+            'scope': scope,
+        }
+        if len(body) > self.max_bytes // 4:
+            return entry
+        with self._lock:
+            if generation is not None and generation != self._invalidations:
+                self.stale_puts += 1
+                return entry
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, date_ranges):
+        """쓰기로 바뀐 (시작일, 종료일) 구간들과 겹치는 항목을 지웁니다."""
+        date_ranges = [(start, end or start) for start, end in date_ranges if start]
+        with self._lock:
+            self._invalidations += 1
+            for key in list(self._entries):
+                scope = self._entries[key]['scope']
+                if scope is None or any(start <= scope[1] and end >= scope[0] for start, end in date_ranges):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'stale_puts': self.stale_puts, 'invalidations': self._invalidations}
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry['body'])
@@ -0,0 +1,245 @@
+import atexit
+import os
+import queue
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+
+import live
+import repository
+import schema
+
+# --- 로컬 SQLite 읽기 복제본 (Postgres 모드에서 READ_REPLICA=1) ---
+# 워커 프로세스마다 원격 Postgres 의 performances / 보관 테이블을 로컬 SQLite 파일로 복사해 두고
+# GET 화면은 기존 SQLite 경로(get_sqlite_conn, SQLite 용 SQL)로 이 파일에서 읽음. 쓰기는 항상 Postgres.
+#   시작:  LISTEN 이 연결된 뒤 한 스냅샷으로 전체 복사 (일별 집계/전문 검색/ID 할당기는 로컬에서 다시 만듦)
+#   변경:  쓰기가 보내는 pg_notify (live.CHANNEL) 의 ID 행만 다시 복사. 이 워커의 쓰기는 커밋 직후
+#          요청 안에서 바로 반영해서 리다이렉트된 화면에 자기 변경이 보임
+#   놓침:  LISTEN 재연결 / ID 없는 알림(큰 변경, 전체 재적재) 이면 전체를 다시 복사
+# 반영하지 못한 변경이 READ_REPLICA_MAX_LAG 초 넘게 밀리면 READ_REPLICA_FALLBACK 에 따라
+# primary: 밀린 동안 Postgres 에서 읽음 / stale: 복제본에서 계속 읽음 (늦더라도 빠른 쪽).
+READ_REPLICA = os.environ.get('READ_REPLICA', '0') == '1'
+READ_REPLICA_DIR = os.environ.get('READ_REPLICA_DIR') or tempfile.gettempdir()
+READ_REPLICA_MAX_LAG = float(os.environ.get('READ_REPLICA_MAX_LAG', '5'))
+READ_REPLICA_FALLBACK = os.environ.get('READ_REPLICA_FALLBACK', 'primary')  # primary | stale
+LISTEN_WAIT_SECONDS = 10  # 전체 복사 전에 LISTEN 연결을 기다리는 시간 (복사 중 변경을 놓치지 않도록)
+FETCH_SIZE = 1000
+DATE_INDEX = schema.STORED_COLUMNS.index("EventDate")
+
+TABLE_COLUMNS = {
+    schema.TABLE_NAME: schema.STORED_COLUMNS,
+    schema.ARCHIVE_TABLE: schema.STORED_COLUMNS + ("ArchivedAt",),
+}
+
+
+def _local_value(value):
+    # Postgres DATE / TIMESTAMPTZ → SQLite 모드와 같은 문자열
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _columns(table):
+    return ", ".join(f'"{c}"' for c in TABLE_COLUMNS[table])
+
+
+def _insert_sql(table):
+    return (f'INSERT INTO "{table}" ({_columns(table)}) '
+            f'VALUES ({", ".join("?" for _ in TABLE_COLUMNS[table])})')
+
+
+class Replica:
+    """워커 프로세스 하나의 읽기 복제본. start() 뒤 백그라운드 스레드가 복사와 변경 반영을 맡습니다."""
+
+    def __init__(self, database_url, directory=READ_REPLICA_DIR, max_lag=READ_REPLICA_MAX_LAG,
+                 fallback=READ_REPLICA_FALLBACK):
+        self.database_url = database_url
+        self.directory = directory
+        self.max_lag = max_lag
+        self.fallback = fallback
+        self.path = None
+        self.seeded = False
+        self.applied = 0          # 반영한 변경 알림 수
+        self.seeds = 0            # 전체 복사 횟수
+        self.rows = 0             # 마지막 전체 복사 행 수
+        self.seed_seconds = None  # 마지막 전체 복사 시간
+        self.errors = 0
+        self._pid = None
+        self._changes = queue.Queue()
+        self._pending_since = None
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    # --- 시작 (fork 뒤 워커마다 한 번) ---
+    def start(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.path = os.path.join(self.directory, f'replica-{self._pid}.db')
+            self._remove_files()
+            atexit.register(self._remove_files)
+            live.hub.subscribe(self._on_change, self.database_url)
+            threading.Thread(target=self._run, name='read-replica', daemon=True).start()
+        self._on_change(live.RELOAD)  # 첫 작업은 전체 복사
+
+    def _remove_files(self):
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(self.path + suffix)
+            except FileNotFoundError:
+                pass
+
+    def _open_local(self):
+        conn = repository.connect(None, self.path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=OFF')  # 언제든 Postgres 에서 다시 만들 수 있는 파일
+        conn.execute('PRAGMA busy_timeout=5000')
+        if not schema.get_columns(conn.cursor(), False):
+            schema.create_table(conn.cursor(), False)
+            conn.commit()
+        schema.upgrade_schema(conn, False)
+        return conn
+
+    # --- 상태 ---
+    def lag(self):
+        """반영하지 못한 변경이 기다린 시간 (LISTEN 이 끊겨 있으면 끊긴 뒤로 지난 시간)."""
+        now = time.monotonic()
+        waits = [now - since for since in (self._pending_since, live.hub.disconnected_at) if since is not None]
+        return max(waits, default=0.0)
+
+    def readable(self):
+        """지금 GET 을 복제본에서 읽어도 되는지. 첫 전체 복사가 끝나기 전에는 항상 False."""
+        if not self.seeded:
+            return False
+        return self.fallback == 'stale' or self.lag() <= self.max_lag
+
+    def stats(self):
+        return {'seeded': self.seeded, 'readable': self.readable(), 'lag_seconds': round(self.lag(), 3),
+                'pending': self._changes.qsize(), 'applied': self.applied, 'seeds': self.seeds, 'rows': self.rows,
+                'seed_seconds': self.seed_seconds, 'errors': self.errors, 'max_lag': self.max_lag,
+                'fallback': self.fallback, 'path': self.path}
+
+    # --- 변경 반영 ---
+    def add_listener(self, callback):
+        """다른 워커의 변경을 복제본에 반영한 뒤 callback(change) 호출 (메모리 캐시를 복제본보다 먼저 비우지 않도록)."""
+        self._listeners.append(callback)
+
+    def _on_change(self, change):
+        with self._lock:
+            self._changes.put(change)
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+
+    def _notify_listeners(self, changes):
+        for change in changes:
+            for callback in self._listeners:
+                try:
+                    callback(change)
+                except Exception as e:
+                    print(f"읽기 복제본 반영 알림 중 오류: {e}")
+
+    def _next_changes(self):
+        changes = [self._changes.get()]
+        try:
+            while True:
+                changes.append(self._changes.get_nowait())
+        except queue.Empty:
+            return changes
+
+    def _run(self):
+        pg = local = None
+        while True:
+            changes = self._next_changes()
+            try:
+                if pg is None or pg.closed:
+                    pg = repository.connect(self.database_url)
+                if local is None:
+                    local = self._open_local()
+                if any(change['ids'] is None for change in changes):
+                    live.hub.connected.wait(LISTEN_WAIT_SECONDS)
+                    self.seed(pg, local)
+                else:
+                    ids = list(dict.fromkeys(i for change in changes for i in change['ids']))
+                    self.apply(pg.cursor(), local, ids)
+                pg.rollback()
+                self.applied += len(changes)
+                self._notify_listeners(changes)
+                with self._lock:
+                    if self._changes.empty():
+                        self._pending_since = None
+            except Exception as e:
+                self.errors += 1
+                print(f"읽기 복제본 반영 오류, {live.RECONNECT_SECONDS}초 뒤 전체 다시 복사: {e}")
+                for conn in (pg, local):
+                    try:
+                        conn and conn.close()
+                    except Exception:
+                        pass
+                pg = local = None
+                self._on_change(live.RELOAD)
+                time.sleep(live.RECONNECT_SECONDS)
+
+    def seed(self, pg, local):
+        """Postgres 의 한 스냅샷을 로컬 두 테이블에 통째로 복사합니다 (로컬도 한 트랜잭션, 읽는 쪽은 이전 내용을 봄)."""
+        started = time.perf_counter()
+        pg_cursor = pg.cursor()
+        pg_cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+        cursor = local.cursor()
+        copied = 0
+        for table in TABLE_COLUMNS:
+            cursor.execute(f'DELETE FROM "{table}"')
+            pg_cursor.execute(f'SELECT {_columns(table)} FROM "{table}"')
+            for rows in iter(lambda: pg_cursor.fetchmany(FETCH_SIZE), []):
+                cursor.executemany(_insert_sql(table), [tuple(_local_value(v) for v in row) for row in rows])
+                copied += len(rows)
+        pg_cursor.execute(*repository.for_backend(True).next_id())
+        cursor.execute(f'UPDATE {schema.ID_COUNTER_TABLE} SET value = ? WHERE name = ?',
+                       (pg_cursor.fetchone()[0] - 1, schema.TABLE_NAME))
+        repository.for_backend(False).rebuild_daily_counts(cursor)
+        local.commit()
+        self.seeded = True
+        self.seeds += 1
+        self.rows = copied
+        self.seed_seconds = round(time.perf_counter() - started, 3)
+        print(f"INFO: 읽기 복제본 전체 복사 {copied}행 ({self.seed_seconds}초) → {self.path}")
+
+    def apply(self, pg_cursor, local, ids):
+        """ids 행을 Postgres 의 두 테이블에서 다시 읽어 로컬의 같은 ID 행과 바꾸고, 그 날짜의 집계를 다시 계산합니다."""
+        if not ids:
+            return
+        pg_repo, local_repo = repository.for_backend(True), repository.for_backend(False)
+        cursor = local.cursor()
+        ranges = set()
+        for table in TABLE_COLUMNS:
+            pg_cursor.execute(f'SELECT {_columns(table)} FROM "{table}" WHERE {pg_repo.id_filter}',
+                              pg_repo.id_params(ids))
+            rows = [tuple(_local_value(v) for v in row) for row in pg_cursor.fetchall()]
+            if table == schema.TABLE_NAME:
+                ranges.update(local_repo.row_dates(cursor, ids))
+                ranges.update((row[0], row[DATE_INDEX], row[DATE_INDEX + 1]) for row in rows)
+            cursor.execute(f'DELETE FROM "{table}" WHERE {local_repo.id_filter}', local_repo.id_params(ids))
+            cursor.executemany(_insert_sql(table), rows)
+        for start, end in {(start, end) for _, start, end in ranges if start}:
+            local_repo.refresh_daily_counts(cursor, start, end)
+        numeric = [int(i) for i in ids if str(i).isdigit()]
+        if numeric:
+            cursor.execute(f'UPDATE {schema.ID_COUNTER_TABLE} SET value = MAX(value, ?) WHERE name = ?',
+                           (max(numeric), schema.TABLE_NAME))
+        local.commit()
+
+    def apply_write(self, pg_conn, local, ids):
+        """이 워커의 쓰기를 커밋 직후 반영 (실패하면 백그라운드에서 전체 다시 복사)."""
+        if not self.seeded:
+            return
+        try:
+            self.apply(pg_conn.cursor(), local, [str(i) for i in ids])
+        except Exception as e:
+            local.rollback()
+            print(f"읽기 복제본 즉시 반영 오류: {e}")
+            self._on_change(live.RELOAD)
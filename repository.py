@@ -0,0 +1,610 @@
+import contextlib
+import functools
+import json
+import os
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import conflicts
+import schema
+
+# --- 데이터 접근 계층 (app.py / asgi.py / migrate_to_db.py 공용) ---
+# 백엔드(Postgres / SQLite)마다 Repository 하나가 SQL 문을 (쿼리 모양별로) 한 번만 만들어 캐시함.
+# 값은 LIMIT 과 ID 목록까지 전부 파라미터로 보내서 같은 일을 하는 쿼리는 항상 같은 문자열이 됨
+# (ID 목록: Postgres 는 ANY(%s), SQLite 는 json_each(?)).
+# 그래서 Postgres 는 psycopg 가 서버 측 prepared statement 로 한 번 준비한 뒤 계속 재사용하고,
+# SQLite 는 연결의 문장 캐시(cached_statements)에서 컴파일된 문장을 재사용함.
+#
+# pgbouncer 트랜잭션 모드처럼 prepared statement 를 쓸 수 없는 경우 DB_PREPARE_THRESHOLD=off.
+_threshold = os.environ.get('DB_PREPARE_THRESHOLD', '0')
+PREPARE_THRESHOLD = None if _threshold.lower() in ('', 'off', 'none') else int(_threshold)
+SQLITE_CACHED_STATEMENTS = int(os.environ.get('SQLITE_CACHED_STATEMENTS', '256'))
+SQLITE_PATH = 'events.db'
+
+# 목록 화면이 읽는 열 (휴지통은 "ArchivedAt" 추가)
+LIST_COLUMNS = ("ID", "Location", "Category", "Title", "Date", "Venue", "TeamSetup", "Notes", "Status",
+                "ApprovalStatus", "RejectionReason", "EventDate")
+INSERT_COLUMNS = ("ID", "Location", "Category", "Title", "Date", "Venue", "TeamSetup", "Notes", "Status",
+                  "EventDate", "EventEndDate")
+
+DATE_VIEWS = ('date', 'range', 'today')
+VIEW_ORDER = {
+    'date': '"EventDate", "ID"',
+    'today': '"EventDate", "ID"',
+    'range': '"EventDate", "ID"',
+    # 전체 목록/휴지통은 키셋 페이지(keyset_page)와 같은 순서: 날짜 없는 행은 전체 목록의 맨 뒤, 휴지통의 맨 앞
+    # (ORDER BY "EventDate" 만으로는 NULL 위치가 백엔드마다 달라서 /export 와 화면 순서가 어긋남)
+    'all': f'{schema.KEYSET_DATE_SQL}, "ID"',
+    'trash': f'{schema.KEYSET_DATE_SQL} DESC, "ID" DESC',
+}
+
+# 상태 변경 액션 → SET 절 ({ph} 자리에 백엔드별 placeholder)
+ACTION_SET = {
+    'approve': '"ApprovalStatus" = \'승인\', "RejectionReason" = NULL',
+    'reject': '"ApprovalStatus" = \'반려\', "RejectionReason" = {ph}',
+    'reset_approval': '"ApprovalStatus" = \'미승인\', "RejectionReason" = NULL',
+    'change': '"Date" = {ph}, "EventDate" = {ph}, "EventEndDate" = {ph}',
+}
+
+
+# --- 가벼운 행 객체 ---
+class Row(tuple):
+    """sqlite3.Row 처럼 row['ID'], row[0], row.ID 로 읽는 튜플.
+
+    열 이름 → 위치 표는 결과 모양(열 이름 목록)마다 하나를 만들어 모든 행이 공유하므로
+    행마다 dict 를 만드는 dict_row 보다 만들기 빠르고 메모리도 적게 씀.
+    """
+    __slots__ = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
+
+    def __getattr__(self, name):
+        try:
+            return tuple.__getitem__(self, self._index[name])
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def keys(self):
+        return list(self._index)
+
+    def get(self, key, default=None):
+        position = self._index.get(key)
+        return default if position is None else tuple.__getitem__(self, position)
+
+
+@functools.lru_cache(maxsize=256)
+def _row_class(names):
+    return type('Row', (Row,), {'__slots__': (), '_index': {name: i for i, name in enumerate(names)}})
+
+
+def row_factory(cursor):
+    """psycopg row_factory: 같은 열 구성의 결과는 같은 Row 클래스를 재사용."""
+    if cursor.description is None:
+        return tuple
+    return _row_class(tuple(column.name for column in cursor.description))
+
+
+def pg_connect_kwargs():
+    """psycopg.connect / 커넥션 풀 kwargs (Row 행 + prepared statement)."""
+    return {'row_factory': row_factory, 'prepare_threshold': PREPARE_THRESHOLD}
+
+
+def connect(database_url=None, sqlite_path=SQLITE_PATH, **sqlite_kwargs):
+    """DATABASE_URL 이 있으면 Postgres, 없으면 로컬 SQLite 연결을 엽니다."""
+    if database_url:
+        import psycopg  # Postgres 모드에서만 필요
+        return psycopg.connect(database_url, **pg_connect_kwargs())
+    return sqlite3.connect(sqlite_path, cached_statements=SQLITE_CACHED_STATEMENTS, **sqlite_kwargs)
+
+
+@contextlib.contextmanager
+def transaction(conn):
+    """DDL 까지 한 트랜잭션으로 묶어 성공하면 커밋, 예외면 롤백합니다.
+
+    sqlite3 의 기본(레거시) 모드는 DML 앞에서만 BEGIN 하고 DROP/CREATE TABLE 은 바로 커밋하므로
+    SQLite 는 isolation_level=None 으로 바꾸고 BEGIN 을 직접 보냄 (Postgres 는 DDL 도 원래 트랜잭션 안).
+    """
+    raw = getattr(conn, 'raw', conn)  # metrics.TimedConnection 이면 감싼 원래 연결
+    is_sqlite = isinstance(raw, sqlite3.Connection)
+    if is_sqlite:
+        level = raw.isolation_level
+        conn.commit()
+        raw.isolation_level = None
+        conn.execute('BEGIN')
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        if is_sqlite:
+            raw.isolation_level = level
+
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def _quoted(columns):
+    return ", ".join(f'"{c}"' for c in columns)
+
+
+def _resource(alias, key):
+    """중복 배정 비교 값의 SQL (schema.RESOURCE_SQL). alias 는 '' 또는 't.' 같은 테이블 별칭."""
+    return schema.RESOURCE_SQL.format(f'{alias}"{key}"')
+
+
+class Repository:
+    """한 백엔드의 SQL 문. 조회는 (query, params) 를 돌려주고 (쿼리 플랜에서 yield),
+    쓰기는 cursor 를 받아 바로 실행합니다. _sql_* 메서드는 쿼리 모양별로 캐시됨."""
+
+    def __init__(self, is_pg):
+        self.is_pg = is_pg
+        self.ph = '%s' if is_pg else '?'
+
+    # --- ID 목록 조건 (개수와 무관하게 같은 SQL 문) ---
+    @functools.cached_property
+    def id_filter(self):
+        return '"ID" = ANY(%s)' if self.is_pg else '"ID" IN (SELECT value FROM json_each(?))'
+
+    def id_params(self, ids):
+        ids = [str(i) for i in ids]
+        return (ids,) if self.is_pg else (json.dumps(ids, ensure_ascii=False),)
+
+    # --- 목록 화면 ---
+    @staticmethod
+    def view_table(view):
+        return schema.ARCHIVE_TABLE if view == 'trash' else schema.TABLE_NAME
+
+    @staticmethod
+    def list_columns(view):
+        return LIST_COLUMNS + ("ArchivedAt",) if view == 'trash' else LIST_COLUMNS
+
+    def _date_overlap(self):
+        """[시작, 끝] 과 겹치는 행. 시작일을 [시작 - 가장 긴 공연 기간, 끝] 으로 묶어 ("EventDate", "ID") 인덱스의
+        범위 스캔이 되게 함 (종료일 조건만으로는 시작일 쪽 구간이 열려 있어 전체를 훑음). 값은 _view_params 순서."""
+        if self.is_pg:
+            lower = f'CAST(%s AS DATE) - {schema.MAX_SPAN_SQL}'
+        else:
+            lower = f"date(?, '-' || {schema.MAX_SPAN_SQL} || ' days')"
+        return f'"EventDate" <= {self.ph} AND "EventDate" >= {lower} AND "EventEndDate" >= {self.ph}'
+
+    @staticmethod
+    def _view_params(view, view_params):
+        """화면의 날짜 조건 값 (끝, 시작) → _date_overlap 의 (끝, 시작, 시작)."""
+        if view in DATE_VIEWS:
+            end, start = view_params[:2]
+            return (end, start, start)
+        return tuple(view_params)
+
+    def _view_where(self, view, approval):
+        conditions = []
+        if view in DATE_VIEWS:
+            conditions.append(self._date_overlap())
+        if approval:
+            conditions.append(f'COALESCE("ApprovalStatus", \'미승인\') = {self.ph}')
+        return ' AND '.join(conditions) or '1 = 1'
+
+    @functools.lru_cache(maxsize=None)
+    def _sql_list_view(self, view, has_approval, columns):
+        return (f'SELECT {_quoted(columns)} FROM "{self.view_table(view)}" '
+                f'WHERE {self._view_where(view, has_approval)} ORDER BY {VIEW_ORDER[view]}')
+
+    def list_view(self, view, view_params, approval=None, columns=None):
+        """화면(view) 조건의 전체 행. view_params 는 날짜 조건 값, approval 은 승인 상태 필터."""
+        query = self._sql_list_view(view, bool(approval), tuple(columns or self.list_columns(view)))
+        return query, self._view_params(view, view_params) + ((approval,) if approval else ())
+
+    @functools.lru_cache(maxsize=None)
+    def _sql_keyset_page(self, view, has_approval, has_key, descending, columns):
+        key_date = schema.KEYSET_DATE_SQL
+        query = (f'SELECT {_quoted(columns)} FROM "{self.view_table(view)}" '
+                 f'WHERE {self._view_where(view, has_approval)} AND "ID" IS NOT NULL')
+        if has_key:
+            # 앞의 단일 비교는 SQLite 가 식 인덱스에서 행 값 비교로는 범위를 못 잡아서 붙임 (결과는 같음)
+            op = "<" if descending else ">"
+            query += f' AND {key_date} {op}= {self.ph} AND ({key_date}, "ID") {op} ({self.ph}, {self.ph})'
+        order = 'DESC' if descending else 'ASC'
+        return query + f' ORDER BY {key_date} {order}, "ID" {order} LIMIT {self.ph}'
+
+    def keyset_page(self, view, view_params, approval, key, descending, limit):
+        """(EventDate, ID) 키셋 페이지 (날짜 없는 행은 schema.UNDATED_SORT_DATE 로 맨 뒤).
+
+        key 는 (EventDate 또는 UNDATED_SORT_DATE, ID) 또는 None."""
+        query = self._sql_keyset_page(view, bool(approval), key is not None, descending, self.list_columns(view))
+        params = (self._view_params(view, view_params) + ((approval,) if approval else ())
+                  + ((key[0],) + tuple(key) if key else ()) + (limit,))
+        return query, params
+
+    @functools.lru_cache(maxsize=None)
+    def _sql_rows_by_ids(self, view):
+        columns = self.list_columns(view) + ("EventEndDate",)
+        return f'SELECT {_quoted(columns)} FROM "{self.view_table(view)}" WHERE {self.id_filter}'
+
+    def rows_by_ids(self, view, ids):
+        """실시간 갱신(/events)용: 화면(view)이 읽는 테이블에서 ids 의 현재 행."""
+        return self._sql_rows_by_ids(view), self.id_params(ids)
+
+    def notify(self, cursor, channel, payload):
+        """Postgres 전용: 트랜잭션이 커밋될 때 LISTEN 중인 연결로 전달되는 알림."""
+        cursor.execute('SELECT pg_notify(%s, %s)', (channel, payload))
+
+    # --- 전문 검색 (Postgres tsvector + 트라이그램 / SQLite FTS5) ---
+    @functools.lru_cache(maxsize=None)
+    def _sql_search(self, has_range, has_approval):
+        columns = ", ".join(f'p."{c}"' for c in LIST_COLUMNS)
+        filters = ''  # 취소된 공연은 보관 테이블에 있으므로 따로 거를 필요 없음
+        if has_range:
+            filters += f' AND p."EventDate" <= {self.ph} AND p."EventEndDate" >= {self.ph}'
+        if has_approval:
+            filters += f' AND COALESCE(p."ApprovalStatus", \'미승인\') = {self.ph}'
+        if self.is_pg:
+            return f"""
+                SELECT {columns}, ts_rank(p."SearchVector", to_tsquery('simple', %s)) AS rank
+                FROM "performances" p
+                WHERE (p."SearchVector" @@ to_tsquery('simple', %s) OR ({schema.SEARCH_DOCUMENT_SQL}) ILIKE %s){filters}
+                ORDER BY rank DESC, p."EventDate", p."ID"
+                LIMIT %s OFFSET %s
+            """
+        return f"""
+            SELECT {columns}
+            FROM {schema.FTS_TABLE} f JOIN "performances" p ON p.rowid = f.rowid
+            WHERE {schema.FTS_TABLE} MATCH ?{filters}
+            ORDER BY f.rank, p."EventDate", p."ID"
+            LIMIT ? OFFSET ?
+        """
+
+    def search(self, terms, text, day_range, approval, limit, offset):
+        """terms 를 모두 접두어로 포함하는 행을 관련도 순으로. day_range 는 (시작일, 종료일) 또는 None.
+
+        Postgres 는 text 를 부분 문자열로 포함하는 행도 찾음 (ILIKE, schema.TRIGRAM_INDEX 가 있어야 하므로
+        pg_trgm 은 필수). SQLite(로컬 개발용)의 FTS5 는 단어 접두어만 찾으므로 '공연장' 안의 '연장' 처럼
+        단어 중간에서 시작하는 검색어는 SQLite 에서만 결과가 없음.
+        """
+        params = []
+        if day_range:
+            params += [day_range[1], day_range[0]]
+        if approval:
+            params.append(approval)
+        if self.is_pg:
+            # tsvector 접두어 검색 + (조사가 붙은 한글 등) 부분 문자열은 트라이그램 ILIKE 로 보완
+            ts_query = ' & '.join(f'{t}:*' for t in terms)
+            like = '%' + text.strip().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            params = [ts_query, ts_query, like] + params
+        else:
+            params = [' '.join('"' + t + '"*' for t in terms)] + params
+        return self._sql_search(bool(day_range), bool(approval)), tuple(params) + (limit, offset)
+
+    # --- 달력 ---
+    @functools.cached_property
+    def _sql_daily_counts(self):
+        return (f'SELECT day, {", ".join(schema.DAILY_COUNT_COLUMNS)} FROM {schema.DAILY_COUNTS_TABLE} '
+                f'WHERE day >= {self.ph} AND day <= {self.ph}')
+
+    def daily_counts(self, first_day, last_day):
+        return self._sql_daily_counts, (first_day, last_day)
+
+    # --- ID 할당 (schema.seed_id_allocator 로 만든 시퀀스/카운터) ---
+    def next_id(self):
+        """다음에 나올 ID 를 소모하지 않고 읽는 쿼리 (결과 열 next_id)."""
+        if self.is_pg:
+            return (f'SELECT CASE WHEN is_called THEN last_value + 1 ELSE last_value END AS next_id '
+                    f'FROM {schema.ID_SEQUENCE}', ())
+        return (f'SELECT COALESCE(MAX(value), 0) + 1 AS next_id FROM {schema.ID_COUNTER_TABLE} WHERE name = ?',
+                (schema.TABLE_NAME,))
+
+    def allocate_id(self, cursor):
+        """동시에 추가해도 겹치지 않는 새 ID 를 원자적으로 하나 받습니다."""
+        if self.is_pg:
+            cursor.execute(f"SELECT nextval('{schema.ID_SEQUENCE}') AS next_id")
+            return cursor.fetchone()[0]
+        # UPDATE 가 먼저 쓰기 잠금을 잡으므로 같은 트랜잭션의 SELECT 값은 다른 요청과 겹치지 않음
+        cursor.execute(f'UPDATE {schema.ID_COUNTER_TABLE} SET value = value + 1 WHERE name = ?',
+                       (schema.TABLE_NAME,))
+        cursor.execute(f'SELECT value FROM {schema.ID_COUNTER_TABLE} WHERE name = ?', (schema.TABLE_NAME,))
+        return cursor.fetchone()[0]
+
+    def allocate_ids(self, cursor, count):
+        """새 ID 를 count 개 한 번에 받습니다 (일괄 업로드). 시퀀스/카운터를 한 번만 올림."""
+        if count <= 0:
+            return []
+        if self.is_pg:
+            cursor.execute(f"SELECT nextval('{schema.ID_SEQUENCE}') AS next_id FROM generate_series(1, %s)",
+                           (count,))
+            return sorted(row[0] for row in cursor.fetchall())
+        cursor.execute(f'UPDATE {schema.ID_COUNTER_TABLE} SET value = value + ? WHERE name = ?',
+                       (count, schema.TABLE_NAME))
+        cursor.execute(f'SELECT value FROM {schema.ID_COUNTER_TABLE} WHERE name = ?', (schema.TABLE_NAME,))
+        last = cursor.fetchone()[0]
+        return list(range(last - count + 1, last + 1))
+
+    @functools.cached_property
+    def _sql_existing_ids(self):
+        return ' UNION ALL '.join(f'SELECT "ID" FROM "{table}" WHERE {self.id_filter}'
+                                  for table in (schema.TABLE_NAME, schema.ARCHIVE_TABLE))
+
+    def existing_ids(self, cursor, ids):
+        """ids 중 이미 쓰이는 ID (취소되어 보관 테이블에 있는 것 포함)."""
+        if not ids:
+            return []
+        cursor.execute(self._sql_existing_ids, self.id_params(ids) * 2)
+        return [row[0] for row in cursor.fetchall()]
+
+    def reserve_id(self, cursor, used_id):
+        """할당기를 used_id(숫자) 이상으로 올려서 그 값이 나중에 다시 할당되지 않게 합니다.
+
+        Postgres 의 setval 은 트랜잭션 밖에서 바로 적용되고 읽기와 원자적이지 않아서, 그 사이 allocate_id 의
+        nextval 을 되돌려 같은 ID 를 두 번 내줄 수 있음. 그래서 모자란 만큼 nextval 로만 올림 (절대 뒤로 가지 않음).
+        """
+        if self.is_pg:
+            cursor.execute(f'SELECT last_value, is_called FROM {schema.ID_SEQUENCE}')
+            last_value, is_called = cursor.fetchone()
+            gap = used_id - (last_value if is_called else last_value - 1)
+            if gap > 0:
+                cursor.execute(f"SELECT MAX(nextval('{schema.ID_SEQUENCE}')) FROM generate_series(1, %s)", (gap,))
+        else:
+            cursor.execute(f'UPDATE {schema.ID_COUNTER_TABLE} SET value = MAX(value, ?) WHERE name = ?',
+                           (used_id, schema.TABLE_NAME))
+
+    # --- 공연장/인원편성 중복 배정 (schema.INDEXES 의 (TRIM(값), EventEndDate, EventDate) 인덱스) ---
+    # 두 쿼리 모두 schema.RESOURCE_SQL 로 비교함 (값 인자는 conflicts.resource_value 로 이미 공백을 뺀 값)
+    @functools.cached_property
+    def _sql_conflicts(self):
+        return ' UNION ALL '.join(
+            f'SELECT \'{key}\' AS kind, "{key}" AS value, "ID" AS other_id, "Title" AS other_title, '
+            f'"Date" AS other_date FROM "{schema.TABLE_NAME}" '
+            f'WHERE {_resource("", key)} = {self.ph} '
+            f'AND "EventEndDate" >= {self.ph} AND "EventDate" <= {self.ph} '
+            f'AND NOT ({self.id_filter})'
+            for key in conflicts.CONFLICT_KEYS)
+
+    def conflicts(self, venue, team_setup, start, end, exclude_ids=()):
+        """[start, end] 에 같은 공연장/인원편성을 쓰는 일정. 빈 값(None)은 찾지 않음."""
+        params = ()
+        for value in (venue, team_setup):
+            params += (value, start, end) + self.id_params(exclude_ids)
+        return self._sql_conflicts, params
+
+    @functools.cached_property
+    def _sql_conflicts_for_ids(self):
+        target_ids = ('t."ID" = ANY(%s)' if self.is_pg else 't."ID" IN (SELECT value FROM json_each(?))')
+        return ' UNION ALL '.join(
+            f'SELECT \'{key}\' AS kind, t."ID" AS id, o."{key}" AS value, o."ID" AS other_id, '
+            f'o."Title" AS other_title, o."Date" AS other_date '
+            f'FROM "{schema.TABLE_NAME}" t JOIN "{schema.TABLE_NAME}" o '
+            f'ON {_resource("o.", key)} = {_resource("t.", key)} '
+            f'AND o."EventEndDate" >= t."EventDate" AND o."EventDate" <= t."EventEndDate" AND o."ID" <> t."ID" '
+            f'WHERE {target_ids} AND {_resource("t.", key)} <> \'\''
+            for key in conflicts.CONFLICT_KEYS)
+
+    def conflicts_for_ids(self, ids):
+        """이미 저장된 ids 행과 같은 날 같은 공연장/인원편성을 쓰는 다른 일정 (추가/날짜변경 직후 경고용)."""
+        return self._sql_conflicts_for_ids, self.id_params(ids) * len(conflicts.CONFLICT_KEYS)
+
+    @functools.cached_property
+    def _sql_resources(self):
+        return f'SELECT "Venue", "TeamSetup" FROM "{schema.TABLE_NAME}" WHERE {self.id_filter}'
+
+    def resources(self, ids):
+        return self._sql_resources, self.id_params(ids)
+
+    @functools.lru_cache(maxsize=None)
+    def _sql_conflict_scan(self, has_from):
+        query = (f'SELECT "ID", "Title", "Date", "Venue", "TeamSetup", "EventDate", "EventEndDate" '
+                 f'FROM "{schema.TABLE_NAME}" WHERE "EventDate" IS NOT NULL')
+        return query + (f' AND "EventEndDate" >= {self.ph}' if has_from else '')
+
+    def conflict_scan(self, from_day=None):
+        """전체 보고서용: 날짜가 있는 모든 행을 한 번 읽음 (from_day 가 있으면 그날 이후 끝나는 일정만)."""
+        return self._sql_conflict_scan(bool(from_day)), ((from_day,) if from_day else ())
+
+    # --- 쓰기 ---
+    @functools.cached_property
+    def _sql_insert(self):
+        return (f'INSERT INTO "{schema.TABLE_NAME}" ({_quoted(INSERT_COLUMNS)}) '
+                f'VALUES ({", ".join(self.ph for _ in INSERT_COLUMNS)})')
+
+    def insert_performance(self, cursor, values):
+        """INSERT_COLUMNS 순서의 값으로 한 행을 추가합니다."""
+        cursor.execute(self._sql_insert, tuple(values))
+
+    @functools.lru_cache(maxsize=None)
+    def _sql_row_dates(self, lock):
+        return (f'SELECT "ID", "EventDate", "EventEndDate" FROM "{schema.TABLE_NAME}" '
+                f'WHERE {self.id_filter}{" FOR UPDATE" if lock and self.is_pg else ""}')
+
+    def row_dates(self, cursor, ids, lock=False):
+        """ids 중 존재하는 행의 (ID, 시작일, 종료일) 목록. lock=True 면 Postgres 에서 행 잠금."""
+        cursor.execute(self._sql_row_dates(lock), self.id_params(ids))
+        return [tuple(row[:3]) for row in cursor.fetchall()]
+
+    @functools.lru_cache(maxsize=None)
+    def _sql_update_action(self, action):
+        return f'UPDATE "{schema.TABLE_NAME}" SET {ACTION_SET[action].format(ph=self.ph)} WHERE {self.id_filter}'
+
+    def update_action(self, cursor, action, params, ids):
+        """ACTION_SET 의 액션을 ids 에 한 문장으로 적용합니다. params 는 SET 절의 값."""
+        cursor.execute(self._sql_update_action(action), tuple(params) + self.id_params(ids))
+
+    # --- 취소 = 보관 테이블로 이동, 복구 = 되돌리기 (schema 마이그레이션 v4 도 사용) ---
+    def archive(self, cursor, ids):
+        """performances → 보관 테이블 (공연 취소). 옮긴 행의 (ID, 시작일, 종료일) 목록."""
+        return self._move_rows(cursor, schema.TABLE_NAME, schema.ARCHIVE_TABLE, self.id_filter, self.id_params(ids))
+
+    def restore(self, cursor, ids):
+        """보관 테이블 → performances (복구). 예전 방식으로 'Cancelled' 였던 행은 'Scheduled' 로."""
+        return self._move_rows(cursor, schema.ARCHIVE_TABLE, schema.TABLE_NAME, self.id_filter, self.id_params(ids))
+
+    def archive_cancelled(self, cursor):
+        """'Cancelled' 상태로 들어온 행을 보관 테이블로 옮깁니다 (시트 동기화)."""
+        return self._move_rows(cursor, schema.TABLE_NAME, schema.ARCHIVE_TABLE, '"Status" = \'Cancelled\'', ())
+
+    @functools.lru_cache(maxsize=None)
+    def _sql_move(self, source, target, where):
+        """where 에 맞는 행을 source → target 으로 옮기는 문장들 (Postgres 한 문장, SQLite 는 INSERT/SELECT/DELETE)."""
+        columns = _quoted(schema.STORED_COLUMNS)
+        if target == schema.ARCHIVE_TABLE:
+            target_columns = columns + ', "ArchivedAt"'
+            select_columns = columns + ', CURRENT_TIMESTAMP'
+            if not self.is_pg:
+                # 예전 to_sql DB 의 REAL ID(4.0)는 보관 테이블(TEXT)에 '4.0' 이 아니라 '4' 로
+                select_columns = select_columns.replace(
+                    '"ID"', 'CASE WHEN typeof("ID") = \'real\' AND "ID" = CAST("ID" AS INTEGER) '
+                            'THEN CAST(CAST("ID" AS INTEGER) AS TEXT) ELSE "ID" END', 1)
+        else:
+            target_columns = columns
+            select_columns = columns.replace('"Status"', 'CASE WHEN "Status" = \'Cancelled\' THEN \'Scheduled\' '
+                                                         'ELSE "Status" END')
+        if self.is_pg:
+            # 지우면서 돌려받은 행을 그대로 넣는 한 문장이라 동시에 다른 쓰기가 있어도 빠지는 행이 없음
+            return (f'WITH moved AS (DELETE FROM "{source}" WHERE {where} RETURNING {columns}) '
+                    f'INSERT INTO "{target}" ({target_columns}) SELECT {select_columns} FROM moved '
+                    f'RETURNING "ID", "EventDate", "EventEndDate"',)
+        # SQLite: INSERT 가 먼저 쓰기 잠금을 잡으므로 이후 SELECT/DELETE 는 같은 행을 봄
+        return (f'INSERT INTO "{target}" ({target_columns}) SELECT {select_columns} FROM "{source}" WHERE {where}',
+                f'SELECT "ID", "EventDate", "EventEndDate" FROM "{source}" WHERE {where}',
+                f'DELETE FROM "{source}" WHERE {where}')
+
+    def _move_rows(self, cursor, source, target, where, params):
+        moved = []
+        for query in self._sql_move(source, target, where):
+            cursor.execute(query, params)
+            if query.startswith(('WITH', 'SELECT')):
+                moved = [tuple(row[:3]) for row in cursor.fetchall()]
+        return moved
+
+    def purge_archive(self, cursor, retention_days=schema.ARCHIVE_RETENTION_DAYS):
+        """보관한 지 retention_days 일이 지난 행을 완전히 지웁니다 (idx_archive_archived_at). 지운 행 수."""
+        if self.is_pg:
+            cursor.execute(f'DELETE FROM {schema.ARCHIVE_TABLE} WHERE "ArchivedAt" < now() - make_interval(days => %s)',
+                           (retention_days,))
+        else:
+            cursor.execute(f'DELETE FROM {schema.ARCHIVE_TABLE} WHERE "ArchivedAt" < datetime(\'now\', ?)',
+                           (f'-{retention_days} days',))
+        return cursor.rowcount
+
+    # --- 달력 일별 집계 (schema.DAILY_COUNTS_TABLE) ---
+    @functools.lru_cache(maxsize=None)
+    def _sql_count_rows(self, span_bound):
+        conditions = f'"EventDate" <= {self.ph}'
+        if span_bound:
+            # _date_overlap 과 같은 시작일 하한: EventDate 인덱스의 범위 스캔
+            if self.is_pg:
+                conditions += f' AND "EventDate" >= CAST(%s AS DATE) - {schema.MAX_SPAN_SQL}'
+            else:
+                conditions += f" AND \"EventDate\" >= date(?, '-' || {schema.MAX_SPAN_SQL} || ' days')"
+        return (f'SELECT "EventDate", "EventEndDate", "Status", "ApprovalStatus" FROM "{schema.TABLE_NAME}" '
+                f'WHERE {conditions} AND "EventEndDate" >= {self.ph} '
+                f'AND ("Status" != \'Cancelled\' OR "Status" IS NULL OR "Status" = \'\')')
+
+    @functools.cached_property
+    def _sql_insert_counts(self):
+        columns = ", ".join(schema.DAILY_COUNT_COLUMNS)
+        placeholders = ", ".join(self.ph for _ in range(len(schema.DAILY_COUNT_COLUMNS) + 1))
+        return f'INSERT INTO {schema.DAILY_COUNTS_TABLE} (day, {columns}) VALUES ({placeholders})'
+
+    def refresh_daily_counts(self, cursor, start, end, span_bound=True):
+        """[start, end] 구간의 일별 집계를 다시 계산합니다. 구간과 겹치는 행만 한 번 읽습니다.
+
+        span_bound=False 는 가장 이른 시작일부터 읽는 전체 재계산용 (event_span 이 생기기 전인 v3 에서도 씀).
+        """
+        if not start:
+            return 0
+        start, end = _as_date(start), _as_date(end or start)
+        params = (end.isoformat(),) + ((start.isoformat(),) if span_bound else ()) + (start.isoformat(),)
+        cursor.execute(self._sql_count_rows(span_bound), params)
+
+        counts = {}
+        for row in cursor.fetchall():
+            first, last = max(_as_date(row[0]), start), min(_as_date(row[1]), end)
+            approval = row[3] if row[3] in ('승인', '반려') else '미승인'
+            keys = ('total', {'승인': 'approved', '반려': 'rejected', '미승인': 'pending'}[approval],
+                    'special' if row[2] == 'Special' else 'scheduled')
+            day = first
+            while day <= last:
+                day_counts = counts.setdefault(day.isoformat(), dict.fromkeys(schema.DAILY_COUNT_COLUMNS, 0))
+                for key in keys:
+                    day_counts[key] += 1
+                day += timedelta(days=1)
+
+        cursor.execute(f'DELETE FROM {schema.DAILY_COUNTS_TABLE} WHERE day >= {self.ph} AND day <= {self.ph}',
+                       (start.isoformat(), end.isoformat()))
+        if counts:
+            cursor.executemany(self._sql_insert_counts,
+                               [(day,) + tuple(c[k] for k in schema.DAILY_COUNT_COLUMNS) for day, c in counts.items()])
+        return len(counts)
+
+    def rebuild_daily_counts(self, cursor):
+        """전체 일별 집계를 처음부터 다시 만듭니다 (적재/동기화 후)."""
+        cursor.execute(f'SELECT MIN("EventDate") AS first_day, MAX("EventEndDate") AS last_day '
+                       f'FROM "{schema.TABLE_NAME}"')
+        first_day, last_day = tuple(cursor.fetchone())
+        cursor.execute(f'DELETE FROM {schema.DAILY_COUNTS_TABLE}')
+        return self.refresh_daily_counts(cursor, first_day, last_day, span_bound=False)
+
+    # --- 스키마 마이그레이션 (schema.upgrade_schema) ---
+    def backfill_event_dates(self, cursor, only_missing=True):
+        """"Date" 원본 값을 읽어 "EventDate" / "EventEndDate" 를 채웁니다. 바뀐 행 수를 돌려줍니다."""
+        where = 'WHERE "EventDate" IS NULL AND "Date" IS NOT NULL' if only_missing else 'WHERE "Date" IS NOT NULL'
+        cursor.execute(f'SELECT DISTINCT "Date" FROM "{schema.TABLE_NAME}" {where}')
+        raw_dates = [row[0] for row in cursor.fetchall()]
+
+        # 같은 원본 문자열끼리 한 번에 갱신 (ID가 중복된 행도 안전)
+        params = []
+        for raw in raw_dates:
+            start, end = schema.parse_date_range(raw)
+            if start:
+                params.append((start, end, raw))
+        if params:
+            cursor.executemany(f'UPDATE "{schema.TABLE_NAME}" SET "EventDate" = {self.ph}, "EventEndDate" = {self.ph} '
+                               f'WHERE "Date" = {self.ph}', params)
+        return len(params)
+
+    def record_migration(self, cursor, version):
+        cursor.execute(f'INSERT INTO {schema.MIGRATIONS_TABLE} (version, applied_at) VALUES ({self.ph}, {self.ph})',
+                       (version, datetime.now().isoformat(timespec='seconds')))
+
+    # --- 시트 적재 / 동기화 (migrate_to_db.py) ---
+    def load_rows(self, cursor, rows, columns=schema.LOAD_COLUMNS):
+        """Postgres 는 COPY, SQLite 는 executemany 로 performances 에 행을 넣습니다."""
+        if self.is_pg:
+            with cursor.copy(f'COPY "{schema.TABLE_NAME}" ({_quoted(columns)}) FROM STDIN') as copy:
+                for row in rows:
+                    copy.write_row(row)
+        else:
+            cursor.executemany(self._sql_load(tuple(columns)), rows)
+
+    @functools.lru_cache(maxsize=None)
+    def _sql_load(self, columns):
+        return f'INSERT INTO "{schema.TABLE_NAME}" ({_quoted(columns)}) VALUES ({", ".join("?" for _ in columns)})'
+
+    @functools.lru_cache(maxsize=None)
+    def _sql_source_rows(self, table):
+        return (f'SELECT "ID", "SourceHash", "EventDate", "EventEndDate" FROM "{table}" '
+                f'WHERE "ID" IS NOT NULL')
+
+    def source_rows(self, cursor, table=schema.TABLE_NAME):
+        """동기화 비교용 (ID, SourceHash, EventDate, EventEndDate) 목록."""
+        cursor.execute(self._sql_source_rows(table))
+        return cursor.fetchall()
+
+    @functools.lru_cache(maxsize=None)
+    def _sql_update_columns(self, table, columns):
+        set_clause = ", ".join(f'"{c}" = {self.ph}' for c in columns)
+        return f'UPDATE "{table}" SET {set_clause} WHERE "ID" = {self.ph}'
+
+    def update_columns(self, cursor, table, columns, rows):
+        """rows 는 (columns 값..., ID) 튜플 목록."""
+        cursor.executemany(self._sql_update_columns(table, tuple(columns)), rows)
+
+
+_REPOSITORIES = {True: Repository(True), False: Repository(False)}
+
+
+def for_backend(is_pg):
+    return _REPOSITORIES[bool(is_pg)]
@@ -0,0 +1,518 @@
+import contextlib
+import hashlib
+import os
+import re
+from datetime import date, datetime
+
+# --- performances 테이블 스키마 (app.py / migrate_to_db.py 공용) ---
+TABLE_NAME = 'performances'
+
+# 엑셀 '전체일정' 시트의 열 순서와 동일
+SHEET_COLUMNS = ("ID", "Location", "Category", "Title", "Date", "Venue", "TeamSetup", "Notes", "Status")
+
+# 적재 시 함께 채우는 정규화 날짜 열과 시트 행 지문(증분 동기화용)
+# "SourceHash" 가 NULL 인 행은 앱(/add)에서 직접 추가한 행이라 동기화가 건드리지 않음.
+LOAD_COLUMNS = SHEET_COLUMNS + ("EventDate", "EventEndDate", "SourceHash")
+
+# "Date" 는 엑셀에서 온 원본 문자열('2025-01-09' 또는 '2025-01-09 ~ 2025-03-09')을 그대로 두고,
+# 검색용으로 정규화한 시작일/종료일을 "EventDate" / "EventEndDate" 에 따로 저장함.
+# 하루짜리 공연은 두 값이 같음.
+
+# 전체 목록/휴지통 키셋 페이지네이션 순서: 날짜를 못 읽은 행(EventDate NULL)은 이 날짜로 보고 맨 뒤에 둠
+# (NULL 은 행 값 비교가 안 되어 커서로 넘어갈 수 없으므로). 인덱스와 쿼리가 같은 식을 써야 인덱스를 탐.
+UNDATED_SORT_DATE = '9999-12-31'
+KEYSET_DATE_SQL = f'COALESCE("EventDate", \'{UNDATED_SORT_DATE}\')'
+KEYSET_INDEX_COLUMNS = f'({KEYSET_DATE_SQL}), "ID"'
+
+# 중복 배정 비교에 쓰는 공연장/인원편성 값: 앞뒤 공백을 뺀 값 (conflicts.resource_value 와 같은 규칙).
+# 한 건 확인과 저장 직후 확인 쿼리, 아래 인덱스가 모두 이 식을 써야 같은 결과에 인덱스를 탐.
+RESOURCE_SQL = 'TRIM({})'
+
+INDEXES = (
+    ('idx_performances_event_date', '"EventDate", "Status", "ApprovalStatus"'),
+    ('idx_performances_event_end_date', '"EventEndDate"'),
+    ('idx_performances_event_date_id', '"EventDate", "ID"'),  # 날짜 화면 범위 스캔 + 정렬용
+    # 중복 배정 확인: 같은 공연장/인원편성에서 새 시작일 이후에 끝나는 일정만 훑도록 종료일을 앞에 둠
+    ('idx_performances_venue_trim_dates', '(' + RESOURCE_SQL.format('"Venue"') + '), "EventEndDate", "EventDate"'),
+    ('idx_performances_team_trim_dates', '(' + RESOURCE_SQL.format('"TeamSetup"') + '), "EventEndDate", "EventDate"'),
+    ('idx_performances_keyset', KEYSET_INDEX_COLUMNS),  # 전체 목록 키셋 페이지네이션용
+)
+
+# ID 조회용 UNIQUE 인덱스: 같은 ID 를 동시에 직접 입력한 두 /add 중 하나는 커밋 전에 실패함
+ID_INDEX = 'idx_performances_id_unique'
+
+# 전문 검색 대상 열: SQLite 는 FTS5 외부 콘텐츠 테이블, Postgres 는 tsvector 생성 열 + 트라이그램 인덱스
+SEARCH_COLUMNS = ("Title", "Venue", "Location", "Notes")
+FTS_TABLE = 'performances_fts'
+# Postgres 트라이그램 인덱스와 ILIKE 검색이 같은 식을 써야 인덱스를 탐
+TRIGRAM_INDEX = 'idx_performances_search_trgm'
+SEARCH_DOCUMENT_SQL = " || ' ' || ".join(f'coalesce("{c}", \'\')' for c in SEARCH_COLUMNS)
+
+# 달력용 일별 집계 테이블 (기간 공연은 걸쳐 있는 모든 날짜에 집계, 취소된 공연 제외)
+DAILY_COUNTS_TABLE = 'daily_counts'
+DAILY_COUNT_COLUMNS = ('total', 'approved', 'rejected', 'pending', 'special', 'scheduled')
+
+# 취소된 공연 보관 테이블: performances 에는 진행 중인 일정만 두고, 취소하면 이 테이블로 옮김
+# ("Status" 는 취소 전 값 그대로 보관해서 복구하면 특별 행사 등 원래 상태로 돌아감)
+ARCHIVE_TABLE = 'performances_archive'
+# 두 테이블 사이에서 옮기는 열 (Postgres 의 생성 열 "SearchVector" 제외)
+STORED_COLUMNS = LOAD_COLUMNS + ("ApprovalStatus", "RejectionReason")
+ARCHIVE_INDEXES = (
+    ('idx_archive_keyset', KEYSET_INDEX_COLUMNS),  # 휴지통 키셋 페이지네이션용
+    ('idx_archive_id', '"ID"'),
+    ('idx_archive_archived_at', '"ArchivedAt"'),  # 보관 기간 지난 행 정리용
+)
+# 보관 기간: 이보다 오래된 보관 행은 Repository.purge_archive 가 지움 (배포의 python schema.py, 앱의 취소, 시트 동기화 때)
+ARCHIVE_RETENTION_DAYS = int(os.environ.get('ARCHIVE_RETENTION_DAYS', '365'))
+
+# 가장 긴 공연 기간(일): 날짜 화면의 구간 겹침 검색을 "EventDate" 인덱스 범위 스캔으로 묶는 데 씀
+# (시작일이 [시작 - 최대 기간, 끝] 안인 행만 겹칠 수 있음). 트리거가 늘어날 때만 갱신하고 줄지는 않음.
+EVENT_SPAN_TABLE = 'event_span'
+MAX_SPAN_SQL = f'COALESCE((SELECT max_days FROM {EVENT_SPAN_TABLE}), 36500)'  # 행이 없으면 사실상 제한 없음
+
+# 신규 ID 할당기: Postgres 는 시퀀스, SQLite 는 카운터 테이블
+ID_SEQUENCE = 'performances_id_seq'
+ID_COUNTER_TABLE = 'id_counter'
+
+_DATE_RE = re.compile(r'(\d{4})[-./](\d{1,2})[-./](\d{1,2})')
+
+
+def parse_date_range(value):
+    """원본 날짜 값을 (시작일, 종료일) ISO 문자열로 바꿉니다. 알 수 없는 형식이면 (None, None)."""
+    if value is None:
+        return None, None
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat(), value.isoformat()
+
+    found = []
+    for y, m, d in _DATE_RE.findall(str(value)):
+        try:
+            found.append(date(int(y), int(m), int(d)).isoformat())
+        except ValueError:
+            continue
+    if not found:
+        return None, None
+    return min(found), max(found)
+
+
+def _value(row, key):
+    """dict_row(Postgres) / 튜플 어느 쪽이든 열 값을 꺼냅니다."""
+    if isinstance(row, dict):
+        return row[key]
+    return row[0]
+
+
+def _values(row, keys):
+    """_value 의 여러 열 버전: keys 순서의 튜플."""
+    if isinstance(row, dict):
+        return tuple(row[k] for k in keys)
+    return tuple(row)
+
+
+def get_columns(cursor, is_pg):
+    """테이블의 열 이름 목록(소문자)을 돌려줍니다. 테이블이 없으면 빈 집합."""
+    if is_pg:
+        cursor.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = %s
+        """, (TABLE_NAME,))
+    else:
+        cursor.execute(f'PRAGMA table_info("{TABLE_NAME}")')
+    rows = cursor.fetchall()
+    if not rows:
+        return set()
+    if is_pg:
+        return {_value(r, 'column_name').lower() for r in rows}
+    return {r[1].lower() for r in rows}
+
+
+def _column_definitions(is_pg):
+    date_type = "DATE" if is_pg else "TEXT"
+    return f"""
+            "ID" TEXT, "Location" TEXT, "Category" TEXT, "Title" TEXT, "Date" TEXT,
+            "Venue" TEXT, "TeamSetup" TEXT, "Notes" TEXT, "Status" TEXT,
+            "ApprovalStatus" TEXT DEFAULT '미승인', "RejectionReason" TEXT,
+            "EventDate" {date_type}, "EventEndDate" {date_type}, "SourceHash" TEXT
+    """
+
+
+def create_table(cursor, is_pg):
+    """최신 스키마로 performances 테이블을 새로 만듭니다 (인덱스는 적재 후 create_indexes 로)."""
+    cursor.execute(f'CREATE TABLE "{TABLE_NAME}" ({_column_definitions(is_pg)})')
+
+
+def create_indexes(cursor):
+    for name, cols in INDEXES:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON "{TABLE_NAME}" ({cols})')
+
+
+def create_id_index(cursor):
+    """ID 는 행마다 하나 (NULL 은 여러 개 허용). 겹치는 ID 가 없어야 만들어짐 (마이그레이션 v9 가 먼저 정리)."""
+    cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {ID_INDEX} ON "{TABLE_NAME}" ("ID")')
+
+
+def row_fingerprint(values):
+    """시트 한 행(SHEET_COLUMNS 순서)의 내용 지문."""
+    joined = "\x1f".join("" if v is None else str(v) for v in values)
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+
+def to_load_row(values):
+    """SHEET_COLUMNS 순서의 값에 정규화 날짜와 지문을 붙여 LOAD_COLUMNS 순서로 돌려줍니다."""
+    event_date, event_end_date = parse_date_range(values[SHEET_COLUMNS.index("Date")])
+    return tuple(values) + (event_date, event_end_date, row_fingerprint(values))
+
+
+def get_max_numeric_id(cursor, is_pg):
+    """숫자로만 된 ID 중 가장 큰 값 (없으면 0)."""
+    if is_pg:
+        cursor.execute(f'SELECT MAX(CAST("ID" AS INTEGER)) AS max_id FROM "{TABLE_NAME}" WHERE "ID" ~ \'^[0-9]+$\'')
+    else:
+        cursor.execute(f'SELECT MAX(CAST("ID" AS INTEGER)) AS max_id FROM "{TABLE_NAME}" WHERE "ID" GLOB \'[0-9]*\'')
+    return int(_value(cursor.fetchone(), 'max_id') or 0)
+
+
+def seed_id_allocator(cursor, is_pg):
+    """ID 할당기를 만들고 기존 데이터의 최대 ID 이상으로 맞춥니다 (절대 뒤로 돌리지 않음)."""
+    max_id = get_max_numeric_id(cursor, is_pg)
+    if is_pg:
+        cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS {ID_SEQUENCE}')
+        cursor.execute(f'SELECT last_value, is_called FROM {ID_SEQUENCE}')
+        row = cursor.fetchone()
+        last_value, is_called = (row['last_value'], row['is_called']) if isinstance(row, dict) else row
+        current = last_value if is_called else last_value - 1
+        if max_id > current:
+            cursor.execute(f"SELECT setval('{ID_SEQUENCE}', %s, true)", (max_id,))
+    else:
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {ID_COUNTER_TABLE} (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        cursor.execute(f'INSERT OR IGNORE INTO {ID_COUNTER_TABLE} (name, value) VALUES (?, 0)', (TABLE_NAME,))
+        cursor.execute(f'UPDATE {ID_COUNTER_TABLE} SET value = MAX(value, ?) WHERE name = ?', (max_id, TABLE_NAME))
+    return max_id
+
+
+def has_id_allocator(cursor, is_pg):
+    if is_pg:
+        cursor.execute('SELECT to_regclass(%s) AS seq', (ID_SEQUENCE,))
+        return _value(cursor.fetchone(), 'seq') is not None
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (ID_COUNTER_TABLE,))
+    return cursor.fetchone() is not None
+
+
+# --- 버전 관리 마이그레이션 ---
+# 적용된 버전을 schema_migrations 에 기록하고, 새 스키마 변경은 MIGRATIONS 끝에 번호를 붙여 추가함.
+# 각 마이그레이션은 (cursor, is_pg) 를 받아 바뀐 내용 목록을 돌려주며, 여러 번 실행해도 안전해야 함.
+MIGRATIONS_TABLE = 'schema_migrations'
+# 여러 워커/배포 release 단계가 동시에 같은 마이그레이션을 적용하지 않도록 잡는 Postgres advisory lock 키
+MIGRATION_LOCK_KEY = 72_010_001
+
+
+def _repository(is_pg):
+    """마이그레이션의 데이터 쿼리(백필, 집계, 보관 이동)는 repository.Repository 로 (repository 가 이 모듈을 불러오므로 늦게 import)."""
+    import repository
+    return repository.for_backend(is_pg)
+
+
+def _migration_0001_baseline(cursor, is_pg):
+    """승인 열, 정규화 날짜 열 + 백필, 시트 지문 열, 인덱스, ID 할당기."""
+    columns = get_columns(cursor, is_pg)
+    date_type = "DATE" if is_pg else "TEXT"
+    changes = []
+
+    if 'approvalstatus' not in columns:
+        cursor.execute(f'ALTER TABLE "{TABLE_NAME}" ADD COLUMN "ApprovalStatus" TEXT DEFAULT \'미승인\'')
+        changes.append('ApprovalStatus')
+    if 'rejectionreason' not in columns:
+        cursor.execute(f'ALTER TABLE "{TABLE_NAME}" ADD COLUMN "RejectionReason" TEXT')
+        changes.append('RejectionReason')
+
+    if 'eventdate' not in columns:
+        cursor.execute(f'ALTER TABLE "{TABLE_NAME}" ADD COLUMN "EventDate" {date_type}')
+        changes.append('EventDate')
+    if 'eventenddate' not in columns:
+        cursor.execute(f'ALTER TABLE "{TABLE_NAME}" ADD COLUMN "EventEndDate" {date_type}')
+        changes.append('EventEndDate')
+    if 'sourcehash' not in columns:
+        cursor.execute(f'ALTER TABLE "{TABLE_NAME}" ADD COLUMN "SourceHash" TEXT')
+        changes.append('SourceHash')
+    if 'EventDate' in changes or 'EventEndDate' in changes:
+        filled = _repository(is_pg).backfill_event_dates(cursor)
+        changes.append(f'backfill({filled} dates)')
+
+    create_indexes(cursor)
+
+    if not has_id_allocator(cursor, is_pg):
+        max_id = seed_id_allocator(cursor, is_pg)
+        changes.append(f'id allocator(seeded at {max_id})')
+    return changes
+
+
+def _create_trigram_index(cursor):
+    """Postgres 검색의 부분 문자열 ILIKE 용 트라이그램 인덱스. pg_trgm 은 필수 (PG13+ 에서는 DB 소유자가 만들 수 있음).
+
+    인덱스 없이 ILIKE 를 OR 로 붙이면 검색마다 전체를 훑으므로, 만들 수 없으면 마이그레이션을 실패시킴."""
+    cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON "{TABLE_NAME}" '
+                   f'USING GIN (({SEARCH_DOCUMENT_SQL}) gin_trgm_ops)')
+
+
+def _migration_0002_full_text_search(cursor, is_pg):
+    """제목/공연장/위치/비고 전문 검색 인덱스. /add, /update, 적재 모두 자동으로 따라감."""
+    if is_pg:
+        cursor.execute(f"""
+            ALTER TABLE "{TABLE_NAME}" ADD COLUMN IF NOT EXISTS "SearchVector" tsvector
+            GENERATED ALWAYS AS (to_tsvector('simple'::regconfig, {SEARCH_DOCUMENT_SQL})) STORED
+        """)
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_performances_search ON "{TABLE_NAME}" USING GIN ("SearchVector")')
+        _create_trigram_index(cursor)
+        return ['SearchVector', TRIGRAM_INDEX]
+
+    columns = ", ".join(f'"{c}"' for c in SEARCH_COLUMNS)
+    new_values = ", ".join(f'new."{c}"' for c in SEARCH_COLUMNS)
+    old_values = ", ".join(f'old."{c}"' for c in SEARCH_COLUMNS)
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            {columns}, content='{TABLE_NAME}', tokenize='unicode61', prefix='1 2 3'
+        )
+    """)
+    # 원본 테이블이 다시 만들어지면 트리거도 사라지므로 매번 IF NOT EXISTS 로 재생성
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON "{TABLE_NAME}" BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES (new.rowid, {new_values});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON "{TABLE_NAME}" BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {columns} ON "{TABLE_NAME}" BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+            INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES (new.rowid, {new_values});
+        END
+    """)
+    cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+    return [FTS_TABLE]
+
+
+def _migration_0003_daily_counts(cursor, is_pg):
+    """달력 화면용 일별 집계 테이블을 만들고 채웁니다."""
+    day_type = "DATE" if is_pg else "TEXT"
+    counts = ", ".join(f"{c} INTEGER NOT NULL DEFAULT 0" for c in DAILY_COUNT_COLUMNS)
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS {DAILY_COUNTS_TABLE} (day {day_type} PRIMARY KEY, {counts})')
+    return [f'{DAILY_COUNTS_TABLE}({_repository(is_pg).rebuild_daily_counts(cursor)} days)']
+
+
+def _migration_0004_archive(cursor, is_pg):
+    """취소된 공연 보관 테이블을 만들고, performances 에 남아 있던 'Cancelled' 행을 옮깁니다."""
+    archived_type = "TIMESTAMPTZ" if is_pg else "TEXT"
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE} ({_column_definitions(is_pg)}, '
+                   f'"ArchivedAt" {archived_type} NOT NULL DEFAULT CURRENT_TIMESTAMP)')
+    for name, cols in ARCHIVE_INDEXES:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {ARCHIVE_TABLE} ({cols})')
+    moved = _repository(is_pg).archive_cancelled(cursor)
+    return [f'{ARCHIVE_TABLE}({len(moved)} cancelled rows moved)']
+
+
+def _migration_0005_conflict_indexes(cursor, is_pg):
+    """공연장/인원편성 중복 배정 확인용 (Venue|TeamSetup, EventEndDate, EventDate) 인덱스."""
+    create_indexes(cursor)
+    return ['idx_performances_venue_dates', 'idx_performances_team_dates']
+
+
+def _migration_0006_event_span(cursor, is_pg):
+    """가장 긴 공연 기간을 담는 한 행 테이블과, 삽입/날짜 변경 때 늘려 주는 트리거."""
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS {EVENT_SPAN_TABLE} (max_days INTEGER NOT NULL)')
+    cursor.execute(f'DELETE FROM {EVENT_SPAN_TABLE}')
+    if is_pg:
+        span = '"EventEndDate" - "EventDate"'
+        cursor.execute(f'INSERT INTO {EVENT_SPAN_TABLE} (max_days) SELECT COALESCE(MAX({span}), 0) FROM "{TABLE_NAME}"')
+        cursor.execute(f"""
+            CREATE OR REPLACE FUNCTION {EVENT_SPAN_TABLE}_track() RETURNS trigger AS $$
+            BEGIN
+                UPDATE {EVENT_SPAN_TABLE} SET max_days = NEW."EventEndDate" - NEW."EventDate"
+                WHERE max_days < NEW."EventEndDate" - NEW."EventDate";
+                RETURN NULL;
+            END $$ LANGUAGE plpgsql
+        """)
+        cursor.execute(f'DROP TRIGGER IF EXISTS {EVENT_SPAN_TABLE}_track ON "{TABLE_NAME}"')
+        cursor.execute(f'CREATE TRIGGER {EVENT_SPAN_TABLE}_track AFTER INSERT OR UPDATE OF "EventDate", "EventEndDate" '
+                       f'ON "{TABLE_NAME}" FOR EACH ROW EXECUTE FUNCTION {EVENT_SPAN_TABLE}_track()')
+        return [EVENT_SPAN_TABLE]
+
+    span = 'CAST(julianday("EventEndDate") - julianday("EventDate") AS INTEGER)'
+    cursor.execute(f'INSERT INTO {EVENT_SPAN_TABLE} (max_days) SELECT COALESCE(MAX({span}), 0) FROM "{TABLE_NAME}"')
+    new_span = span.replace('"Event', 'new."Event')
+    # 원본 테이블이 다시 만들어지면 트리거도 사라지므로 FTS 트리거처럼 IF NOT EXISTS 로 재생성
+    for name, event in (('ai', 'INSERT'), ('au', 'UPDATE OF "EventDate", "EventEndDate"')):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {EVENT_SPAN_TABLE}_{name} AFTER {event} ON "{TABLE_NAME}"
+            WHEN {new_span} > 0 BEGIN
+                UPDATE {EVENT_SPAN_TABLE} SET max_days = {new_span} WHERE max_days < {new_span};
+            END
+        """)
+    return [EVENT_SPAN_TABLE]
+
+
+def _migration_0007_keyset_undated(cursor, is_pg):
+    """날짜 없는 행도 전체 목록/휴지통 키셋 페이지에 나오도록 (KEYSET_DATE_SQL, ID) 식 인덱스로 바꿈."""
+    create_indexes(cursor)
+    for name, cols in ARCHIVE_INDEXES:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {ARCHIVE_TABLE} ({cols})')
+    cursor.execute('DROP INDEX IF EXISTS idx_archive_event_date_id')  # 휴지통 키셋 전용이던 인덱스
+    return ['idx_performances_keyset', 'idx_archive_keyset']
+
+
+def _migration_0008_conflict_trim_indexes(cursor, is_pg):
+    """중복 배정 인덱스를 RESOURCE_SQL(TRIM) 식 인덱스로 바꿈 (두 확인 쿼리가 같은 비교를 쓰도록)."""
+    for name in ('idx_performances_venue_dates', 'idx_performances_team_dates'):
+        cursor.execute(f'DROP INDEX IF EXISTS {name}')
+    create_indexes(cursor)
+    return ['idx_performances_venue_trim_dates', 'idx_performances_team_trim_dates']
+
+
+def _migration_0009_unique_id(cursor, is_pg):
+    """ID 에 UNIQUE 인덱스. 이미 겹친 ID 는 첫 행(물리적 순서)만 그대로 두고 나머지 행에 새 ID 를 줌."""
+    row_id = 'ctid' if is_pg else 'rowid'
+    cursor.execute(f'SELECT {row_id} AS row_id, "ID" FROM ('
+                   f'SELECT {row_id}, "ID", ROW_NUMBER() OVER (PARTITION BY "ID" ORDER BY {row_id}) AS n '
+                   f'FROM "{TABLE_NAME}" WHERE "ID" IS NOT NULL) d WHERE n > 1')
+    duplicates = [_values(row, ('row_id', 'ID')) for row in cursor.fetchall()]
+    changes = []
+    if duplicates:
+        seed_id_allocator(cursor, is_pg)  # 새 ID 가 기존 최대 ID 뒤에서 나오도록
+    if is_pg:
+        renumber = f'UPDATE "{TABLE_NAME}" SET "ID" = %s WHERE ctid = CAST(%s AS tid)'
+    else:
+        renumber = f'UPDATE "{TABLE_NAME}" SET "ID" = ? WHERE rowid = ?'
+    for row, old_id in duplicates:
+        new_id = str(_repository(is_pg).allocate_id(cursor))
+        cursor.execute(renumber, (new_id, row))
+        changes.append(f'duplicate ID {old_id} -> {new_id}')
+    create_id_index(cursor)
+    cursor.execute('DROP INDEX IF EXISTS idx_performances_id')  # UNIQUE 인덱스가 대신함
+    return [ID_INDEX] + changes
+
+
+def _migration_0010_trigram_required(cursor, is_pg):
+    """v2 가 pg_trgm 없이 건너뛴 DB 에도 트라이그램 인덱스를 만듦 (SQLite 는 FTS5 만 씀)."""
+    if not is_pg:
+        return []
+    _create_trigram_index(cursor)
+    return [TRIGRAM_INDEX]
+
+
+MIGRATIONS = (
+    (1, _migration_0001_baseline),
+    (2, _migration_0002_full_text_search),
+    (3, _migration_0003_daily_counts),
+    (4, _migration_0004_archive),
+    (5, _migration_0005_conflict_indexes),
+    (6, _migration_0006_event_span),
+    (7, _migration_0007_keyset_undated),
+    (8, _migration_0008_conflict_trim_indexes),
+    (9, _migration_0009_unique_id),
+    (10, _migration_0010_trigram_required),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(cursor, is_pg):
+    """적용된 마지막 마이그레이션 번호 (기록 테이블이 없으면 0)."""
+    if is_pg:
+        cursor.execute('SELECT to_regclass(%s) AS tbl', (MIGRATIONS_TABLE,))
+        exists = _value(cursor.fetchone(), 'tbl') is not None
+    else:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (MIGRATIONS_TABLE,))
+        exists = cursor.fetchone() is not None
+    if not exists:
+        return 0
+    cursor.execute(f'SELECT MAX(version) AS version FROM {MIGRATIONS_TABLE}')
+    return _value(cursor.fetchone(), 'version') or 0
+
+
+@contextlib.contextmanager
+def _migration_transaction(conn, is_pg):
+    """마이그레이션 하나를 잠금을 쥔 한 트랜잭션으로 (Postgres 는 pg_advisory_xact_lock, SQLite 는 BEGIN IMMEDIATE).
+
+    다른 프로세스가 적용 중이면 그 트랜잭션이 끝날 때까지 기다림. 커밋/롤백하면 잠금도 풀림."""
+    cursor = conn.cursor()
+    if is_pg:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', (MIGRATION_LOCK_KEY,))
+    else:
+        # sqlite3 모듈은 DDL 앞에서 트랜잭션을 열지 않으므로 직접 열어야 CREATE 까지 한 트랜잭션이 됨
+        # (앱의 metrics.TimedConnection 이면 isolation_level 은 감싼 원래 연결에 바꿔야 적용됨)
+        raw = getattr(conn, 'raw', conn)
+        conn.commit()
+        level = raw.isolation_level
+        raw.isolation_level = None
+        cursor.execute('BEGIN IMMEDIATE')
+    try:
+        yield cursor
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        if not is_pg:
+            raw.isolation_level = level
+
+
+def upgrade_schema(conn, is_pg, reapply_all=False):
+    """아직 적용되지 않은 마이그레이션만 순서대로 적용합니다. 이미 최신이면 조회 1번으로 끝납니다.
+
+    reapply_all=True 는 테이블을 새로 만든 직후(migrate_to_db.py)에 모든 마이그레이션을 다시 돌릴 때 사용.
+    """
+    cursor = conn.cursor()
+    if reapply_all:
+        cursor.execute(f'DROP TABLE IF EXISTS {MIGRATIONS_TABLE}')
+    current = get_schema_version(cursor, is_pg)
+    if current >= SCHEMA_VERSION:
+        conn.rollback()  # 조회만 했으므로 트랜잭션을 닫아둠
+        return "INFO: Database schema is up-to-date."
+    if not get_columns(cursor, is_pg):
+        conn.rollback()
+        return "INFO: Table 'performances' not found. Will be created by migrate script."
+
+    applied = []
+    for version, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        with _migration_transaction(conn, is_pg) as cursor:  # 마이그레이션 하나씩 잠그고 커밋
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} '
+                           f'(version INTEGER PRIMARY KEY, applied_at TEXT)')
+            # 잠금을 기다리는 동안 다른 프로세스가 이미 적용했을 수 있음
+            if get_schema_version(cursor, is_pg) >= version:
+                continue
+            changes = migration(cursor, is_pg)
+            _repository(is_pg).record_migration(cursor, version)
+        applied.append(f"v{version}" + (f"({', '.join(changes)})" if changes else ""))
+    if not applied:
+        return "INFO: Database schema is up-to-date (applied by another process)."
+    return f"✅ Schema updated successfully ({', '.join(applied)})."
+
+
+if __name__ == '__main__':
+    # 배포 release 단계에서 실행: python schema.py  (마이그레이션 + 오래된 보관 행 정리)
+    # 매일 정리만 따로 돌릴 때: python schema.py purge-archive
+    import sqlite3
+    import sys
+
+    database_url = os.environ.get('DATABASE_URL')
+    retention_days = ARCHIVE_RETENTION_DAYS
+    if database_url:
+        import psycopg
+        connection = psycopg.connect(database_url)
+    else:
+        connection = sqlite3.connect('events.db')
+    try:
+        if 'purge-archive' not in sys.argv[1:]:
+            print(upgrade_schema(connection, is_pg=bool(database_url)))
+        if get_schema_version(connection.cursor(), bool(database_url)) >= 4:  # 보관 테이블은 v4 부터
+            purged = _repository(bool(database_url)).purge_archive(connection.cursor(), retention_days)
+            connection.commit()
+            print(f"INFO: Purged {purged} archived rows older than {retention_days} days.")
+    finally:
+        connection.close()
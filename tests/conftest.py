@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# 모듈들이 import 시점에 DATABASE_URL 을 읽으므로 테스트는 항상 SQLite 모드로
+os.environ.pop('DATABASE_URL', None)
+os.environ['SCHEMA_CHECK_ON_START'] = '0'
+os.environ.setdefault('SECRET_KEY', 'test')  # /add 의 flash 안내
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import schema  # noqa: E402
+
+HEADER = schema.SHEET_COLUMNS
+
+
+def sheet_row(perf_id, title, day, venue=None, team=None, status=None):
+    return (perf_id, '서울', '공연', title, day, venue, team, None, status)
+
+
+def write_workbook(path, sheets):
+    """{시트 이름: [행, ...]} 로 XLSX 를 만듭니다. 시트마다 SHEET_COLUMNS 머리글을 붙이고, 'raw:' 로 시작하는 시트는 행 그대로."""
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    wb.remove(wb.active)
+    for name, rows in sheets.items():
+        raw = name.startswith('raw:')
+        sheet = wb.create_sheet(name[4:] if raw else name)
+        if not raw:
+            sheet.append(HEADER)
+        for row in rows:
+            sheet.append(row)
+    wb.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """events.db 를 만드는 임시 작업 디렉터리 (repository.connect 의 기본 경로가 상대 경로)."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def count_rows(table='performances', path='events.db'):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+
+def load_schedule(rows, path='events.db'):
+    """시트 행들을 migrate_to_db.replace_table 로 적재 (인덱스/마이그레이션까지 전체 적재와 같음)."""
+    import migrate_to_db
+
+    conn = sqlite3.connect(path)
+    try:
+        migrate_to_db.replace_table(conn, False, (schema.to_load_row(row) for row in rows))
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def web(workdir, monkeypatch):
+    """작업 디렉터리의 events.db 를 쓰는 app 모듈 (스레드별 연결과 캐시를 테스트마다 새로)."""
+    import threading
+
+    import app
+
+    monkeypatch.setattr(app, '_sqlite_local', threading.local())
+    app.page_cache.clear()
+    app.today_digest.invalidate([])
+    yield app
+    conn = getattr(app._sqlite_local, 'conn', None)
+    if conn is not None:
+        conn.close()
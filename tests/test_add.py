@@ -0,0 +1,50 @@
+import sqlite3
+
+import pytest
+
+from conftest import load_schedule, sheet_row
+
+FORM = {'id': '', 'suggested_id': '', 'location': '서울', 'category': '공연', 'title': '추가한 공연',
+        'date': '2025-08-01', 'venue': '', 'team_setup': '', 'notes': ''}
+
+
+def test_duplicate_id_is_rejected_by_unique_index(web):
+    load_schedule([sheet_row('5', '있는 공연', '2025-08-01')])
+    with web.app.test_request_context('/'):
+        cursor = web.get_db_conn().cursor()
+        with pytest.raises(sqlite3.IntegrityError):
+            # existing_ids 확인을 건너뛴 동시 추가와 같은 상황
+            web.get_repo().insert_performance(cursor, ('5', '서울', '공연', '같은 ID', '2025-08-02', None, None, None,
+                                                       None, '2025-08-02', None))
+
+
+def test_reserved_id_is_never_allocated_again(web):
+    load_schedule([sheet_row('5', '있는 공연', '2025-08-01')])
+    client = web.app.test_client()
+    added = client.post('/add', data=dict(FORM, id='40'), headers={'Accept': 'application/json'}).get_json()
+    assert added['ok'] and added['id'] == '40'
+    # 작은 ID 를 직접 넣어도 할당기가 되돌아가지 않음
+    assert client.post('/add', data=dict(FORM, id='20'), headers={'Accept': 'application/json'}).get_json()['ok']
+    assert client.post('/add', data=FORM, headers={'Accept': 'application/json'}).get_json()['id'] == '41'
+
+
+def test_form_post_errors_are_flashed(web, monkeypatch):
+    load_schedule([sheet_row('5', '있는 공연', '2025-08-01')])
+    client = web.app.test_client()
+    page = client.post('/add', data=dict(FORM, id='5'), follow_redirects=True).get_data(as_text=True)
+    assert 'ID 5 는 이미 있는 공연입니다.' in page
+
+    def broken(self, cursor, values):
+        raise RuntimeError('디스크 가득 참')
+
+    monkeypatch.setattr(web.repository.Repository, 'insert_performance', broken)
+    page = client.post('/add', data=FORM, follow_redirects=True).get_data(as_text=True)
+    assert '공연을 추가하지 못했습니다: 디스크 가득 참' in page
+
+
+def test_form_post_errors_without_secret_key(web, monkeypatch):
+    load_schedule([sheet_row('5', '있는 공연', '2025-08-01')])
+    monkeypatch.setattr(web.app, 'secret_key', None)
+    response = web.app.test_client().post('/add', data=dict(FORM, id='5'))
+    assert response.status_code == 400
+    assert response.get_data(as_text=True) == 'ID 5 는 이미 있는 공연입니다.'
@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+
+import repository
+import schema
+from conftest import count_rows, load_schedule, sheet_row
+
+SCHEDULE = [sheet_row('1', '공연 1', '2025-09-01'), sheet_row('2', '특별 행사', '2025-09-01', status='Special'),
+            sheet_row('3', '공연 3', '2025-09-02')]
+
+
+def daily_total(day):
+    with sqlite3.connect('events.db') as conn:
+        row = conn.execute(f'SELECT total FROM {schema.DAILY_COUNTS_TABLE} WHERE day = ?', (day,)).fetchone()
+    return row[0] if row else 0
+
+
+@pytest.fixture
+def client(web):
+    load_schedule(SCHEDULE)
+    return web.app.test_client()
+
+
+def test_cancel_moves_row_to_trash_and_restore_brings_it_back(client):
+    assert daily_total('2025-09-01') == 2
+    client.post('/update', data={'id_to_update': '2', 'action': 'cancel_performance'})
+    assert (count_rows(), count_rows(schema.ARCHIVE_TABLE)) == (2, 1)
+    assert daily_total('2025-09-01') == 1
+    assert '특별 행사' in client.get('/?mode=trash').get_data(as_text=True)
+
+    response = client.post('/update', data={'id_to_update': '2', 'action': 'restore'})
+    assert response.headers['Location'].endswith('/?mode=trash')
+    assert (count_rows(), count_rows(schema.ARCHIVE_TABLE)) == (3, 0)
+    assert daily_total('2025-09-01') == 2
+    with sqlite3.connect('events.db') as conn:
+        assert conn.execute('SELECT "Status" FROM performances WHERE "ID" = \'2\'').fetchone() == ('Special',)
+
+
+def test_cancelled_rows_are_archived_and_restored_as_scheduled(workdir):
+    load_schedule(SCHEDULE)
+    conn = sqlite3.connect('events.db')
+    conn.execute('UPDATE performances SET "Status" = \'Cancelled\' WHERE "ID" = \'3\'')  # 시트에서 취소로 바뀐 행
+    repo = repository.for_backend(False)
+    assert repo.archive_cancelled(conn.cursor()) == [('3', '2025-09-02', '2025-09-02')]
+    assert conn.execute(f'SELECT "ID", "ArchivedAt" IS NOT NULL FROM {schema.ARCHIVE_TABLE}').fetchall() == [('3', 1)]
+
+    assert repo.restore(conn.cursor(), ['3', '99']) == [('3', '2025-09-02', '2025-09-02')]
+    assert conn.execute('SELECT "Status" FROM performances WHERE "ID" = \'3\'').fetchone() == ('Scheduled',)
+    conn.close()
+
+
+def test_purge_archive_drops_only_expired_rows(workdir):
+    load_schedule(SCHEDULE)
+    conn = sqlite3.connect('events.db')
+    repo = repository.for_backend(False)
+    repo.archive(conn.cursor(), ['1', '2'])
+    conn.execute(f'UPDATE {schema.ARCHIVE_TABLE} SET "ArchivedAt" = datetime(\'now\', \'-400 days\') WHERE "ID" = \'1\'')
+    assert repo.purge_archive(conn.cursor(), retention_days=365) == 1
+    assert conn.execute(f'SELECT "ID" FROM {schema.ARCHIVE_TABLE}').fetchall() == [('2',)]
+    conn.close()
+
+
+def test_cancel_purges_at_most_once_per_interval(client, web, monkeypatch):
+    calls = []
+    monkeypatch.setattr(web, '_last_archive_purge', None)
+    monkeypatch.setattr(repository.Repository, 'purge_archive', lambda self, cursor: calls.append(1) or 0)
+    for perf_id in ('1', '3'):
+        client.post('/update', data={'id_to_update': perf_id, 'action': 'cancel_performance'})
+    assert len(calls) == 1
+    assert count_rows(schema.ARCHIVE_TABLE) == 2
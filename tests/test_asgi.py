@@ -0,0 +1,40 @@
+import asyncio
+import sqlite3
+
+import schema
+from conftest import load_schedule, sheet_row
+
+
+def get(application, path):
+    """ASGI 앱에 본문 없는 GET 하나를 보내고 (상태 코드, 본문) 을 돌려줍니다."""
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+             'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '', 'headers': [],
+             'client': ('127.0.0.1', 1), 'server': ('testserver', 80)}
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return sent[0]['status'], b''.join(m.get('body', b'') for m in sent[1:])
+
+
+def test_async_routes_run_pending_schema_check(web, monkeypatch):
+    load_schedule([sheet_row('1', '첫 공연', '2025-03-05')])
+    conn = sqlite3.connect('events.db')
+    conn.execute(f'DELETE FROM {schema.MIGRATIONS_TABLE} WHERE version = ?', (schema.SCHEMA_VERSION,))
+    conn.commit()
+    monkeypatch.setattr(web, 'LIVE_EVENTS', web.LIVE_EVENTS)  # asgi 를 불러오면 켜짐
+    monkeypatch.setattr(web, 'SCHEMA_CHECK_ON_START', True)
+    monkeypatch.setattr(web, '_schema_checked', False)
+    import asgi
+
+    # 시작 시 점검이 실패한 워커: before_request 를 거치지 않는 / 에서도 다시 점검
+    status, _ = get(asgi.application, '/')
+    assert status == 200
+    assert not web.schema_check_pending()
+    assert schema.get_schema_version(conn.cursor(), False) == schema.SCHEMA_VERSION
+    conn.close()
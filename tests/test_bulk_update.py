@@ -0,0 +1,52 @@
+import sqlite3
+
+import pytest
+
+from conftest import load_schedule, sheet_row
+
+SCHEDULE = [sheet_row('1', '공연 1', '2025-09-01'), sheet_row('2', '공연 2', '2025-09-15'),
+            sheet_row('3', '공연 3', '2025-10-01')]
+
+
+def approvals():
+    with sqlite3.connect('events.db') as conn:
+        return dict(conn.execute('SELECT "ID", "ApprovalStatus" FROM performances ORDER BY "ID"').fetchall())
+
+
+@pytest.fixture
+def client(web):
+    load_schedule(SCHEDULE)
+    return web.app.test_client()
+
+
+def test_partial_not_found(client):
+    result = client.post('/bulk-update', json={'ids': ['1', '99', '3', '1'], 'action': 'approve'}).get_json()
+    assert result['ok'] and result['updated'] == 2
+    assert result['results'] == [{'id': '1', 'status': 'updated'}, {'id': '99', 'status': 'not_found'},
+                                 {'id': '3', 'status': 'updated'}]
+    assert approvals() == {'1': '승인', '2': '미승인', '3': '승인'}
+
+
+def test_failure_rolls_back_whole_batch(client, web, monkeypatch):
+    def broken(cursor, date_ranges):
+        raise RuntimeError('집계 실패')
+
+    monkeypatch.setattr(web, 'refresh_counts', broken)  # UPDATE 뒤, 커밋 전에 실패
+    response = client.post('/bulk-update', json={'ids': ['1', '2'], 'action': 'reject', 'rejection_reason': '중복'})
+    assert response.status_code == 500
+    assert approvals() == {'1': '미승인', '2': '미승인', '3': '미승인'}
+
+    response = client.post('/bulk-update', json={'ids': ['1', '2'], 'action': 'change', 'new_date': '언젠가'})
+    assert response.status_code == 400
+
+
+def test_invalidates_cache_once_for_all_rows(client, web, monkeypatch):
+    calls = []
+    invalidate = web.page_cache.invalidate
+    monkeypatch.setattr(web.page_cache, 'invalidate', lambda ranges: calls.append(list(ranges)) or invalidate(ranges))
+    result = client.post('/bulk-update', json={'ids': ['1', '2', '3'], 'action': 'change',
+                                               'new_date': '2025-11-11'}).get_json()
+    assert result['updated'] == 3
+    assert len(calls) == 1
+    assert sorted(calls[0]) == [('2025-09-01', '2025-09-01'), ('2025-09-15', '2025-09-15'),
+                                ('2025-10-01', '2025-10-01'), ('2025-11-11', '2025-11-11')]
@@ -0,0 +1,55 @@
+import conflicts
+import schema
+from conftest import load_schedule, sheet_row
+
+SCHEDULE = [
+    sheet_row('1', '장기 공연', '2025-07-01 ~ 2025-07-10', venue='콘서트홀', team='A팀'),
+    sheet_row('2', '겹치는 공연', '2025-07-05', venue=' 콘서트홀 ', team='B팀'),
+    sheet_row('3', '다른 공연장', '2025-07-05', venue='소극장', team='A팀'),
+    sheet_row('4', '끝난 뒤', '2025-07-11', venue='콘서트홀', team='A팀'),
+    sheet_row('5', '공연장 빈 값', '2025-07-05', venue='  ', team=None),
+]
+
+
+def rows_of(schedule):
+    return [dict(zip(schema.LOAD_COLUMNS, schema.to_load_row(row))) for row in schedule]
+
+
+def test_report_finds_overlapping_pairs_once():
+    report = sorted((kind, value, first, second, start, end)
+                    for kind, value, start, end, first, _, _, second, _, _ in conflicts.report_rows(rows_of(SCHEDULE)))
+    assert report == [
+        ('TeamSetup', 'A팀', '1', '3', '2025-07-05', '2025-07-05'),
+        ('Venue', '콘서트홀', '1', '2', '2025-07-05', '2025-07-05'),
+    ]
+
+
+def test_check_uses_trimmed_values_and_excludes_self(web):
+    load_schedule(SCHEDULE)
+    client = web.app.test_client()
+    found = client.get('/conflicts/check', query_string={'date': '2025-07-05', 'venue': '콘서트홀 '}).get_json()
+    assert sorted(c['other_id'] for c in found['conflicts']) == ['1', '2']
+
+    found = client.get('/conflicts/check', query_string={'date': '2025-07-05', 'id': '2'}).get_json()
+    assert [(c['kind'], c['other_id']) for c in found['conflicts']] == [('Venue', '1')]
+
+    found = client.get('/conflicts/check', query_string={'date': '2025-07-12', 'venue': '콘서트홀'}).get_json()
+    assert found['conflicts'] == []
+
+
+def test_add_reports_same_conflicts_as_check(web):
+    load_schedule(SCHEDULE)
+    client = web.app.test_client()
+    form = {'id': '', 'suggested_id': '', 'location': '서울', 'category': '공연', 'title': '새 공연',
+            'date': '2025-07-11', 'venue': ' 콘서트홀', 'team_setup': 'C팀', 'notes': ''}
+    checked = client.get('/conflicts/check', query_string={'date': form['date'], 'venue': form['venue']}).get_json()
+    added = client.post('/add', data=form, headers={'Accept': 'application/json'}).get_json()
+    assert added['ok']
+    assert [c['other_id'] for c in added['conflicts']] == [c['other_id'] for c in checked['conflicts']] == ['4']
+
+
+def test_blank_resource_never_conflicts(web):
+    load_schedule(SCHEDULE)
+    client = web.app.test_client()
+    found = client.get('/conflicts/check', query_string={'date': '2025-07-05', 'id': '5'}).get_json()
+    assert found['conflicts'] == []
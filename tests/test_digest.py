@@ -0,0 +1,83 @@
+from datetime import date, timedelta
+
+from conftest import load_schedule, sheet_row
+from digest import Digest
+
+
+class FakeRepo:
+    """refresh_plan 이 내는 쿼리를 ('list', 날) / ('next_id',) 로 돌려줌."""
+
+    def list_view(self, view, params):
+        return ('list', params[0])
+
+    def next_id(self):
+        return ('next_id',)
+
+
+def refresh(digest, today_str, rows_by_day, next_id=100):
+    """refresh_plan 을 run_plan 대신 실행하고, 읽은 쿼리 목록과 결과를 돌려줌."""
+    plan, queries = digest.refresh_plan(FakeRepo(), today_str), []
+    try:
+        query = next(plan)
+        while True:
+            queries.append(query)
+            result = rows_by_day.get(query[1], []) if query[0] == 'list' else [{'next_id': next_id}]
+            query = plan.send(result)
+    except StopIteration as stop:
+        return queries, stop.value
+
+
+def row(perf_id, approval=None):
+    return {'ID': perf_id, 'ApprovalStatus': approval}
+
+
+def test_invalidate_drops_only_overlapping_day():
+    digest = Digest()
+    refresh(digest, '2025-03-05', {'2025-03-05': [row('1')], '2025-03-06': [row('2', '승인')]})
+    assert digest.current('2025-03-05') is not None
+
+    digest.invalidate([('2025-03-07', None)])  # 요약 밖의 날짜: 다음 ID 만 다시 읽음
+    assert digest.current('2025-03-05') is None
+    assert refresh(digest, '2025-03-05', {})[0] == [('next_id',)]
+
+    digest.invalidate([('2025-03-01', '2025-03-05')])  # 오늘에 걸친 기간 공연
+    queries, (entries, next_id) = refresh(digest, '2025-03-05', {'2025-03-05': [row('1'), row('3')]}, 101)
+    assert queries == [('list', '2025-03-05'), ('next_id',)]
+    assert entries['2025-03-05']['pending'] == 2 and entries['2025-03-06']['pending'] == 0
+    assert next_id == 101
+
+    digest.invalidate([])  # 알 수 없는 변경은 전부
+    assert refresh(digest, '2025-03-05', {})[0] == [('list', '2025-03-05'), ('list', '2025-03-06'), ('next_id',)]
+
+
+def test_rollover_reuses_tomorrow_and_drops_previous_day():
+    digest = Digest()
+    refresh(digest, '2025-03-05', {'2025-03-05': [row('1')], '2025-03-06': [row('2')]})
+    assert digest.current('2025-03-06') is None  # 새 내일이 없음
+    assert digest.stats()['days'] == 1           # 어제는 버리고 어제의 내일만 남김
+
+    queries, (entries, _) = refresh(digest, '2025-03-06', {'2025-03-07': [row('3')]})
+    assert queries == [('list', '2025-03-07')]
+    assert [entry['rows'][0]['ID'] for entry in entries.values()] == ['2', '3']
+    assert digest.current('2025-03-06') is not None
+
+
+def test_write_reloads_only_changed_day(web):
+    today = date.today()
+    days = [(today + timedelta(days=offset)).isoformat() for offset in range(3)]
+    load_schedule([sheet_row('1', '오늘 공연', days[0]), sheet_row('2', '내일 공연', days[1]),
+                   sheet_row('3', '모레 공연', days[2])])
+    client = web.app.test_client()
+    loads = web.today_digest.stats()['loads']  # 모듈 전체의 요약이라 앞선 테스트의 횟수가 남아 있음
+    widget = client.get('/today.json').get_json()
+    assert (widget['today']['pending'], widget['tomorrow']['count']) == (1, 1)
+    assert web.today_digest.stats()['loads'] == loads + 3  # 두 날 + 다음 ID
+
+    client.post('/update', data={'id_to_update': '3', 'action': 'approve'})  # 요약 밖의 날
+    client.get('/today.json')
+    assert web.today_digest.stats()['loads'] == loads + 4
+
+    client.post('/update', data={'id_to_update': '1', 'action': 'approve'})
+    widget = client.get('/today.json').get_json()
+    assert web.today_digest.stats()['loads'] == loads + 6  # 오늘 + 다음 ID
+    assert widget['today']['pending'] == 0 and widget['today']['performances'][0]['approval'] == '승인'
@@ -0,0 +1,74 @@
+import csv
+import io
+
+import pytest
+from openpyxl import load_workbook
+
+import export
+from conftest import load_schedule, sheet_row
+
+SCHEDULE = [sheet_row(str(i), f'공연 {i}', f'2025-06-{i:02d}', venue='콘서트홀') for i in range(1, 13)]
+SCHEDULE += [sheet_row('20', '기간 공연', '2025-05-30 ~ 2025-06-03'), sheet_row('21', '날짜 미정', '미정')]
+
+
+@pytest.fixture
+def client(web):
+    load_schedule(SCHEDULE)
+    with web.app.test_request_context('/'):
+        conn = web.get_db_conn()
+        conn.cursor().execute('UPDATE performances SET "ApprovalStatus" = \'승인\' WHERE "ID" IN (\'2\', \'20\')')
+        conn.commit()
+    return web.app.test_client()
+
+
+def index_ids(web, args):
+    with web.app.test_request_context('/', query_string=args):
+        context = web.run_plan(web.get_db_conn().cursor(), web.index_plan('2025-06-02'), lazy=False)
+        return [web.normalize_id(row['ID']) for row in context['performances']]
+
+
+def csv_ids(response):
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True).lstrip('﻿'))))
+    assert tuple(rows[0]) == export_columns()
+    return [row[0] for row in rows[1:]]
+
+
+def export_columns():
+    import app
+    return app.EXPORT_COLUMNS
+
+
+@pytest.mark.parametrize('args', [
+    {'search_date': '2025-06-02'},
+    {'start_date': '2025-06-02', 'end_date': '2025-06-05'},
+    {'start_date': '2025-06-01', 'end_date': '2025-06-30', 'approval': '승인'},
+    {'mode': 'all', 'page_size': '200'},
+    {'mode': 'all', 'page_size': '200', 'approval': '미승인'},
+])
+def test_csv_and_xlsx_match_index(client, web, args):
+    expected = index_ids(web, args)
+    assert expected
+    assert csv_ids(client.get('/export', query_string=dict(args, format='csv'))) == expected
+
+    response = client.get('/export', query_string=dict(args, format='xlsx'))
+    sheet = load_workbook(io.BytesIO(response.get_data()), read_only=True)[export.SHEET_NAME]
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0] == export_columns()
+    assert [str(row[0]) for row in rows[1:]] == expected
+
+
+def test_csv_is_streamed_in_chunks(client, web, monkeypatch):
+    monkeypatch.setattr(export, 'CHUNK_BYTES', 64)
+    monkeypatch.setattr(web, 'EXPORT_FETCH_SIZE', 3)
+    response = client.get('/export', query_string={'mode': 'all', 'format': 'csv'}, buffered=False)
+    assert response.is_streamed
+    assert response.headers['Content-Disposition'].startswith('attachment; filename="performances-all-')
+    chunks = list(response.response)
+    response.close()
+    assert chunks[0].decode('utf-8').lstrip('﻿').startswith('ID,Location')  # 머리글이 먼저 따로 나감
+    assert len(chunks) > 4
+    assert b''.join(chunks).decode('utf-8').count('\n') == len(SCHEDULE) + 1
+
+
+def test_unknown_format_is_rejected(client):
+    assert client.get('/export', query_string={'format': 'pdf'}).status_code == 400
@@ -0,0 +1,63 @@
+import json
+
+import live
+from conftest import load_schedule, sheet_row
+
+
+def test_hub_delivers_to_each_subscriber_until_unsubscribed():
+    hub = live.Hub()
+    first, second = live.Subscription(), live.Subscription()
+    unsubscribe = hub.subscribe(first.put)
+    hub.subscribe(second.put)
+    hub.dispatch(live.encode_change(['7', 7], [('2025-03-05', None)]))
+    expected = {'ids': ['7'], 'ranges': [('2025-03-05', '2025-03-05')]}
+    assert first.get(timeout=0) == second.get(timeout=0) == expected
+
+    unsubscribe()
+    hub.dispatch(live.RELOAD_PAYLOAD)
+    assert first.get(timeout=0) is None
+    assert second.get(timeout=0) == live.RELOAD
+    assert hub.stats() == {'subscribers': 1, 'delivered': 3, 'listening': False, 'connected': False}
+
+
+def test_slow_subscriber_gets_single_reload(monkeypatch):
+    monkeypatch.setattr(live, 'QUEUE_SIZE', 2)
+    subscription = live.Subscription()
+    for i in range(3):
+        subscription.put({'ids': [str(i)], 'ranges': []})
+    assert subscription.get(timeout=0) == live.RELOAD
+    assert subscription.get(timeout=0) is None
+
+
+def test_too_many_ids_become_reload_with_span():
+    payload = live.encode_change([str(i) for i in range(live.MAX_PAYLOAD_IDS + 1)],
+                                 [('2025-01-01', None), ('2025-02-01', '2025-02-03')])
+    assert live.decode_change(payload) == {'ids': None, 'ranges': [('2025-01-01', '2025-02-03')]}
+
+
+def read_events(chunks):
+    """SSE 조각에서 (event, data) 목록. 주석/retry 줄은 건너뜀."""
+    events = []
+    for block in b''.join(chunks).decode('utf-8').split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines() if line.startswith(('event', 'data')))
+        if lines:
+            events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_events_stream_delivers_change_after_write(web, monkeypatch):
+    load_schedule([sheet_row('1', '첫 공연', '2025-03-05'), sheet_row('2', '다른 날', '2025-03-06')])
+    monkeypatch.setattr(web, 'LIVE_STREAM_MAX_SECONDS', 0.5)
+    client = web.app.test_client()
+    stream = client.get('/events', query_string={'search_date': '2025-03-05'}, buffered=False)
+    assert stream.mimetype == 'text/event-stream'
+    chunks = iter(stream.response)
+    assert next(chunks) == b'retry: 3000\n\n'  # 여기서부터 구독 중
+
+    client.post('/update', data={'id_to_update': '1', 'action': 'approve'})
+    client.post('/update', data={'id_to_update': '2', 'action': 'approve'})  # 보고 있는 날짜가 아님
+    events = read_events(list(chunks))  # LIVE_STREAM_MAX_SECONDS 뒤 스트림이 닫힘
+    stream.close()
+    assert [(event, data['id']) for event, data in events] == [('upsert', '1')]
+    assert '첫 공연' in events[0][1]['html'] and '승인' in events[0][1]['html']
+    assert live.hub.stats()['subscribers'] == 0
@@ -0,0 +1,140 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+import migrate_to_db
+import schema
+import upload
+from conftest import count_rows, sheet_row, write_workbook
+
+SCHEDULE = [sheet_row(str(i), f'공연 {i}', f'2025-03-{i:02d}') for i in range(1, 11)]
+
+
+@pytest.fixture
+def loaded(workdir):
+    """일정 시트 10행을 전체 적재해 둔 events.db."""
+    path = write_workbook(workdir / 'base.xlsx', {'전체일정': SCHEDULE})
+    migrate_to_db.migrate_data_streaming(path, '전체일정')
+    assert count_rows() == 10
+    return path
+
+
+def test_stream_missing_sheet_keeps_table(loaded):
+    migrate_to_db.migrate_data_streaming(loaded, '없는시트')
+    assert count_rows() == 10
+
+
+def test_stream_sheet_without_schedule_header_keeps_table(workdir, loaded):
+    path = write_workbook(workdir / 'other.xlsx', {'raw:전체일정': [('인원표',), ('홍길동',)]})
+    migrate_to_db.migrate_data_streaming(path, '전체일정')
+    assert count_rows() == 10
+
+
+def test_sync_missing_sheet_archives_nothing(loaded):
+    migrate_to_db.sync_data(loaded, '전체일정X')
+    assert count_rows() == 10
+    assert count_rows(schema.ARCHIVE_TABLE) == 0
+
+
+def test_replace_table_rolls_back_on_error(loaded):
+    def rows():
+        for i in range(1001):
+            if i == 500:
+                raise RuntimeError('적재 중 실패')
+            yield schema.to_load_row(sheet_row(str(i), 't', '2025-01-01'))
+
+    conn = sqlite3.connect('events.db')
+    with pytest.raises(RuntimeError):
+        migrate_to_db.replace_table(conn, False, rows())
+    conn.close()
+    assert count_rows() == 10
+
+
+def test_replace_table_refuses_empty_source(loaded):
+    conn = sqlite3.connect('events.db')
+    with pytest.raises(ValueError):
+        migrate_to_db.replace_table(conn, False, iter(()))
+    conn.close()
+    assert count_rows() == 10
+
+
+def test_sync_after_full_load_is_noop(workdir):
+    rows = SCHEDULE + [sheet_row('3', '중복 ID 다른 내용', '2025-04-01'), sheet_row(None, 'ID 없음', '2025-04-02')]
+    path = write_workbook(workdir / 'dup.xlsx', {'전체일정': rows})
+    migrate_to_db.migrate_data_streaming(path, '전체일정')
+    assert count_rows() == 10
+    assert migrate_to_db.sync_data(path, '전체일정') == {'inserted': 0, 'updated': 0, 'removed': 0}
+
+
+def test_default_full_load_writes_source_hash(workdir):
+    write_workbook(workdir / migrate_to_db.EXCEL_FILE, {migrate_to_db.SHEET_NAME: SCHEDULE + SCHEDULE[:2]})
+    subprocess.run([sys.executable, os.path.abspath(migrate_to_db.__file__)], check=True, capture_output=True)
+    assert count_rows() == 10
+    with sqlite3.connect('events.db') as conn:
+        assert conn.execute('SELECT COUNT(*) FROM performances WHERE "SourceHash" IS NULL').fetchone() == (0,)
+    assert migrate_to_db.sync_data() == {'inserted': 0, 'updated': 0, 'removed': 0}
+
+
+def test_merge_skips_other_sheets_and_keeps_first_row_per_id(workdir):
+    first = write_workbook(workdir / 'a.xlsx', {
+        'raw:인원표': [('2025 인원편성표',), ('홍길동', '음향')],
+        '전체일정': SCHEDULE[:5],
+    })
+    second = write_workbook(workdir / 'b.xlsx', {
+        '전체일정': [sheet_row('1', '나중 파일의 1번', '2025-03-01', status='취소')] + SCHEDULE[5:],
+    })
+    rows = migrate_to_db.merge_sources([first, second], workers=1)
+    by_id = {row[0]: row for row in rows}
+    assert len(rows) == 10
+    assert by_id['1'][schema.LOAD_COLUMNS.index("Title")] == '공연 1'
+
+    rows = migrate_to_db.merge_sources([second], workers=1)
+    assert {row[0]: row for row in rows}['1'][migrate_to_db.STATUS_INDEX] == 'Cancelled'
+
+
+def test_merge_loads_in_parallel(workdir):
+    first = write_workbook(workdir / 'a.xlsx', {'전체일정': SCHEDULE[:5], '추가일정': SCHEDULE[5:]})
+    second = write_workbook(workdir / 'b.xlsx', {'전체일정': [sheet_row('11', '새 공연', '2025-03-11')]})
+    migrate_to_db.migrate_data_merged([first, second], workers=3)
+    assert count_rows() == 11
+
+
+def test_merge_failing_worker_keeps_table(workdir, loaded, monkeypatch):
+    path = write_workbook(workdir / 'merge.xlsx', {'전체일정': SCHEDULE[:3], 'Broken': SCHEDULE[3:]})
+    iter_xlsx_rows = upload.iter_xlsx_rows
+
+    def failing(file, sheet_name, *args, **kwargs):
+        if sheet_name == 'Broken':
+            raise RuntimeError('워커에서 실패')
+        return iter_xlsx_rows(file, sheet_name, *args, **kwargs)
+
+    monkeypatch.setattr(upload, 'iter_xlsx_rows', failing)  # fork 된 워커도 같은 함수를 씀
+    migrate_to_db.migrate_data_merged([path], workers=2)
+    assert count_rows() == 10
+
+
+def test_merge_unreadable_workbook_keeps_table(workdir, loaded):
+    good = write_workbook(workdir / 'good.xlsx', {'전체일정': SCHEDULE[:3]})
+    broken = workdir / 'broken.xlsx'
+    broken.write_bytes(b'not a workbook')
+    migrate_to_db.migrate_data_merged([good, str(broken)], workers=1)
+    assert count_rows() == 10
+
+
+def test_sync_counts_added_updated_archived(workdir, loaded):
+    rows = list(SCHEDULE[:8])
+    rows[1] = sheet_row('2', '제목이 바뀐 공연 2', '2025-03-02')
+    rows[2] = sheet_row('3', '공연 3', '2025-03-03', status='취소')
+    rows += [sheet_row('11', '새 공연 11', '2025-03-11'), sheet_row('12', '새 공연 12', '2025-03-12')]
+    path = write_workbook(workdir / 'next.xlsx', {'전체일정': rows})
+
+    # 시트에서 빠진 9, 10 과 취소로 바뀐 3 은 보관 테이블로
+    assert migrate_to_db.sync_data(path, '전체일정') == {'inserted': 2, 'updated': 2, 'removed': 3}
+    assert count_rows() == 9
+    assert count_rows(schema.ARCHIVE_TABLE) == 3
+    with sqlite3.connect('events.db') as conn:
+        assert conn.execute('SELECT "Title" FROM performances WHERE "ID" = \'2\'').fetchone() == ('제목이 바뀐 공연 2',)
+    assert migrate_to_db.sync_data(path, '전체일정') == {'inserted': 0, 'updated': 0, 'removed': 0}
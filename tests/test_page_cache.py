@@ -0,0 +1,60 @@
+from page_cache import PageCache
+from conftest import load_schedule, sheet_row
+
+
+def filled_cache():
+    cache = PageCache(max_bytes=1 << 20, ttl=300)
+    cache.put('march', b'march', ('2025-03-01', '2025-03-31'))
+    cache.put('day', b'day', ('2025-04-02', '2025-04-02'))
+    cache.put('all', b'all', None)
+    return cache
+
+
+def test_invalidate_removes_only_overlapping_scopes():
+    cache = filled_cache()
+    cache.invalidate([('2025-03-31', '2025-04-01')])
+    assert cache.get('march') is None
+    assert cache.get('day') is not None
+    assert cache.get('all') is None  # 전체 목록/휴지통은 어떤 쓰기에든 지움
+
+
+def test_invalidate_single_day_range():
+    cache = filled_cache()
+    cache.invalidate([('2025-04-02', None)])
+    assert cache.get('day') is None
+    assert cache.get('march') is not None
+
+
+def test_put_after_invalidation_is_dropped():
+    cache = PageCache(max_bytes=1 << 20, ttl=300)
+    generation = cache.generation()
+    cache.invalidate([('2025-03-01', None)])  # 렌더링 도중 쓰기
+    entry = cache.put('march', b'stale', ('2025-03-01', '2025-03-31'), generation)
+    assert entry['body'] == b'stale'
+    assert cache.get('march') is None
+    assert cache.stats()['stale_puts'] == 1
+
+    cache.put('march', b'fresh', ('2025-03-01', '2025-03-31'), cache.generation())
+    assert cache.get('march')['body'] == b'fresh'
+
+
+def test_ttl_and_byte_limit():
+    cache = PageCache(max_bytes=40, ttl=-1)
+    cache.put('big', b'x' * 11, None)  # 한도의 1/4 보다 크면 저장하지 않음
+    cache.put('small', b'x' * 10, None)
+    assert cache.stats()['entries'] == 1
+    assert cache.get('small') is None  # ttl 이 지나 바로 만료
+
+
+def test_write_invalidates_cached_index_page(web, monkeypatch):
+    load_schedule([sheet_row('1', '첫 공연', '2025-03-05')])
+    monkeypatch.setattr(web, 'PAGE_CACHE_ENABLED', True)
+    client = web.app.test_client()
+    assert '첫 공연' in client.get('/?search_date=2025-03-05').get_data(as_text=True)
+    assert web.page_cache.stats()['entries'] == 1
+
+    form = {'id': '', 'suggested_id': '', 'location': '서울', 'category': '공연', 'title': '추가한 공연',
+            'date': '2025-03-05', 'venue': '', 'team_setup': '', 'notes': ''}
+    assert client.post('/add', data=form, headers={'Accept': 'application/json'}).get_json()['ok']
+    assert web.page_cache.stats()['entries'] == 0
+    assert '추가한 공연' in client.get('/?search_date=2025-03-05').get_data(as_text=True)
@@ -0,0 +1,92 @@
+import pytest
+
+import schema
+from conftest import load_schedule, sheet_row
+
+DATED = [sheet_row(str(i), f'공연 {i}', day) for i, day in enumerate(
+    ['2025-01-05', '2025-01-05', '2025-01-05', '2025-02-01', '2025-02-01', '2025-03-10', '2025-04-01'], start=1)]
+UNDATED = [sheet_row('8', '날짜 미정 1', '미정'), sheet_row('9', '날짜 미정 2', '추후 공지')]
+PAGE_SIZE = 3
+
+
+@pytest.fixture
+def pages(web):
+    load_schedule(DATED + UNDATED)
+
+    def page(view='all', **args):
+        """주소 인자(after/before)로 키셋 페이지 하나: (ID 목록, 이전 커서, 다음 커서)."""
+        with web.app.test_request_context('/', query_string=args):
+            rows, prev_cursor, next_cursor = web.run_plan(
+                web.get_db_conn().cursor(),
+                web.keyset_page_plan(view, (), None, view == 'trash', PAGE_SIZE), lazy=False)
+            return [web.normalize_id(row['ID']) for row in rows], prev_cursor, next_cursor
+
+    return page
+
+
+def walk_forward(page, view='all'):
+    ids, prev_cursor, next_cursor = page(view)
+    assert prev_cursor is None
+    pages = [ids]
+    while next_cursor:
+        ids, prev_cursor, next_cursor = page(view, after=next_cursor)
+        assert prev_cursor is not None
+        pages.append(ids)
+    return pages, prev_cursor
+
+
+def test_forward_walk_ends_with_undated_rows(pages):
+    walked, _ = walk_forward(pages)
+    assert walked == [['1', '2', '3'], ['4', '5', '6'], ['7', '8', '9']]
+
+
+def test_backward_walk_returns_same_pages(pages):
+    walked, prev_cursor = walk_forward(pages)
+    back = [walked[-1]]
+    while prev_cursor:
+        ids, prev_cursor, next_cursor = pages(before=prev_cursor)
+        assert next_cursor is not None
+        back.append(ids)
+    assert back[::-1] == walked
+
+
+def test_cursor_of_undated_row_uses_sentinel(pages, web):
+    assert web.encode_cursor({'EventDate': None, 'ID': '8'}) == f'{schema.UNDATED_SORT_DATE}|8'
+    _, _, next_cursor = pages(after='2025-04-01|7')
+    assert next_cursor is None
+    assert pages(after='2025-03-10|6')[0] == ['7', '8', '9']
+    # 날짜 없는 행 뒤에서 시작하면 남은 날짜 없는 행만
+    assert pages(after=f'{schema.UNDATED_SORT_DATE}|8')[0] == ['9']
+
+
+def test_page_boundary_on_same_date(pages):
+    # 같은 날(2025-01-05) 세 행이 첫 페이지를 꽉 채워도 다음 페이지가 ID 로 이어짐
+    assert pages(after='2025-01-05|2')[0] == ['3', '4', '5']
+    assert pages(before='2025-02-01|4')[0] == ['1', '2', '3']
+
+
+def test_trash_lists_undated_rows(pages, web):
+    with web.app.test_request_context('/'):
+        conn = web.get_db_conn()
+        web.get_repo().archive(conn.cursor(), ['2', '8', '9'])
+        conn.commit()
+    walked, _ = walk_forward(pages, 'trash')
+    # 휴지통은 최근 날짜부터 (날짜 없는 행이 먼저)
+    assert walked == [['9', '8', '2']]
+
+
+def test_page_links_keep_approval_filter(web):
+    load_schedule(DATED + UNDATED)
+    with web.app.test_request_context('/'):
+        conn = web.get_db_conn()
+        conn.cursor().execute('UPDATE performances SET "ApprovalStatus" = \'승인\'')
+        conn.commit()
+    page = web.app.test_client().get('/', query_string={'mode': 'all', 'approval': '승인', 'page_size': PAGE_SIZE,
+                                                        'after': '2025-01-05|3'}).get_data(as_text=True)
+    assert 'before=2025-02-01%7C4' in page and 'after=2025-03-10%7C6' in page
+    links = [link for link in (part.split('"')[0] for part in page.split('href="/?')[1:])
+             if 'after=' in link or 'before=' in link]
+    assert len(links) == 2
+    for link in links:
+        assert 'approval=%EC%8A%B9%EC%9D%B8' in link and 'mode=all' in link and 'page_size=3' in link
+        assert link.count('after=') + link.count('before=') == 1
@@ -0,0 +1,91 @@
+import sqlite3
+import threading
+
+import pytest
+
+from conftest import load_schedule, sheet_row
+
+
+class FakePool:
+    """psycopg_pool.ConnectionPool 대신: SQLite 연결을 빌려주고 빌림/반납 횟수를 셈."""
+
+    def __init__(self):
+        self.conn = sqlite3.connect('events.db', check_same_thread=False)
+        self.checked_out = self.returned = 0
+
+    def getconn(self):
+        self.checked_out += 1
+        return self.conn
+
+    def putconn(self, conn):
+        assert conn is self.conn
+        self.returned += 1
+
+    def get_stats(self):
+        return {'pool_size': 1, 'pool_available': 1 - (self.checked_out - self.returned),
+                'requests_num': self.checked_out}
+
+
+@pytest.fixture
+def pg_pool(web, monkeypatch):
+    load_schedule([sheet_row('1', '첫 공연', '2025-03-05')])
+    pool = FakePool()
+    monkeypatch.setattr(web, 'DATABASE_URL', 'postgresql://example/events')
+    monkeypatch.setattr(web, '_pg_pool', pool)
+    monkeypatch.setattr(web, '_watching_pid', web.os.getpid())  # LISTEN 구독은 띄우지 않음
+    yield pool
+    pool.conn.close()
+
+
+def test_sqlite_connection_is_reused_per_thread(web):
+    load_schedule([sheet_row('1', '첫 공연', '2025-03-05')])
+    opened = web.get_pool_stats()['connections_opened']
+    client = web.app.test_client()
+    for _ in range(3):
+        assert client.get('/healthz').get_json()['ok']
+    conn = web.get_sqlite_conn()
+    assert web.get_pool_stats()['connections_opened'] == opened + 1
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(web.get_sqlite_conn()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn  # 스레드(워커)마다 따로
+    other[0].close()
+
+
+def test_pg_connection_checked_out_and_returned_per_request(pg_pool, web):
+    client = web.app.test_client()
+    for _ in range(2):
+        assert client.get('/healthz').status_code == 200
+    assert (pg_pool.checked_out, pg_pool.returned) == (2, 2)
+
+    with web.app.app_context():
+        assert web.get_db_conn() is web.get_db_conn()  # 한 요청 안에서는 한 번만 빌림
+        assert pg_pool.checked_out == 3
+    assert pg_pool.returned == 3
+
+
+def test_pool_stats_in_healthz_and_metrics(pg_pool, web):
+    client = web.app.test_client()
+    health = client.get('/healthz').get_json()
+    assert health['ok']
+    assert health['pool']['backend'] == 'postgresql'
+    assert health['pool']['max_size'] == web.DB_POOL_MAX_SIZE
+    assert health['pool']['requests_num'] == 1
+    assert client.get('/stats/pool').get_json()['pool_available'] == 1
+
+    text = client.get('/metrics').get_data(as_text=True)
+    assert f'db_pool{{stat="max_size"}} {web.DB_POOL_MAX_SIZE}' in text
+    assert 'db_pool{stat="requests_num"} 1' in text  # /stats/pool, /metrics 는 연결을 빌리지 않음
+
+
+def test_healthz_reports_failed_checkout(pg_pool, web, monkeypatch):
+    def exhausted():
+        raise TimeoutError('couldn\'t get a connection after 10.00 sec')
+
+    monkeypatch.setattr(pg_pool, 'getconn', exhausted)
+    response = web.app.test_client().get('/healthz')
+    assert response.status_code == 503
+    assert response.get_json()['pool']['backend'] == 'postgresql'
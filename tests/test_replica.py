@@ -0,0 +1,106 @@
+import sqlite3
+import time
+
+import live
+import replica
+import repository
+import schema
+from conftest import load_schedule, sheet_row
+
+
+class FakePgCursor:
+    """Postgres 커서 대신 SQLite 파일을 읽음 (replica.apply 가 쓰는 ID 조회만 바꿔서 실행)."""
+
+    def __init__(self, conn):
+        self.cursor = conn.cursor()
+
+    def execute(self, sql, params=()):
+        pg, local = repository.for_backend(True), repository.for_backend(False)
+        self.cursor.execute(sql.replace(pg.id_filter, local.id_filter), local.id_params(*params))
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+
+class FakePgConn:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+
+    def cursor(self):
+        return FakePgCursor(self.conn)
+
+
+def seeded_replica(workdir):
+    """primary.db 와 같은 내용으로 적재한 복제본 (전체 복사가 끝난 상태)."""
+    schedule = [sheet_row('1', '첫 공연', '2025-03-05'), sheet_row('2', '둘째 공연', '2025-03-06')]
+    load_schedule(schedule, 'primary.db')
+    load_schedule(schedule, 'replica.db')
+    read_replica = replica.Replica('postgresql://primary', directory=str(workdir))
+    read_replica.path = 'replica.db'
+    read_replica.seeded = True
+    return read_replica, read_replica._open_local()
+
+
+def daily_totals(conn):
+    return dict(conn.execute(f'SELECT day, total FROM {schema.DAILY_COUNTS_TABLE} ORDER BY day').fetchall())
+
+
+def test_apply_write_keeps_replica_current(workdir):
+    read_replica, local = seeded_replica(workdir)
+    with sqlite3.connect('primary.db') as primary:
+        primary.execute('UPDATE performances SET "Title" = ?, "Date" = ?, "EventDate" = ?, "EventEndDate" = ? '
+                        'WHERE "ID" = ?', ('날짜 바뀐 공연', '2025-03-07', '2025-03-07', '2025-03-07', '1'))
+        primary.execute('INSERT INTO performances ("ID", "Title", "Date", "EventDate", "EventEndDate") '
+                        'VALUES (?, ?, ?, ?, ?)', ('9', '새 공연', '2025-03-06', '2025-03-06', '2025-03-06'))
+    read_replica.apply_write(FakePgConn('primary.db'), local, [1, 9])
+
+    rows = local.execute('SELECT "ID", "Title", "EventDate" FROM performances ORDER BY "ID"').fetchall()
+    assert rows == [('1', '날짜 바뀐 공연', '2025-03-07'), ('2', '둘째 공연', '2025-03-06'),
+                    ('9', '새 공연', '2025-03-06')]
+    # 옮겨 간 날짜와 원래 날짜의 집계를 모두 다시 계산
+    assert daily_totals(local) == {'2025-03-06': 2, '2025-03-07': 1}
+    counter = local.execute(f'SELECT value FROM {schema.ID_COUNTER_TABLE}').fetchone()[0]
+    assert counter == 9
+    assert read_replica._changes.empty()
+
+
+def test_apply_write_failure_schedules_full_copy(workdir):
+    read_replica, local = seeded_replica(workdir)
+
+    class BrokenConn:
+        def cursor(self):
+            raise RuntimeError('연결 끊김')
+
+    read_replica.apply_write(BrokenConn(), local, ['1'])
+    assert read_replica._changes.get_nowait() == live.RELOAD
+
+    read_replica.seeded = False  # 첫 전체 복사 전에는 반영하지 않음 (전체 복사가 가져감)
+    read_replica.apply_write(BrokenConn(), local, ['1'])
+    assert read_replica._changes.empty()
+
+
+def test_choose_read_source_falls_back_to_primary(web, monkeypatch):
+    load_schedule([sheet_row('1', '첫 공연', '2025-03-05')])
+    read_replica = replica.Replica('postgresql://primary', max_lag=5, fallback='primary')
+    monkeypatch.setattr(read_replica, 'start', lambda: None)
+    monkeypatch.setattr(web, 'read_replica', read_replica)
+    monkeypatch.setattr(live.hub, 'disconnected_at', None)
+
+    def source(path='/', method='GET'):
+        with web.app.test_request_context(path, method=method):
+            web.choose_read_source()
+            return web.reads_replica()
+
+    assert source() is False  # 첫 전체 복사 전
+    read_replica.seeded = True
+    assert source() is True
+    assert source('/events') is False and source('/add', 'POST') is False
+
+    read_replica._pending_since = time.monotonic() - 10  # 반영이 max_lag 넘게 밀림
+    assert source() is False
+    read_replica._pending_since = None
+    monkeypatch.setattr(live.hub, 'disconnected_at', time.monotonic() - 10)  # LISTEN 끊김
+    assert source() is False
+
+    read_replica.fallback = 'stale'  # 밀려도 복제본에서 계속 읽음
+    assert source() is True
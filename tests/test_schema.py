@@ -0,0 +1,119 @@
+import sqlite3
+
+import pytest
+
+import repository
+import schema
+from conftest import count_rows, load_schedule, sheet_row
+
+ROWS = [sheet_row(str(i), f'공연 {i}', f'2025-05-{i:02d}', venue='콘서트홀') for i in range(1, 6)]
+
+
+def snapshot(conn):
+    """마이그레이션이 만드는 것들: 버전 기록, 인덱스/트리거 이름, 집계와 최대 기간."""
+    names = conn.execute("SELECT type, name FROM sqlite_master WHERE type IN ('index', 'trigger') "
+                         "ORDER BY type, name").fetchall()
+    counts = conn.execute(f'SELECT * FROM {schema.DAILY_COUNTS_TABLE} ORDER BY day').fetchall()
+    span = conn.execute(f'SELECT max_days FROM {schema.EVENT_SPAN_TABLE}').fetchall()
+    return schema.get_schema_version(conn.cursor(), False), names, counts, span
+
+
+def test_upgrade_is_idempotent(workdir):
+    load_schedule(ROWS)
+    conn = sqlite3.connect('events.db')
+    before = snapshot(conn)
+    assert before[0] == schema.SCHEMA_VERSION
+    assert schema.upgrade_schema(conn, False) == "INFO: Database schema is up-to-date."
+
+    # 전체 적재 직후처럼 모든 마이그레이션을 다시 돌려도 결과가 같음
+    schema.upgrade_schema(conn, False, reapply_all=True)
+    schema.upgrade_schema(conn, False, reapply_all=True)
+    assert snapshot(conn) == before
+    assert conn.execute(f'SELECT COUNT(*) FROM {schema.MIGRATIONS_TABLE}').fetchone()[0] == schema.SCHEMA_VERSION
+    conn.close()
+    assert count_rows() == 5
+
+
+def test_failed_migration_rolls_back_and_is_retried(workdir, monkeypatch):
+    load_schedule(ROWS)
+    failing = schema.SCHEMA_VERSION + 1
+
+    def broken(cursor, is_pg):
+        cursor.execute('CREATE TABLE half_done (x)')
+        raise RuntimeError('마이그레이션 실패')
+
+    monkeypatch.setattr(schema, 'MIGRATIONS', schema.MIGRATIONS + ((failing, broken),))
+    monkeypatch.setattr(schema, 'SCHEMA_VERSION', failing)
+    conn = sqlite3.connect('events.db')
+    with pytest.raises(RuntimeError):
+        schema.upgrade_schema(conn, False)
+    assert schema.get_schema_version(conn.cursor(), False) == failing - 1
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+
+    monkeypatch.setattr(schema, 'MIGRATIONS', schema.MIGRATIONS[:-1] + ((failing, lambda cursor, is_pg: []),))
+    assert schema.upgrade_schema(conn, False).startswith("✅")
+    assert schema.get_schema_version(conn.cursor(), False) == failing
+    conn.close()
+
+
+def test_upgrade_skips_migrations_another_process_applied(workdir, monkeypatch):
+    load_schedule(ROWS)
+    conn = sqlite3.connect('events.db')
+    conn.execute(f'DELETE FROM {schema.MIGRATIONS_TABLE} WHERE version = ?', (schema.SCHEMA_VERSION,))
+    conn.commit()
+    other = sqlite3.connect('events.db')
+    calls = []
+    original = schema.get_schema_version
+
+    def version_then_other_process_applies(cursor, is_pg):
+        # 첫 확인 뒤 잠금을 기다리는 동안 다른 프로세스가 마지막 마이그레이션을 적용한 상황
+        version = original(cursor, is_pg)
+        if not calls:
+            other.execute(f'INSERT INTO {schema.MIGRATIONS_TABLE} (version, applied_at) VALUES (?, ?)',
+                          (schema.SCHEMA_VERSION, 'other'))
+            other.commit()
+        calls.append(version)
+        return version
+
+    monkeypatch.setattr(schema, 'get_schema_version', version_then_other_process_applies)
+    assert schema.upgrade_schema(conn, False) == "INFO: Database schema is up-to-date (applied by another process)."
+    assert calls == [schema.SCHEMA_VERSION - 1, schema.SCHEMA_VERSION]
+    other.close()
+    conn.close()
+
+
+def test_refresh_counts_long_event_started_before_range(workdir):
+    load_schedule([sheet_row('1', '긴 공연', '2025-05-01 ~ 2025-05-20'), sheet_row('2', '하루 공연', '2025-05-15'),
+                   sheet_row('3', '오래전 공연', '2025-01-02')])
+    conn = sqlite3.connect('events.db')
+    conn.execute(f'DELETE FROM {schema.DAILY_COUNTS_TABLE}')
+    # 시작일 하한(가장 긴 기간 19일)이 5/1 에 시작한 공연을 빼지 않음
+    assert repository.for_backend(False).refresh_daily_counts(conn.cursor(), '2025-05-15', '2025-05-16') == 2
+    assert conn.execute(f'SELECT day, total FROM {schema.DAILY_COUNTS_TABLE} ORDER BY day').fetchall() == [
+        ('2025-05-15', 2), ('2025-05-16', 1)]
+    conn.close()
+
+
+def test_migration_transaction_through_timed_connection(workdir, monkeypatch):
+    import metrics
+
+    load_schedule(ROWS)
+    raw = sqlite3.connect('events.db')
+    conn = metrics.TimedConnection(raw, lambda query, params, elapsed: None)  # 앱의 get_db_conn 과 같은 래퍼
+    failing = schema.SCHEMA_VERSION + 1
+    levels = []
+
+    def broken(cursor, is_pg):
+        levels.append(raw.isolation_level)  # 원래 연결이 직접 연 트랜잭션 안인지
+        cursor.execute('CREATE TABLE half_done (x)')
+        raise RuntimeError('마이그레이션 실패')
+
+    monkeypatch.setattr(schema, 'MIGRATIONS', schema.MIGRATIONS + ((failing, broken),))
+    monkeypatch.setattr(schema, 'SCHEMA_VERSION', failing)
+    with pytest.raises(RuntimeError):
+        schema.upgrade_schema(conn, False)
+    assert levels == [None]
+    assert raw.isolation_level == ''
+    assert 'isolation_level' not in vars(conn)
+    assert raw.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+    raw.close()
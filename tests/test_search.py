@@ -0,0 +1,11 @@
+from conftest import load_schedule, sheet_row
+
+
+def test_sqlite_search_matches_word_prefixes_only(web):
+    load_schedule([sheet_row('1', '봄 콘서트', '2025-04-05', venue='예술의전당'),
+                   sheet_row('2', '가을 연극', '2025-10-05', venue='소극장')])
+    client = web.app.test_client()
+    assert '봄 콘서트' in client.get('/', query_string={'q': '콘서'}).get_data(as_text=True)
+    assert '봄 콘서트' in client.get('/', query_string={'q': '봄 예술'}).get_data(as_text=True)
+    # FTS5 는 단어 중간의 부분 문자열은 찾지 않음 (Postgres 는 트라이그램 ILIKE 로 찾음)
+    assert '봄 콘서트' not in client.get('/', query_string={'q': '서트'}).get_data(as_text=True)
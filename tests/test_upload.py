@@ -0,0 +1,39 @@
+import io
+
+import pytest
+
+import upload
+from conftest import sheet_row
+
+
+def test_check_rows_error_map():
+    rows = [
+        (2, sheet_row('10', '정상', '2025-06-01')),
+        (3, sheet_row('7', '이미 있는 ID', '2025-06-02')),
+        (4, sheet_row('10', '파일 안에서 중복', '2025-06-03')),
+        (5, sheet_row(None, None, '언젠가')),
+        (6, sheet_row(None, '날짜 빈 값', None)),
+        (7, sheet_row('11', '취소된 공연', '2025-06-04', status='Cancelled')),
+        (8, sheet_row(None, 'ID 없는 정상 행', '2025-06-05 ~ 2025-06-07')),
+    ]
+    assert upload.check_rows(rows, used_ids={'7'}) == {
+        3: ["ID 7 는 이미 있는 공연입니다."],
+        4: ["ID 10 가 2행과 중복됩니다."],
+        5: ["공연제목(Title)이 비어 있습니다.", "날짜(Date)를 알 수 없습니다: 언젠가"],
+        6: ["날짜(Date)를 알 수 없습니다: (빈 값)"],
+        7: ["취소(Cancelled)된 공연은 올릴 수 없습니다."],
+    }
+
+
+def test_read_rows_csv_header_and_blank_lines():
+    data = 'Title,Date,Venue,모르는 열\n첫 공연,2025-06-01,콘서트홀,x\n,,,\n둘째 공연,2025.6.2,,\n'
+    rows = upload.read_rows(io.BytesIO(data.encode('cp949')), 'csv')
+    assert [(line, values[3], values[4], values[5]) for line, values in rows] == [
+        (2, '첫 공연', '2025-06-01', '콘서트홀'),
+        (4, '둘째 공연', '2025.6.2', None),
+    ]
+
+
+def test_read_rows_rejects_missing_required_columns():
+    with pytest.raises(upload.MissingColumnsError):
+        upload.read_rows(io.BytesIO('Title,Venue\n공연,홀\n'.encode('utf-8')), 'csv')
@@ -0,0 +1,149 @@
+import csv
+import io
+import os
+from datetime import date, datetime
+
+import repository
+import schema
+
+# --- 새 공연 일괄 업로드 (/upload, CSV / XLSX) ---
+# 파일을 한 행씩 읽어 검사한 뒤 통과한 행을 한 트랜잭션으로 넣음 (Postgres COPY / SQLite executemany).
+# 머리글은 시트와 내보내기(export.py)가 쓰는 열 이름(schema.SHEET_COLUMNS) 그대로이고 모르는 열은 무시.
+# 업로드한 행은 /add 로 추가한 행처럼 앱 소유(SourceHash 없음)라서 시트 동기화가 지우지 않음.
+FORMATS = ('csv', 'xlsx')
+MAX_ROWS = int(os.environ.get('UPLOAD_MAX_ROWS', '20000'))
+REQUIRED_COLUMNS = ("Title", "Date")
+DEFAULT_STATUS = 'Scheduled'  # /add 의 기본 event_type 과 같음
+SHEET_NAME = '전체일정'  # 업로드한 XLSX 에 이 시트가 없으면 첫 시트
+CSV_ENCODINGS = ('utf-8-sig', 'cp949')  # 엑셀에서 "CSV" 로 저장하면 cp949 인 경우가 많음
+
+
+class MissingColumnsError(ValueError):
+    """머리글에 필요한 열이 없음 (일정 시트가 아님)."""
+
+
+def clean_cell(value):
+    """셀 값을 시트 적재와 같은 모양의 문자열로 (날짜는 ISO, 4.0 은 4, 빈 값은 None)."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def guess_format(filename):
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    return extension if extension in FORMATS else None
+
+
+def _sheet_rows(rows, required=()):
+    """머리글 다음 행들을 (줄 번호, SHEET_COLUMNS 순서의 튜플) 로. 빈 행은 건너뜀."""
+    header = [str(h).strip() if h is not None else None for h in next(rows, ())]
+    missing = [c for c in required if c not in header]
+    if missing:
+        raise MissingColumnsError(f"머리글에 {', '.join(missing)} 열이 없습니다.")
+    positions = [header.index(col) if col in header else None for col in schema.SHEET_COLUMNS]
+    for line, row in enumerate(rows, start=2):
+        values = tuple(clean_cell(row[i]) if i is not None and i < len(row) else None for i in positions)
+        if any(v is not None for v in values):
+            yield line, values
+
+
+def iter_xlsx_rows(file, sheet_name=SHEET_NAME, required=(), first_sheet_fallback=False):
+    """읽기 전용 모드로 시트를 한 행씩 읽습니다 (file 은 경로 또는 파일 객체).
+
+    시트가 없으면 ValueError. first_sheet_fallback=True(업로드)면 대신 첫 시트를 읽음.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        if sheet_name in wb.sheetnames:
+            sheet = wb[sheet_name]
+        elif first_sheet_fallback:
+            sheet = wb.worksheets[0]
+        else:
+            raise ValueError(f"'{sheet_name}' 시트가 없습니다 (있는 시트: {', '.join(wb.sheetnames)}).")
+        yield from _sheet_rows(sheet.iter_rows(values_only=True), required)
+    finally:
+        wb.close()
+
+
+def iter_numbers_tables(path, required=()):
+    """Numbers 문서의 표마다 ('시트/표', 행 생성기). numbers-parser 패키지가 있어야 함 (pip install numbers-parser)."""
+    from numbers_parser import Document
+
+    for sheet in Document(path).sheets:
+        for table in sheet.tables:
+            yield f"{sheet.name}/{table.name}", _sheet_rows(iter(table.rows(values_only=True)), required)
+
+
+def iter_csv_rows(stream, encoding=CSV_ENCODINGS[0], required=()):
+    text = io.TextIOWrapper(stream, encoding=encoding, newline='')
+    try:
+        yield from _sheet_rows(csv.reader(text), required)
+    finally:
+        text.detach()  # 업로드 스트림은 닫지 않음 (다른 인코딩으로 다시 읽을 수 있게)
+
+
+def read_rows(stream, file_format):
+    """업로드 파일의 (줄 번호, 값) 목록. 형식/머리글/행 수 문제는 ValueError."""
+    if file_format == 'xlsx':
+        return _limited(iter_xlsx_rows(stream, required=REQUIRED_COLUMNS, first_sheet_fallback=True))
+    if file_format != 'csv':
+        raise ValueError(f"지원하지 않는 형식입니다 (csv, xlsx): {file_format}")
+    for encoding in CSV_ENCODINGS:
+        try:
+            return _limited(iter_csv_rows(stream, encoding, required=REQUIRED_COLUMNS))
+        except UnicodeDecodeError:
+            stream.seek(0)
+    raise ValueError(f"CSV 인코딩을 알 수 없습니다 ({', '.join(CSV_ENCODINGS)} 중 하나로 저장해 주세요).")
+
+
+def _limited(rows):
+    result = []
+    for row in rows:
+        if len(result) >= MAX_ROWS:
+            raise ValueError(f"한 번에 올릴 수 있는 행은 {MAX_ROWS}행까지입니다.")
+        result.append(row)
+    return result
+
+
+def check_rows(rows, used_ids=()):
+    """행마다 오류 목록 {줄 번호: [메시지, ...]}. used_ids 는 DB 에 이미 있는 ID."""
+    id_index, title_index, date_index, status_index = (schema.SHEET_COLUMNS.index(c)
+                                                       for c in ("ID", "Title", "Date", "Status"))
+    errors, first_line = {}, {}
+    for line, values in rows:
+        messages = []
+        perf_id = values[id_index]
+        if perf_id is not None:
+            if perf_id in used_ids:
+                messages.append(f"ID {perf_id} 는 이미 있는 공연입니다.")
+            elif perf_id in first_line:
+                messages.append(f"ID {perf_id} 가 {first_line[perf_id]}행과 중복됩니다.")
+            else:
+                first_line[perf_id] = line
+        if not values[title_index]:
+            messages.append("공연제목(Title)이 비어 있습니다.")
+        if not schema.parse_date_range(values[date_index])[0]:
+            messages.append(f"날짜(Date)를 알 수 없습니다: {values[date_index] or '(빈 값)'}")
+        if values[status_index] == 'Cancelled':
+            messages.append("취소(Cancelled)된 공연은 올릴 수 없습니다.")
+        if messages:
+            errors[line] = messages
+    return errors
+
+
+def to_insert_row(values, perf_id):
+    """검사를 통과한 값을 repository.INSERT_COLUMNS 순서로 (ID 채우고 정규화 날짜 붙임)."""
+    row = dict(zip(schema.SHEET_COLUMNS, values))
+    row["ID"] = perf_id
+    row["Status"] = row["Status"] or DEFAULT_STATUS
+    row["EventDate"], row["EventEndDate"] = schema.parse_date_range(row["Date"])
+    return tuple(row[c] for c in repository.INSERT_COLUMNS)